@@ -267,7 +267,8 @@ const nutritionApi = {
         },
         params: { date }
       });
-      return response.data;
+      // The list endpoint is cursor-paginated: { next, previous, results }
+      return Array.isArray(response.data) ? response.data : response.data.results;
     } catch (error: any) {
       console.error(`Error fetching meals for ${date}:`, formatErrorMessage(error));
       throw error;
@@ -108,7 +108,8 @@ const workoutApi = {
           Authorization: `Token ${token}`,
         }
       });
-      return response.data;
+      // The list endpoint is cursor-paginated: { next, previous, results }
+      return Array.isArray(response.data) ? response.data : response.data.results;
     } catch (error: any) {
       console.error('Error fetching workouts:', formatErrorMessage(error));
       throw error;
@@ -151,6 +151,45 @@ export interface WeeklyNutritionData {
   fat: number;
 }
 
+export type NutritionBucket = 'day' | 'week' | 'month';
+
+export interface NutrientValues {
+  calories: number | null;
+  protein: number | null;
+  carbs: number | null;
+  fat: number | null;
+  fiber: number | null;
+  sugar: number | null;
+  sodium: number | null;
+}
+
+export interface NutritionRangeBucket {
+  period: string;
+  days: number;
+  days_logged: number;
+  totals: NutrientValues;
+  daily_average: NutrientValues;
+  rolling_average: NutrientValues;
+  adherence: NutrientValues;
+}
+
+export type ExportFormat = 'csv' | 'ndjson';
+
+export interface NutritionRangeData {
+  start: string;
+  end: string;
+  bucket: NutritionBucket;
+  window: number;
+  goals: NutrientValues;
+  summary: {
+    days: number;
+    days_logged: number;
+    daily_average: NutrientValues;
+    adherence: NutrientValues;
+  };
+  series: NutritionRangeBucket[];
+}
+
 const nutritionApi = {
   // Food Categories
   getCategories: async (token: string): Promise<FoodCategory[]> => {
@@ -204,7 +243,8 @@ const nutritionApi = {
           'Content-Type': 'application/json'
         }
       });
-      return response.data;
+      // The food list is cursor-paginated ({ next, previous, results }); search is not
+      return Array.isArray(response.data) ? response.data : response.data.results;
     } catch (error) {
       console.error('Error searching foods:', error);
       if (axios.isAxiosError(error) && error.response) {
@@ -504,6 +544,49 @@ const nutritionApi = {
     }
   },
   
+  getNutritionRange: async (
+    token: string,
+    start: string,
+    end: string,
+    bucket: NutritionBucket = 'day'
+  ): Promise<NutritionRangeData> => {
+    try {
+      const response = await axios.get(`${API_URL}/api/nutrition/meals/range/?start=${start}&end=${end}&bucket=${bucket}`, {
+        headers: {
+          'Authorization': `Token ${token}`,
+          'Content-Type': 'application/json'
+        }
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching nutrition range:', error);
+      throw error;
+    }
+  },
+  
+  exportMealEntries: async (
+    token: string,
+    format: ExportFormat = 'csv',
+    start?: string,
+    end?: string
+  ): Promise<Blob> => {
+    try {
+      const params = new URLSearchParams({ format });
+      if (start) params.append('start', start);
+      if (end) params.append('end', end);
+      const response = await axios.get(`${API_URL}/api/nutrition/meals/export/?${params}`, {
+        headers: {
+          'Authorization': `Token ${token}`
+        },
+        responseType: 'blob'
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Error exporting meal entries:', error);
+      throw error;
+    }
+  },
+  
   getFrequentlyUsedFoods: async (token: string, limit: number = 10): Promise<FoodItem[]> => {
     try {
       const response = await axios.get(`${API_URL}/api/nutrition/meals/frequently-used/?limit=${limit}`, {
@@ -0,0 +1,174 @@
+"""
+Training load analytics over a user's full history.
+
+One query reads the user's WorkoutMuscleGroupLoad rows: working-set totals per
+workout and muscle group, kept up to date by the set write path (see
+workouts.rollups), so years of sets come back as a few thousand rows. These
+are scattered into dense numpy arrays covering every day (and every
+Monday-based week) from the first workout to today, and all metrics are array
+operations on those:
+
+* tonnage: weight × reps, per day and per week and muscle group
+* session RPE load (Foster): average set RPE of a workout × its duration in
+  minutes; workouts without RPE contribute no session load
+* acute:chronic workload ratio: the 7-day average daily load divided by the
+  28-day average, the rolling-average model
+* monotony (mean / standard deviation of a week's daily loads, rest days
+  included) and strain (weekly load × monotony)
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import CharField
+from django.db.models.functions import Cast
+
+from workouts.models import WorkoutMuscleGroupLoad
+
+LOADS = ('srpe', 'tonnage')
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+
+DEFAULT_WEEKS = 12
+MAX_WEEKS = 104
+
+
+def _workout_loads(user_id, end_date):
+    """One row per workout and muscle group the user trained up to end_date"""
+    return WorkoutMuscleGroupLoad.objects.filter(
+        workout__user_id=user_id,
+        workout__date__lte=end_date,
+        total_sets__gt=0,
+    ).annotate(
+        # Read as text: numpy parses ISO dates and groups hex ids far faster
+        # than building a date and a UUID object per row
+        workout_key=Cast('workout_id', CharField()),
+        day=Cast('workout__date', CharField()),
+    ).values_list(
+        'workout_key', 'day', 'workout__duration', 'muscle_group',
+        'tonnage', 'rpe_total', 'rpe_sets', 'total_sets',
+    )
+
+
+def _trailing_sum(values, window):
+    """Sum of each element and the window - 1 elements before it"""
+    cumulative = np.cumsum(values)
+    shifted = np.zeros_like(cumulative)
+    shifted[window:] = cumulative[:-window]
+    return cumulative - shifted
+
+
+def _round(values):
+    return [None if np.isnan(value) else value for value in np.round(values, 2).tolist()]
+
+
+def training_load(user_id, end_date, weeks=DEFAULT_WEEKS, load='srpe'):
+    """
+    Training load dashboard of a user as of end_date. Metrics are computed
+    over the whole history; the daily and weekly series returned cover the
+    last `weeks` weeks. `load` picks the daily load ACWR, monotony and strain
+    are based on: session RPE load or tonnage.
+    """
+    rows = list(_workout_loads(user_id, end_date))
+    if rows:
+        columns = list(zip(*rows))
+        workout_ids = np.array(columns[0])
+        dates = np.array(columns[1], dtype='datetime64[D]')
+        durations = np.array(columns[2], dtype=float)
+        muscle_groups, group_index = np.unique(np.array(columns[3], dtype=str), return_inverse=True)
+        tonnage = np.array(columns[4], dtype=float)
+        rpe_total = np.array(columns[5], dtype=float)
+        rpe_sets = np.array(columns[6], dtype=float)
+        set_count = np.array(columns[7], dtype=int)
+        start_date = dates.min().item()
+    else:
+        workout_ids = np.array([], dtype=str)
+        dates = np.array([], dtype='datetime64[D]')
+        durations = tonnage = rpe_total = rpe_sets = np.array([], dtype=float)
+        muscle_groups = np.array([], dtype=str)
+        group_index = set_count = np.array([], dtype=int)
+        start_date = end_date
+
+    # Pad the history to whole Monday-based weeks
+    first_monday = np.datetime64(start_date - timedelta(days=start_date.weekday()), 'D')
+    last_day = (end_date - start_date).days + start_date.weekday()
+    week_count = last_day // 7 + 1
+    day_count = week_count * 7
+    day_index = (dates - first_monday).astype(int)
+
+    # Session RPE load per workout, then per day
+    workouts, workout_index = np.unique(workout_ids, return_inverse=True)
+    workout_rpe = np.bincount(workout_index, weights=rpe_total, minlength=len(workouts))
+    workout_rpe_sets = np.bincount(workout_index, weights=rpe_sets, minlength=len(workouts))
+    workout_day = np.zeros(len(workouts), dtype=int)
+    workout_duration = np.zeros(len(workouts))
+    workout_day[workout_index] = day_index
+    workout_duration[workout_index] = durations
+    with np.errstate(divide='ignore', invalid='ignore'):
+        session_rpe = np.where(workout_rpe_sets > 0, workout_rpe / workout_rpe_sets, 0)
+    session_load = session_rpe * workout_duration
+
+    daily = {
+        'srpe': np.bincount(workout_day, weights=session_load, minlength=day_count),
+        'tonnage': np.bincount(day_index, weights=tonnage, minlength=day_count),
+    }
+    daily_load = daily[load]
+
+    # Rolling-average ACWR, undefined until a full chronic window exists
+    acute = _trailing_sum(daily_load, ACUTE_DAYS) / ACUTE_DAYS
+    chronic = _trailing_sum(daily_load, CHRONIC_DAYS) / CHRONIC_DAYS
+    history_days = np.arange(day_count) - start_date.weekday()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        acwr = np.where((chronic > 0) & (history_days >= CHRONIC_DAYS - 1), acute / chronic, np.nan)
+
+    # Weekly load, monotony and strain; days after end_date are left out of
+    # the current week rather than counted as rest days
+    week_days = daily_load.astype(float)
+    week_days[last_day + 1:] = np.nan
+    week_days = week_days.reshape(week_count, 7)
+    weekly_load = np.nansum(week_days, axis=1)
+    deviation = np.nanstd(week_days, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        monotony = np.where(deviation > 0, np.nanmean(week_days, axis=1) / deviation, np.nan)
+    strain = weekly_load * monotony
+
+    # Weekly tonnage per muscle group
+    week_index = day_index // 7
+    group_count = len(muscle_groups)
+    weekly_tonnage = np.bincount(
+        week_index * group_count + group_index, weights=tonnage, minlength=week_count * group_count
+    ).reshape(week_count, group_count) if group_count else np.zeros((week_count, 0))
+
+    # Only the days up to end_date and the last `weeks` weeks are returned
+    shown_weeks = slice(max(week_count - weeks, 0), week_count)
+    shown_days = slice(max(last_day + 1 - weeks * 7, 0), last_day + 1)
+    week_starts = first_monday + np.arange(week_count) * 7
+    day_dates = first_monday + np.arange(day_count)
+    return {
+        'end': end_date,
+        'load': load,
+        'first_workout': start_date if rows else None,
+        'workouts': len(workouts),
+        'sets': int(set_count.sum()),
+        'acwr': {
+            'acute': _round(acute[last_day:last_day + 1])[0],
+            'chronic': _round(chronic[last_day:last_day + 1])[0],
+            'ratio': _round(acwr[last_day:last_day + 1])[0],
+        },
+        'daily': {
+            'dates': day_dates[shown_days].astype(str).tolist(),
+            'srpe_load': _round(daily['srpe'][shown_days]),
+            'tonnage': _round(daily['tonnage'][shown_days]),
+            'acwr': _round(acwr[shown_days]),
+        },
+        'weekly': {
+            'weeks': week_starts[shown_weeks].astype(str).tolist(),
+            'load': _round(weekly_load[shown_weeks]),
+            'monotony': _round(monotony[shown_weeks]),
+            'strain': _round(strain[shown_weeks]),
+            'tonnage': {
+                group: _round(weekly_tonnage[shown_weeks, column])
+                for column, group in enumerate(muscle_groups.tolist())
+            },
+        },
+    }
@@ -0,0 +1,105 @@
+from datetime import date, timedelta
+from statistics import mean, pstdev
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+import uuid
+
+from api.models import UserProfile  # Import for authentication mocking
+from workouts.models import Exercise, Workout, WorkoutSet
+from workouts.rollups import rebuild_user_stats
+
+class TrainingLoadDashboardTests(APITestCase):
+    """Tests for the training load dashboard"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Load User",
+            email="load@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        self.url = reverse('analytics-dashboard')
+        self.end = date(2026, 3, 29)  # A Sunday
+        
+        squat = Exercise.objects.create(name="Squat", muscle_group="legs")
+        bench = Exercise.objects.create(name="Bench Press", muscle_group="chest")
+        # Eight weeks of Monday and Thursday sessions
+        monday = date(2026, 2, 2)
+        sets = []
+        for week in range(8):
+            for offset in (0, 3):
+                workout = Workout.objects.create(
+                    user_id=self.user_id, name="Full Body", start_time="18:00:00", duration=60,
+                    date=monday + timedelta(days=week * 7 + offset),
+                )
+                sets.append(WorkoutSet(
+                    workout=workout, exercise=squat, set_number=1, reps=5, weight=60, is_warmup=True
+                ))
+                sets.extend(
+                    WorkoutSet(workout=workout, exercise=squat, set_number=number, reps=5, weight=100, rpe=8)
+                    for number in (2, 3, 4)
+                )
+                sets.extend(
+                    WorkoutSet(workout=workout, exercise=bench, set_number=number, reps=10, weight=60, rpe=7)
+                    for number in (1, 2)
+                )
+        WorkoutSet.objects.bulk_create(sets)
+        rebuild_user_stats([self.user_id])
+    
+    def test_dashboard_metrics(self):
+        """Session RPE load, tonnage, ACWR, monotony and strain follow their definitions"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'end': self.end.isoformat(), 'weeks': 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        self.assertEqual((data['workouts'], data['sets']), (16, 80))
+        self.assertEqual(data['first_workout'], date(2026, 2, 2))
+        
+        # (3 × RPE 8 + 2 × RPE 7) / 5 sets × 60 minutes
+        session_load = 7.6 * 60
+        week = [session_load, 0, 0, session_load, 0, 0, 0]
+        self.assertEqual(data['daily']['dates'][-7:], [
+            (date(2026, 3, 23) + timedelta(days=day)).isoformat() for day in range(7)
+        ])
+        self.assertEqual(data['daily']['srpe_load'][-7:], week)
+        self.assertEqual(data['daily']['tonnage'][-7:], [2700, 0, 0, 2700, 0, 0, 0])
+        
+        # A steady routine has an acute load equal to its chronic load
+        self.assertEqual(data['acwr']['ratio'], 1.0)
+        self.assertAlmostEqual(data['acwr']['acute'], 2 * session_load / 7, places=2)
+        
+        weekly = data['weekly']
+        self.assertEqual(weekly['weeks'], ['2026-03-02', '2026-03-09', '2026-03-16', '2026-03-23'])
+        self.assertEqual(weekly['load'], [2 * session_load] * 4)
+        self.assertAlmostEqual(weekly['monotony'][-1], mean(week) / pstdev(week), places=2)
+        self.assertAlmostEqual(weekly['strain'][-1], 2 * session_load * mean(week) / pstdev(week), places=0)
+        self.assertEqual(weekly['tonnage'], {'chest': [2400] * 4, 'legs': [3000] * 4})
+    
+    def test_tonnage_load_and_short_history(self):
+        """Tonnage can drive the load; ACWR is undefined before 28 days of history"""
+        response = self.client.get(self.url, {'end': '2026-02-15', 'load': 'tonnage'})
+        data = response.data
+        self.assertEqual(data['weekly']['load'], [5400, 5400])
+        self.assertIsNone(data['acwr']['ratio'])
+        self.assertEqual(len(data['daily']['dates']), 14)
+    
+    def test_empty_history_and_validation(self):
+        """A user without workouts gets an empty dashboard; bad parameters are rejected"""
+        other = UserProfile.objects.create(
+            user_id=str(uuid.uuid4()), display_name="New User", email="new@example.com"
+        )
+        self.client.force_authenticate(user=other)
+        data = self.client.get(self.url, {'end': self.end.isoformat()}).data
+        self.assertEqual((data['workouts'], data['sets']), (0, 0))
+        self.assertIsNone(data['acwr']['ratio'])
+        self.assertEqual(data['weekly']['tonnage'], {})
+        
+        tomorrow = (timezone.now().date() + timedelta(days=1)).isoformat()
+        for params in ({'load': 'distance'}, {'weeks': 0}, {'weeks': 'all'}, {'end': '29/03/2026'},
+                       {'end': tomorrow}, {'end': '9999-12-31'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import TrainingLoadDashboardView
+
+urlpatterns = [
+    path('dashboard/', TrainingLoadDashboardView.as_view(), name='analytics-dashboard'),
+]
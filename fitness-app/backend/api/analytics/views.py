@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .load import DEFAULT_WEEKS, LOADS, MAX_WEEKS, training_load
+
+class TrainingLoadDashboardView(APIView):
+    """
+    Training load dashboard: acute:chronic workload ratio, weekly tonnage per
+    muscle group, session RPE load and weekly monotony and strain
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        load = request.query_params.get('load', 'srpe')
+        if load not in LOADS:
+            return Response(
+                {"error": f"Invalid load. Use one of: {', '.join(LOADS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            weeks = int(request.query_params.get('weeks', DEFAULT_WEEKS))
+        except ValueError:
+            weeks = 0
+        if not 1 <= weeks <= MAX_WEEKS:
+            return Response(
+                {"error": f"weeks must be between 1 and {MAX_WEEKS}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        today = timezone.now().date()
+        end_str = request.query_params.get('end', None)
+        try:
+            end_date = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else today
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format. Use YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # The daily series run up to end, so a far-off end would allocate them unbounded
+        if end_date > today:
+            return Response(
+                {"error": "end cannot be in the future"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(training_load(request.user.user_id, end_date, weeks, load))
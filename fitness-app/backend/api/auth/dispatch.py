@@ -0,0 +1,122 @@
+"""
+Single-dispatch authentication front-end.
+
+The Authorization header is parsed once and routed to exactly one verifier by
+its scheme and the shape of its token:
+
+    Bearer <jwt>       -> SupabaseAuthentication
+    Bearer <other>     -> SupabaseAuthentication (rejected as an invalid JWT)
+    Token  <jwt>       -> SupabaseAuthentication
+    Token  <other>     -> SimpleTokenAuthentication (user_id or user_id:secret)
+
+Requests without a header, or with any other scheme, are left anonymous
+without consulting a verifier. Every verifier call is timed; see
+get_verifier_stats().
+"""
+import re
+import threading
+import time
+
+from rest_framework import authentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .middleware import SimpleTokenAuthentication, SupabaseAuthentication
+
+# header.payload.signature, each segment base64url encoded
+_JWT_RE = re.compile(r'^[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]*$')
+
+JWT = 'jwt'
+OPAQUE = 'opaque'
+
+ROUTES = {
+    ('bearer', JWT): 'supabase',
+    ('bearer', OPAQUE): 'supabase',
+    ('token', JWT): 'supabase',
+    ('token', OPAQUE): 'simple',
+}
+
+# Scheme as written in the header, passed on to the verifier
+SCHEME_NAMES = {'bearer': 'Bearer', 'token': 'Token'}
+
+
+def token_shape(token):
+    return JWT if _JWT_RE.match(token) else OPAQUE
+
+
+class VerifierStats:
+    """Call, failure and latency counters of one verifier"""
+
+    __slots__ = ('calls', 'failures', 'total_seconds', 'max_seconds')
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'total_seconds': self.total_seconds,
+            'max_seconds': self.max_seconds,
+            'mean_seconds': self.total_seconds / self.calls if self.calls else 0.0,
+        }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record_verifier_call(name, seconds, failed=False):
+    with _stats_lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = VerifierStats()
+        stats.calls += 1
+        stats.failures += int(failed)
+        stats.total_seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+
+
+def get_verifier_stats():
+    """Snapshot of the counters of every verifier called in this process"""
+    with _stats_lock:
+        return {name: stats.as_dict() for name, stats in _stats.items()}
+
+
+def reset_verifier_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class DispatchAuthentication(authentication.BaseAuthentication):
+    """Parse the Authorization header once and hand it to a single verifier"""
+
+    verifiers = {
+        'supabase': SupabaseAuthentication(),
+        'simple': SimpleTokenAuthentication(),
+    }
+
+    def authenticate(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        scheme, _, token = header.strip().partition(' ')
+        scheme = scheme.lower()
+        if scheme not in SCHEME_NAMES:
+            return None
+
+        token = token.strip()
+        if not token or ' ' in token:
+            raise AuthenticationFailed('Invalid authorization header')
+
+        name = ROUTES[(scheme, token_shape(token))]
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = self.verifiers[name].authenticate_credentials(
+                request, token, SCHEME_NAMES[scheme]
+            )
+            failed = result is None
+            return result
+        finally:
+            record_verifier_call(name, time.perf_counter() - started, failed)
@@ -1,12 +1,17 @@
 import jwt
 import json
+import logging
 from django.conf import settings
 from rest_framework import authentication
 from rest_framework.exceptions import AuthenticationFailed
-from api.models import UserProfile
+from api.auth.principals import load_profile, principal_cache
+from api.structured_logging import log_event
+
+logger = logging.getLogger(__name__)
 
 class SupabaseAuthentication(authentication.BaseAuthentication):
     """Authentication using Supabase JWT tokens"""
+    realm = 'supabase'
     
     def authenticate(self, request):
         auth_header = request.META.get('HTTP_AUTHORIZATION', '')
@@ -22,7 +27,20 @@ class SupabaseAuthentication(authentication.BaseAuthentication):
             # No auth header or unsupported format
             return None
         
+        return self.authenticate_credentials(request, token, token_type)
+    
+    def authenticate_credentials(self, request, token, token_type):
+        """Verify an already extracted token sent with the given scheme"""
+        # Tokens seen recently are served from the principal cache without
+        # decoding or touching the database
+        principal = principal_cache.get(token, realm=self.realm)
+        if principal is not None:
+            request.user_id = principal.user_id
+            request.auth = token
+            return (principal.profile, token)
+        
         try:
+            decoded = {}
             # For Supabase tokens, we don't verify with our secret
             # We need to extract user info from the JWT payload directly
             # This is because Supabase signs tokens with their own key
@@ -47,11 +65,12 @@ class SupabaseAuthentication(authentication.BaseAuthentication):
                     # If it's a Bearer token but not a valid JWT, that's an error
                     raise AuthenticationFailed(f'Invalid JWT token: {str(jwt_error)}')
             
-            # Get or create user profile
-            profile, created = UserProfile.objects.get_or_create(
-                user_id=user_id,
+            # Get or create user profile (first sight of the user only)
+            profile = load_profile(
+                user_id,
                 defaults={'email': email, 'display_name': email.split('@')[0]}
             )
+            principal_cache.set(token, profile, decoded, realm=self.realm)
             
             # Add user_id to the request for easy access
             request.user_id = user_id
@@ -61,12 +80,13 @@ class SupabaseAuthentication(authentication.BaseAuthentication):
             return (profile, token)
             
         except Exception as e:
-            print(f"Authentication error: {str(e)}")
+            log_event(logger, 'auth.failed', level=logging.WARNING, verifier=self.realm, error=str(e))
             raise AuthenticationFailed(f'Authentication failed: {str(e)}')
 
 
 class SimpleTokenAuthentication(authentication.BaseAuthentication):
     """Simple token-based authentication for development and testing"""
+    realm = 'simple'
     
     def authenticate(self, request):
         auth_header = request.META.get('HTTP_AUTHORIZATION', '')
@@ -75,6 +95,14 @@ class SimpleTokenAuthentication(authentication.BaseAuthentication):
             return None
         
         token = auth_header.split(' ')[1]
+        return self.authenticate_credentials(request, token)
+    
+    def authenticate_credentials(self, request, token, token_type='Token'):
+        """Verify an already extracted token"""
+        principal = principal_cache.get(token, realm=self.realm)
+        if principal is not None:
+            request.user_id = principal.user_id
+            return (principal.profile, token)
         
         try:
             # Extract user ID from the token
@@ -85,14 +113,15 @@ class SimpleTokenAuthentication(authentication.BaseAuthentication):
             # Assuming the token format is: user_id:random_string or just the user_id
             user_id = token.split(':')[0] if ':' in token else token
             
-            # Get or create user profile
-            profile, created = UserProfile.objects.get_or_create(
-                user_id=user_id,
+            # Get or create user profile (first sight of the user only)
+            profile = load_profile(
+                user_id,
                 defaults={
                     'email': f'{user_id}@example.com',
                     'display_name': f'User {user_id}'
                 }
             )
+            principal_cache.set(token, profile, realm=self.realm)
             
             # Add user_id to the request for easy access
             request.user_id = user_id
@@ -100,5 +129,5 @@ class SimpleTokenAuthentication(authentication.BaseAuthentication):
             return (profile, token)
             
         except Exception as e:
-            print(f"SimpleTokenAuthentication error: {str(e)}")
+            log_event(logger, 'auth.failed', level=logging.WARNING, verifier=self.realm, error=str(e))
             raise AuthenticationFailed(f'Authentication failed: {str(e)}')
\ No newline at end of file
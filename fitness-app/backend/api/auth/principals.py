@@ -0,0 +1,151 @@
+"""
+Per-process cache of authenticated principals.
+
+Authenticating a request decodes its token and loads (or creates) the caller's
+UserProfile. Both results are cached here under a hash of the token, so a
+client repeating the same token is authenticated without touching the
+database. Every request gets its own copy of the cached profile, so views
+that change request.user do not change what concurrent requests see.
+Entries expire after AUTH_PRINCIPAL_CACHE_TTL seconds or when the token
+itself expires, whichever comes first. The least recently used entry
+is evicted once AUTH_PRINCIPAL_CACHE_SIZE tokens are cached.
+
+Saving or deleting a profile drops its entries in the process that made the
+write (see api.signals). Nothing reaches other processes: they keep serving
+the old profile until their entries expire, so a profile change can take up
+to AUTH_PRINCIPAL_CACHE_TTL seconds to be seen by every worker.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from api.models import UserProfile
+
+
+def token_key(token, realm=''):
+    """
+    Cache key for a raw token; the token itself is never stored. Authenticators
+    that read the same token differently pass their own realm.
+    """
+    return hashlib.sha256(f'{realm}\0{token}'.encode('utf-8')).hexdigest()
+
+
+class Principal:
+    """A verified token: the caller's profile and the token's claims"""
+
+    __slots__ = ('profile', 'claims', 'expires_at')
+
+    def __init__(self, profile, claims, expires_at):
+        self.profile = profile
+        self.claims = claims
+        self.expires_at = expires_at
+
+    @property
+    def user_id(self):
+        return self.profile.user_id
+
+
+class PrincipalCache:
+    """Bounded LRU of Principals with per-entry expiry, safe to share between threads"""
+
+    def __init__(self, max_size=10000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, token, realm=''):
+        key = token_key(token, realm)
+        with self._lock:
+            principal = self._entries.get(key)
+            if principal is None:
+                return None
+            if principal.expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return Principal(copy.copy(principal.profile), principal.claims, principal.expires_at)
+
+    def set(self, token, profile, claims=None, realm=''):
+        """
+        Cache a verified token. Tokens carrying an `exp` claim are only cached
+        until they expire; already expired tokens are not cached at all.
+        """
+        claims = claims or {}
+        lifetime = self.ttl
+        if claims.get('exp') is not None:
+            try:
+                lifetime = min(lifetime, float(claims['exp']) - time.time())
+            except (TypeError, ValueError):
+                lifetime = 0
+        principal = Principal(profile, claims, time.monotonic() + lifetime)
+        if lifetime <= 0 or self.max_size <= 0:
+            return principal
+
+        key = token_key(token, realm)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            # The caller keeps its own instance
+            self._entries[key] = Principal(copy.copy(profile), claims, principal.expires_at)
+            self._keys_by_user.setdefault(profile.user_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+        return principal
+
+    def get_profile(self, user_id):
+        """A cached profile for user_id from any of the user's live tokens"""
+        now = time.monotonic()
+        with self._lock:
+            for key in self._keys_by_user.get(user_id, ()):
+                principal = self._entries[key]
+                if principal.expires_at > now:
+                    return copy.copy(principal.profile)
+        return None
+
+    def invalidate_user(self, user_id):
+        """Drop the entries of user_id cached by this process only"""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        principal = self._entries.pop(key)
+        keys = self._keys_by_user.get(principal.user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[principal.user_id]
+
+
+principal_cache = PrincipalCache(
+    max_size=getattr(settings, 'AUTH_PRINCIPAL_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_PRINCIPAL_CACHE_TTL', 300),
+)
+
+
+def load_profile(user_id, defaults):
+    """
+    The profile for user_id, created from defaults on first sight.
+
+    Profiles already cached for another token of the same user are reused, so
+    only the first request of a new user reaches the database.
+    """
+    profile = principal_cache.get_profile(user_id)
+    if profile is not None:
+        return profile
+    profile, created = UserProfile.objects.get_or_create(user_id=user_id, defaults=defaults)
+    return profile
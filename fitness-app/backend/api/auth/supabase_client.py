@@ -0,0 +1,111 @@
+"""
+Lazily constructed, pooled Supabase clients.
+
+The Supabase SDK is imported and clients are created on first use rather than
+when settings load, so management commands, migrations and workers that never
+talk to Supabase don't pay for it (or need SUPABASE_URL/SUPABASE_KEY set).
+
+Auth calls such as sign_in_with_password store the resulting session on the
+client, so a client is lent to one request at a time and clients used for
+them are never returned to the pool:
+
+    with supabase_client(signs_in=True) as client:
+        client.auth.sign_up({...})
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+def create_client():
+    """A new server-side Supabase client built from settings"""
+    if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
+        raise ImproperlyConfigured('SUPABASE_URL and SUPABASE_KEY must be set to use Supabase')
+
+    import supabase
+
+    # Sessions belong to the request that created them: don't keep them
+    # around or start background refresh timers in a shared process
+    options = supabase.ClientOptions(persist_session=False, auto_refresh_token=False)
+    return supabase.create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY, options)
+
+
+class ClientPool:
+    """
+    Up to `size` clients, created on demand and reused. Borrowers block for
+    up to `timeout` seconds once every client is lent out. A client released
+    with discard=True is dropped instead of reused, freeing its slot.
+    """
+
+    def __init__(self, factory, size=4, timeout=10):
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.created = 0
+        self._idle = []
+        self._available = threading.Condition()
+
+    def acquire(self):
+        with self._available:
+            ready = self._available.wait_for(
+                lambda: self._idle or self.created < self.size, timeout=self.timeout,
+            )
+            if not ready:
+                raise TimeoutError(f'No Supabase client available after {self.timeout}s')
+            if self._idle:
+                return self._idle.pop()
+            self.created += 1
+        try:
+            return self.factory()
+        except Exception:
+            self._drop()
+            raise
+
+    def release(self, client, discard=False):
+        if discard:
+            self._drop()
+            return
+        with self._available:
+            self._idle.append(client)
+            self._available.notify()
+
+    def _drop(self):
+        with self._available:
+            self.created -= 1
+            self._available.notify()
+
+    @contextmanager
+    def client(self, discard=False):
+        client = self.acquire()
+        try:
+            yield client
+        finally:
+            self.release(client, discard=discard)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ClientPool(
+                    create_client,
+                    size=getattr(settings, 'SUPABASE_CLIENT_POOL_SIZE', 4),
+                )
+    return _pool
+
+
+def supabase_client(signs_in=False):
+    """
+    Borrow a pooled Supabase client for the duration of a with block. Pass
+    signs_in=True for calls that may store a user's session on the client
+    (sign_up, sign_in_with_password): the client is then discarded rather
+    than lent to the next request with that session still set.
+    """
+    return get_pool().client(discard=signs_in)
@@ -14,7 +14,7 @@ from api.auth.serializers import (
     RegistrationSerializer, TokenSerializer,
     PasswordResetRequestSerializer, PasswordResetConfirmSerializer
 )
-from core.settings import supabase_client  # Add this import
+from api.auth.supabase_client import supabase_client
 
 class RegisterView(APIView):
     """Register a new user with Supabase"""
@@ -30,11 +30,12 @@ class RegisterView(APIView):
         display_name = serializer.validated_data.get('display_name', '')
         
         try:
-            # Register user with Supabase - use the imported client directly
-            response = supabase_client.auth.sign_up({  # Change here
-                "email": email,
-                "password": password,
-            })
+            # Register user with Supabase using a pooled client
+            with supabase_client(signs_in=True) as client:
+                response = client.auth.sign_up({
+                    "email": email,
+                    "password": password,
+                })
             
             # Create user profile in our database
             if response.user:
@@ -65,11 +66,12 @@ class LoginView(APIView):
         password = serializer.validated_data['password']
         
         try:
-            # Sign in with Supabase - use the imported client directly
-            response = supabase_client.auth.sign_in_with_password({  # Change here
-                "email": email,
-                "password": password,
-            })
+            # Sign in with Supabase using a pooled client
+            with supabase_client(signs_in=True) as client:
+                response = client.auth.sign_in_with_password({
+                    "email": email,
+                    "password": password,
+                })
             
             # Get user profile
             try:
@@ -107,8 +109,9 @@ class RequestPasswordResetView(APIView):
         email = serializer.validated_data['email']
         
         try:
-            # Request password reset with Supabase - use the imported client directly
-            supabase_client.auth.reset_password_for_email(email)  # Change here
+            # Request password reset with Supabase using a pooled client
+            with supabase_client() as client:
+                client.auth.reset_password_for_email(email)
             
             return Response({
                 'message': 'Password reset email sent. Check your inbox.'
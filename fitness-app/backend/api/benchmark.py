@@ -0,0 +1,285 @@
+"""
+In-process API benchmark.
+
+    python manage.py generate_dataset --users 100 --years 3
+    python manage.py benchmark --requests 5000 --output before.json
+    ... change workouts/views.py ...
+    python manage.py benchmark --requests 5000 --output after.json --baseline before.json
+
+Scenarios modelled on how the apps use the API are picked at random by
+weight and replayed through Django's test client as randomly chosen users
+of the synthetic dataset. Requests go through the full middleware,
+authentication, view and serializer stack; only the HTTP server is left out.
+Every request is timed and its SQL queries counted, and results are
+reported per endpoint (method and URL name):
+
+    count, errors, p50/p95/p99/mean/max latency (ms), mean/max queries
+
+along with overall throughput. Requests run one at a time, so throughput is
+that of a single worker. Unmeasured warmup scenarios run first; the run
+ends with the scenario that brings the measured requests to --requests.
+
+Everything happens inside a transaction that is rolled back, so scenarios
+that write leave the dataset unchanged and runs stay comparable.
+"""
+import itertools
+import json
+import platform
+import random
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from datetime import timedelta
+from types import SimpleNamespace
+
+import django
+import numpy as np
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.metrics import RequestMetrics
+from api.models import UserProfile
+from api.nutrition.models import FoodItem
+from workouts.models import Exercise
+
+# Endpoint latencies compared against a baseline are flagged when they
+# change by more than this fraction
+REGRESSION_THRESHOLD = 0.10
+
+
+class Rollback(Exception):
+    """Raised to roll back the benchmark transaction"""
+
+
+class Session:
+    """A test client authenticated as one user, timing every request"""
+
+    def __init__(self, runner, profile):
+        self.runner = runner
+        self.user_id = profile.user_id
+        self.client = APIClient()
+        self.client.force_authenticate(user=profile)
+
+    def request(self, method, path, data=None):
+        metrics = RequestMetrics()
+        with ExitStack() as stack:
+            for db in connections.all():
+                stack.enter_context(db.execute_wrapper(metrics))
+            started = time.perf_counter()
+            response = getattr(self.client, method)(path, data, format='json' if method != 'get' else None)
+            elapsed = time.perf_counter() - started
+        endpoint = f'{method.upper()} {resolve(path).view_name}'
+        self.runner.record(endpoint, elapsed, metrics.queries, response.status_code)
+        return response
+
+    def get(self, name, params=None, **kwargs):
+        return self.request('get', reverse(name, kwargs=kwargs), params)
+
+    def post(self, name, data, **kwargs):
+        return self.request('post', reverse(name, kwargs=kwargs), data)
+
+
+def log_workout(session, rng, catalog):
+    """Create a workout, then add its sets in one batch"""
+    today = timezone.now().date()
+    response = session.post('workout-list', {
+        'name': 'Benchmark Workout', 'date': today.isoformat(), 'start_time': '18:00',
+        'duration': rng.randint(30, 90),
+    })
+    if response.status_code != 201:
+        return
+    sets = []
+    for exercise in rng.sample(catalog.exercises, min(3, len(catalog.exercises))):
+        for set_number in range(1, 4):
+            sets.append({
+                'exercise': str(exercise), 'set_number': set_number,
+                'reps': rng.randint(5, 12), 'weight': rng.randrange(20, 120, 5),
+            })
+    session.post('workout-set-bulk', sets, workout_pk=response.data['id'])
+
+
+def view_history(session, rng, catalog):
+    session.get('workout-history', {'days': rng.choice([7, 30, 90])})
+
+
+def daily_summary(session, rng, catalog):
+    day = timezone.now().date() - timedelta(days=rng.randint(0, 6))
+    session.get('meal-entry-summary', {'date': day.isoformat()})
+
+
+def food_search(session, rng, catalog):
+    """Search-as-you-type: one request per keystroke after the second"""
+    word = rng.choice(catalog.food_words)
+    for length in range(3, len(word) + 1):
+        session.get('food-search', {'q': word[:length]})
+
+
+def workout_stats(session, rng, catalog):
+    session.get('workout-stats')
+
+
+# name -> (scenario, relative weight)
+SCENARIOS = {
+    'log_workout': (log_workout, 10),
+    'history': (view_history, 20),
+    'daily_summary': (daily_summary, 30),
+    'food_search': (food_search, 25),
+    'stats': (workout_stats, 15),
+}
+
+
+def summarize(latencies, queries, errors):
+    milliseconds = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(milliseconds, [50, 95, 99])
+    return {
+        'count': len(latencies),
+        'errors': errors,
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'mean_ms': round(float(milliseconds.mean()), 3),
+        'max_ms': round(float(milliseconds.max()), 3),
+        'mean_queries': round(float(np.mean(queries)), 2),
+        'max_queries': int(max(queries)),
+    }
+
+
+class EndpointSamples:
+    __slots__ = ('latencies', 'queries', 'errors')
+
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.errors = 0
+
+
+class BenchmarkRunner:
+    def __init__(self, requests=1000, scenarios=None, prefix='synthetic-', users=None, seed=0, warmup=50):
+        self.requests = requests
+        self.scenarios = {name: SCENARIOS[name] for name in (scenarios or SCENARIOS)}
+        self.names = list(self.scenarios)
+        self.cum_weights = list(itertools.accumulate(weight for _, weight in self.scenarios.values()))
+        self.prefix = prefix
+        self.users = users
+        self.seed = seed
+        self.warmup = warmup
+        self.recording = False
+        self.recorded = 0
+        self.samples = defaultdict(EndpointSamples)
+
+    def record(self, endpoint, seconds, queries, status_code):
+        if not self.recording:
+            return
+        self.recorded += 1
+        samples = self.samples[endpoint]
+        samples.latencies.append(seconds)
+        samples.queries.append(queries)
+        samples.errors += int(status_code >= 400)
+
+    def load_catalog(self):
+        profiles = UserProfile.objects.filter(user_id__startswith=self.prefix).order_by('user_id')
+        if self.users:
+            profiles = profiles[:self.users]
+        profiles = list(profiles)
+        exercises = list(Exercise.objects.filter(is_cardio=False).values_list('pk', flat=True)[:200])
+        names = FoodItem.objects.filter(is_custom=False).values_list('name', flat=True)[:500]
+        words = sorted({word.lower() for name in names for word in name.split() if len(word) >= 4})
+        return profiles, exercises, words
+
+    def play(self, rng, sessions, profiles, catalog):
+        """Replay one randomly chosen scenario as a random user"""
+        profile = rng.choice(profiles)
+        session = sessions.get(profile.user_id)
+        if session is None:
+            session = sessions[profile.user_id] = Session(self, profile)
+        name = rng.choices(self.names, cum_weights=self.cum_weights)[0]
+        self.scenarios[name][0](session, rng, catalog)
+        return name
+
+    def run(self):
+        """Run the benchmark and return its report"""
+        rng = random.Random(self.seed)
+        profiles, exercises, words = self.load_catalog()
+        if not profiles:
+            raise ValueError(f'No users with prefix "{self.prefix}"; run generate_dataset first')
+        catalog = SimpleNamespace(exercises=exercises, food_words=words or ['chicken'])
+        sessions = {}
+        scenario_counts = defaultdict(int)
+
+        report = None
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), \
+                    transaction.atomic():
+                for _ in range(self.warmup):
+                    self.play(rng, sessions, profiles, catalog)
+                self.recording = True
+                started = time.perf_counter()
+                while self.recorded < self.requests:
+                    scenario_counts[self.play(rng, sessions, profiles, catalog)] += 1
+                elapsed = time.perf_counter() - started
+                report = self.report(elapsed, scenario_counts, len(profiles))
+                raise Rollback
+        except Rollback:
+            pass
+        return report
+
+    def report(self, elapsed, scenario_counts, user_count):
+        endpoints = {
+            endpoint: summarize(samples.latencies, samples.queries, samples.errors)
+            for endpoint, samples in sorted(self.samples.items())
+        }
+        total = summarize(
+            [value for samples in self.samples.values() for value in samples.latencies],
+            [value for samples in self.samples.values() for value in samples.queries],
+            sum(samples.errors for samples in self.samples.values()),
+        )
+        total['seconds'] = round(elapsed, 3)
+        total['requests_per_second'] = round(total['count'] / elapsed, 2) if elapsed else None
+        return {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'requests': self.requests,
+                'warmup': self.warmup,
+                'seed': self.seed,
+                'users': user_count,
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'scenarios': dict(sorted(scenario_counts.items())),
+            'endpoints': endpoints,
+            'total': total,
+        }
+
+
+def compare(report, baseline):
+    """
+    Per-endpoint change against a baseline report:
+    (endpoint, baseline p50, p50, baseline p95, p95, change of p95, flag)
+    """
+    rows = []
+    for endpoint, stats in report['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(endpoint)
+        if before is None:
+            rows.append((endpoint, None, stats['p50_ms'], None, stats['p95_ms'], None, 'new'))
+            continue
+        change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+        flag = ''
+        if change > REGRESSION_THRESHOLD:
+            flag = 'slower'
+        elif change < -REGRESSION_THRESHOLD:
+            flag = 'faster'
+        if stats['mean_queries'] > before['mean_queries']:
+            flag = (flag + ' more queries').strip()
+        rows.append((endpoint, before['p50_ms'], stats['p50_ms'], before['p95_ms'], stats['p95_ms'], change, flag))
+    return rows
+
+
+def load_report(path):
+    with open(path) as report_file:
+        return json.load(report_file)
@@ -0,0 +1,239 @@
+"""
+Per-process cache of the reference catalogs.
+
+Exercises, food categories, meal types and verified foods change rarely but
+are read on almost every screen. Their list responses (and the catalog bundle
+of api.catalog_sync) are cached here already serialized, one entry per catalog
+and filter combination, together with an ETag derived from the content so
+clients can revalidate with If-None-Match and get a 304.
+
+Every catalog has a version counter in CatalogVersion, bumped in the same
+transaction as any write to its rows that cached data may hold (see
+PRIVATE_ROWS_UNCACHED): model saves and deletes through api.signals,
+seeding through api.upsert. An entry is only served while the
+version it was built at is still current. Writes made by this process drop
+its entries at once; versions bumped by other processes are picked up the
+next time the stored versions are read, at most CATALOG_CACHE_TTL seconds
+later. In steady state a catalog list costs no database queries.
+
+Every write also logs the public rows it touched in CatalogChange at the new
+version, which is what clients sync from (see api.catalog_sync).
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.models import CatalogChange, CatalogVersion
+
+# Catalog name of each cached model, by model label
+CATALOGS = {
+    'workouts.Exercise': 'exercises',
+    'nutrition.FoodCategory': 'food_categories',
+    'nutrition.MealType': 'meal_types',
+    'nutrition.FoodItem': 'foods',
+}
+
+# Rows that belong to a single user rather than to the shared catalog; writes
+# to them are not logged for syncing
+PRIVATE_ROWS = {
+    'workouts.Exercise': lambda exercise: exercise.is_custom,
+    'nutrition.FoodItem': lambda food: food.is_custom and not food.is_verified,
+}
+
+# Catalogs whose cached data never holds their private rows (only verified
+# foods are cached), so writes to private rows alone leave the version and
+# the cache untouched rather than locking the version row of every user's
+# writes. Custom exercises are listed with the catalog and still bump it.
+PRIVATE_ROWS_UNCACHED = {'nutrition.FoodItem'}
+
+
+def content_hash(data):
+    """Hex digest of serialized data; equal content gives equal hashes in every process"""
+    body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+
+
+def content_etag(data):
+    """Strong ETag of serialized data"""
+    return quote_etag(content_hash(data))
+
+
+def stored_versions():
+    """Current version of every catalog, read now"""
+    return dict(CatalogVersion.objects.values_list('name', 'version'))
+
+
+class CatalogEntry:
+    """Data built from `catalogs` as of their `version`"""
+
+    __slots__ = ('catalogs', 'version', 'data', '_etag')
+
+    def __init__(self, catalogs, version, data):
+        self.catalogs = catalogs
+        self.version = version
+        self.data = data
+        self._etag = None
+
+    @property
+    def etag(self):
+        """ETag of serialized data, computed on first use"""
+        if self._etag is None:
+            self._etag = content_etag(self.data)
+        return self._etag
+
+
+class CatalogCache:
+    """Bounded LRU of CatalogEntries checked against the stored catalog versions"""
+
+    def __init__(self, max_size=256, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def versions(self):
+        """Current version of every catalog, read from the database at most every ttl seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.ttl:
+                return self._versions
+        versions = stored_versions()
+        with self._lock:
+            self._versions = versions
+            self._checked_at = now
+        return versions
+
+    def get(self, catalog, key, build, depends=None):
+        """
+        The entry of a catalog for a key, calling build() for the data when no
+        entry of the current version is cached. Data built from several
+        catalogs names them in `depends`. Besides serialized lists, entries
+        may hold structures derived from a catalog, such as a search index.
+        """
+        catalogs = tuple(depends or (catalog,))
+        versions = self.versions()
+        version = tuple(versions.get(name, 0) for name in catalogs)
+        with self._lock:
+            entry = self._entries.get((catalog, key))
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end((catalog, key))
+                return entry
+        data = build()
+        entry = CatalogEntry(catalogs, version, data)
+        if self.max_size <= 0:
+            return entry
+        with self._lock:
+            self._entries[(catalog, key)] = entry
+            self._entries.move_to_end((catalog, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, catalog):
+        """Drop the entries built from a catalog and re-read the stored versions on next use"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if catalog in entry.catalogs]:
+                del self._entries[key]
+            self._checked_at = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions = {}
+            self._checked_at = None
+
+
+catalog_cache = CatalogCache(
+    max_size=getattr(settings, 'CATALOG_CACHE_SIZE', 256),
+    ttl=getattr(settings, 'CATALOG_CACHE_TTL', 30),
+)
+
+
+def bump_catalog_version(catalog):
+    """
+    Increment a catalog's stored version, creating its row on first write, and
+    return the new version. The updated row stays locked until the write
+    commits, so versions of a catalog become visible in order.
+    """
+    rows = CatalogVersion.objects.filter(name=catalog)
+    if not rows.update(version=F('version') + 1, updated_at=timezone.now()):
+        try:
+            with transaction.atomic():
+                return CatalogVersion.objects.create(name=catalog, version=1).version
+        except IntegrityError:
+            # Another writer created the row first
+            rows.update(version=F('version') + 1, updated_at=timezone.now())
+    return rows.values_list('version', flat=True).get()
+
+
+def catalog_changed(model, instances=()):
+    """
+    Record a write to `instances` of `model`, if it is a catalog: bump the
+    catalog's version and log the public rows among them at that version.
+    Cached entries are dropped now and again once the write commits, since a
+    concurrent request may cache the old rows before then. Writes to private
+    rows only of a catalog in PRIVATE_ROWS_UNCACHED are not recorded at all.
+    """
+    label = model._meta.label
+    catalog = CATALOGS.get(label)
+    if catalog is None:
+        return
+    private = PRIVATE_ROWS.get(label)
+    public = [instance for instance in instances if private is None or not private(instance)]
+    if instances and not public and label in PRIVATE_ROWS_UNCACHED:
+        return
+    version = bump_catalog_version(catalog)
+    CatalogChange.objects.bulk_create([
+        CatalogChange(catalog=catalog, version=version, object_id=str(instance.pk))
+        for instance in public
+    ])
+    catalog_cache.invalidate(catalog)
+    transaction.on_commit(lambda: catalog_cache.invalidate(catalog))
+
+
+def catalog_response(request, entry):
+    """The data of a cache entry with its ETag, or an empty 304 if the client has it"""
+    headers = {'ETag': entry.etag}
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if entry.etag in if_none_match or '*' in if_none_match:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(entry.data, headers=headers)
+
+
+class CachedCatalogMixin:
+    """
+    Serve a ReadOnlyModelViewSet's list from the catalog cache, with an ETag.
+
+    Set `catalog` to the catalog name; override catalog_key() to return a
+    hashable key of the filters in effect, or None to skip the cache.
+    """
+    catalog = None
+
+    def catalog_key(self):
+        return ()
+
+    def list(self, request, *args, **kwargs):
+        key = self.catalog_key()
+        if key is None:
+            return super().list(request, *args, **kwargs)
+        return catalog_response(request, catalog_cache.get(self.catalog, key, self.build_catalog))
+
+    def build_catalog(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        return list(self.get_serializer(queryset, many=True).data)
@@ -0,0 +1,115 @@
+"""
+Catalog bundles and delta sync for clients holding a local copy.
+
+The bundle carries every public row of the synced catalogs in a compact
+columnar form, the catalog version it was built at and a hash of its rows:
+
+    {"version": "12.3.4.57", "hash": "...",
+     "catalogs": {"exercises": {"fields": ["id", ...], "rows": [[...], ...]}, ...}}
+
+A client stores it and later asks for what changed since its version. The
+delta lists the changed rows whole, in the same form, the ids of rows that
+left a catalog and the version to ask from next. The version is the
+CatalogVersion of each catalog in SYNCED order, joined by dots; the rows
+changed in between are read from CatalogChange (see api.catalog). Rows are
+read after the version, so a row may be sent again in the next delta, which
+a client applying upserts by id handles naturally.
+"""
+import operator
+from functools import reduce
+
+from django.db.models import Q
+
+from api.catalog import catalog_cache, content_hash, stored_versions
+from api.models import CatalogChange
+from api.nutrition.models import FoodCategory, FoodItem, MealType
+from workouts.models import Exercise
+
+SYNCED = ['exercises', 'food_categories', 'meal_types', 'foods']
+
+# Public rows of each catalog and the fields clients receive
+CATALOG_ROWS = {
+    'exercises': (
+        lambda: Exercise.objects.filter(is_custom=False),
+        ['id', 'name', 'description', 'muscle_group', 'is_cardio', 'equipment_needed',
+         'difficulty_level', 'illustration', 'video_url'],
+    ),
+    'food_categories': (
+        lambda: FoodCategory.objects.all(),
+        ['id', 'name', 'description'],
+    ),
+    'meal_types': (
+        lambda: MealType.objects.all(),
+        ['id', 'name', 'order'],
+    ),
+    'foods': (
+        lambda: FoodItem.objects.filter(is_verified=True),
+        ['id', 'name', 'brand', 'category', 'serving_size', 'serving_unit', 'calories',
+         'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium', 'barcode'],
+    ),
+}
+
+
+def format_version(versions):
+    return '.'.join(str(versions.get(catalog, 0)) for catalog in SYNCED)
+
+
+def parse_version(value):
+    """Per-catalog versions of a version string; ValueError if it is malformed"""
+    parts = value.split('.')
+    if len(parts) != len(SYNCED):
+        raise ValueError(f"version must have {len(SYNCED)} dot-separated numbers")
+    versions = {}
+    for catalog, part in zip(SYNCED, parts):
+        if not part.isdigit():
+            raise ValueError(f"version must have {len(SYNCED)} dot-separated numbers")
+        versions[catalog] = int(part)
+    return versions
+
+
+def _rows(catalog, ids=None):
+    queryset, fields = CATALOG_ROWS[catalog]
+    queryset = queryset()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    return {'fields': fields, 'rows': [list(row) for row in queryset.values_list(*fields)]}
+
+
+def build_bundle():
+    """Every synced catalog as of the current version, with a hash of its rows"""
+    version = format_version(stored_versions())
+    catalogs = {catalog: _rows(catalog) for catalog in SYNCED}
+    return {'version': version, 'hash': content_hash(catalogs), 'catalogs': catalogs}
+
+
+def catalog_bundle():
+    """The cached bundle entry; rebuilt once any synced catalog changes"""
+    return catalog_cache.get('bundle', (), build_bundle, depends=SYNCED)
+
+
+def catalog_delta(since):
+    """
+    Rows changed since the `since` versions. `reset` is set, with no rows,
+    when the client is ahead of the server (e.g. its bundle came from another
+    database) and must download the bundle again.
+    """
+    current = stored_versions()
+    if any(version > current.get(catalog, 0) for catalog, version in since.items()):
+        return {'version': format_version(current), 'reset': True, 'catalogs': {}}
+
+    changed = {}
+    behind = [catalog for catalog in SYNCED if current.get(catalog, 0) > since[catalog]]
+    if behind:
+        changes = CatalogChange.objects.filter(reduce(operator.or_, (
+            Q(catalog=catalog, version__gt=since[catalog]) for catalog in behind
+        ))).values_list('catalog', 'object_id').distinct()
+        for catalog, object_id in changes:
+            changed.setdefault(catalog, set()).add(object_id)
+
+    catalogs = {}
+    for catalog, ids in changed.items():
+        data = _rows(catalog, ids)
+        present = {str(row[0]) for row in data['rows']}
+        data['deleted'] = sorted(ids - present)
+        catalogs[catalog] = data
+    return {'version': format_version(current), 'reset': False, 'catalogs': catalogs}
@@ -0,0 +1,129 @@
+"""
+Streaming CSV and NDJSON exports.
+
+Export views pick the format by content negotiation, as either ?format=csv
+or ?format=ndjson or an Accept header. They return export_response(), which
+streams rows from a chunked queryset .iterator() as they are encoded, so
+memory use stays flat however much history a user has:
+
+    rows = queryset.values_list(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return export_response(request, 'workouts', columns, rows)
+
+Responses that are not exports, such as errors, go through the same
+renderers and come out as a one-row CSV or a single JSON line.
+"""
+import csv
+from datetime import date, datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+# Rows fetched from the database per round trip
+EXPORT_CHUNK_SIZE = 2000
+
+# Encoded rows are buffered and sent in pieces of about this many bytes
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def _buffered(lines):
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= STREAM_BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def csv_lines(columns, rows):
+    """A header line, then one CSV line per row (a sequence of column values)"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(records):
+    """One JSON document per line for each record (a dict)"""
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for record in records:
+        yield encoder.encode(record) + '\n'
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, dict):
+            data = {'detail': data}
+        return ''.join(csv_lines(list(data), [[str(value) for value in data.values()]])).encode()
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return ''.join(ndjson_lines([data])).encode()
+
+
+EXPORT_RENDERERS = [CSVRenderer, NDJSONRenderer]
+
+
+def parse_export_range(request):
+    """
+    The optional `start` and `end` (YYYY-MM-DD) bounds of an export, either
+    of which may be None. Raises ValueError with a message for the client.
+    """
+    bounds = []
+    for param in ('start', 'end'):
+        value = request.query_params.get(param)
+        try:
+            bounds.append(datetime.strptime(value, '%Y-%m-%d').date() if value else None)
+        except ValueError:
+            raise ValueError('Invalid date format. Use YYYY-MM-DD')
+    start_date, end_date = bounds
+    if start_date and end_date and start_date > end_date:
+        raise ValueError('start must not be after end')
+    return start_date, end_date
+
+
+def export_response(request, name, columns, rows=None, records=None):
+    """
+    Stream an export in the negotiated format as an attachment.
+
+    CSV is written from `rows`, tuples in `columns` order. NDJSON is written
+    from `records`, dicts that may nest, or from `rows` zipped with `columns`
+    when no records are given. Both are consumed lazily.
+    """
+    renderer = request.accepted_renderer
+    if renderer.format == 'csv':
+        lines = csv_lines(columns, rows)
+    else:
+        if records is None:
+            records = (dict(zip(columns, row)) for row in rows)
+        lines = ndjson_lines(records)
+
+    response = StreamingHttpResponse(_buffered(lines), content_type=f'{renderer.media_type}; charset=utf-8')
+    filename = f'{name}-{date.today().isoformat()}.{renderer.format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
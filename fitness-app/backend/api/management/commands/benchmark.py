@@ -0,0 +1,81 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import SCENARIOS, BenchmarkRunner, compare, load_report
+
+
+def _format_ms(value):
+    return '-' if value is None else f'{value:.1f}'
+
+
+class Command(BaseCommand):
+    help = 'Replay weighted API scenarios in-process and report latency, throughput and queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Number of measured requests')
+        parser.add_argument('--warmup', type=int, default=50, help='Unmeasured scenarios run first')
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios', choices=sorted(SCENARIOS),
+            help='Only replay this scenario (may be repeated)'
+        )
+        parser.add_argument('--prefix', default='synthetic-', help='User ID prefix of the dataset users')
+        parser.add_argument('--users', type=int, help='Only act as the first N dataset users')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the scenario mix')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--baseline', help='JSON report of an earlier run to compare against')
+
+    def handle(self, *args, **options):
+        if options['requests'] <= 0:
+            raise CommandError('--requests must be positive')
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = load_report(options['baseline'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read baseline: {e}')
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING(
+                'DEBUG is on: every query is also logged, which inflates latencies'
+            ))
+
+        runner = BenchmarkRunner(
+            requests=options['requests'],
+            scenarios=options['scenarios'],
+            prefix=options['prefix'],
+            users=options['users'],
+            seed=options['seed'],
+            warmup=options['warmup'],
+        )
+        try:
+            report = runner.run()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'{"endpoint":<40} {"count":>6} {"p50":>8} {"p95":>8} {"p99":>8} {"queries":>8}')
+        for endpoint, stats in report['endpoints'].items():
+            self.stdout.write(
+                f'{endpoint:<40} {stats["count"]:>6} {stats["p50_ms"]:>8.1f} {stats["p95_ms"]:>8.1f} '
+                f'{stats["p99_ms"]:>8.1f} {stats["mean_queries"]:>8.1f}'
+            )
+        total = report['total']
+        self.stdout.write(
+            f'{total["count"]} requests in {total["seconds"]:.1f}s, '
+            f'{total["requests_per_second"]:.1f} requests/s, {total["errors"]} errors'
+        )
+
+        if baseline is not None:
+            self.stdout.write('')
+            self.stdout.write(f'{"endpoint":<40} {"p50":>15} {"p95":>15} {"change":>8}')
+            for endpoint, p50_before, p50, p95_before, p95, change, flag in compare(report, baseline):
+                change = '-' if change is None else f'{change:+.0%}'
+                self.stdout.write(
+                    f'{endpoint:<40} {_format_ms(p50_before):>6} -> {_format_ms(p50):>5} '
+                    f'{_format_ms(p95_before):>6} -> {_format_ms(p95):>5} {change:>8} {flag}'
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
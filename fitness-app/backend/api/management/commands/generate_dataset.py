@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import UserProfile
+from api.synthetic import DatasetGenerator
+from workouts.models import Exercise
+
+
+class Command(BaseCommand):
+    help = 'Generate a reproducible synthetic dataset of users, workouts and meal logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of users to generate')
+        parser.add_argument('--years', type=float, default=2.0, help='Years of history per user')
+        parser.add_argument('--foods', type=int, default=5000, help='Size of the shared food catalog')
+        parser.add_argument('--custom-foods', type=int, default=5, help='Custom foods per user')
+        parser.add_argument('--favorites', type=int, default=10, help='Favorite foods per user')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument(
+            '--prefix', default='synthetic-',
+            help='User ID prefix; generated users are <prefix><6-digit index>'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Number of rows buffered before they are inserted'
+        )
+
+    def handle(self, *args, **options):
+        for option in ('users', 'foods', 'custom_foods', 'favorites', 'batch_size'):
+            if options[option] < 0:
+                raise CommandError(f'--{option.replace("_", "-")} must not be negative')
+        if options['years'] <= 0:
+            raise CommandError('--years must be positive')
+        if not Exercise.objects.filter(is_custom=False).exists():
+            raise CommandError('No exercises found. Run seed_exercises first')
+
+        generator = DatasetGenerator(
+            users=options['users'],
+            years=options['years'],
+            foods=options['foods'],
+            custom_foods=options['custom_foods'],
+            favorites=options['favorites'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            batch_size=max(options['batch_size'], 1),
+            stdout=self.stdout,
+        )
+        existing = UserProfile.objects.filter(user_id__in=generator.user_ids()[:1]).exists()
+        if existing:
+            raise CommandError(
+                f'Users with prefix "{options["prefix"]}" already exist. Use another --prefix'
+            )
+
+        started = time.perf_counter()
+        written = generator.generate()
+        elapsed = time.perf_counter() - started
+        for model, count in written.items():
+            self.stdout.write(f'{model}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {sum(written.values())} rows in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,284 @@
+"""
+Per-request performance metrics and their Prometheus export.
+
+MetricsMiddleware times every request and, labelled by method and view name,
+records:
+
+    http_requests_total                   requests by status code
+    http_request_duration_seconds         end-to-end latency
+    http_request_db_queries               SQL queries issued
+    http_request_db_seconds               time spent executing SQL
+    http_request_serializer_seconds       time spent rendering the response data
+    http_response_bytes                   size of non-streaming responses
+
+Metrics live in process memory; with several worker processes every worker
+exports its own series and Prometheus aggregates them. /metrics renders the
+text exposition format to scrapers sending METRICS_TOKEN as a Bearer token;
+without a configured token it refuses every request.
+"""
+import bisect
+import contextvars
+import hmac
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# View name label for requests that did not resolve to a view
+UNMATCHED = 'unmatched'
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, label_values, value) for label_values, value in self._values.items()]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # per-bucket counts (last one is +Inf), sum, count
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = [
+                (label_values, list(counts), total, count)
+                for label_values, (counts, total, count) in self._series.items()
+            ]
+        samples = []
+        for label_values, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                samples.append((f'{self.name}_bucket', label_values + (('le', _format_value(bound)),), cumulative))
+            samples.append((f'{self.name}_sum', label_values, total))
+            samples.append((f'{self.name}_count', label_values, count))
+        return samples
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """collector() returns (name, type, help, [(labels dict, value), ...]) tuples"""
+        self.collectors.append(collector)
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+    def render(self):
+        """The registry in Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self.metrics:
+            kind = 'histogram' if isinstance(metric, Histogram) else 'counter'
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {kind}')
+            for name, label_values, value in metric.samples():
+                labels = _zip_labels(metric.labels, label_values)
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for collector in self.collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(list(labels.items()))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _zip_labels(names, label_values):
+    """Label pairs; histogram bucket samples carry an extra ('le', bound) pair"""
+    pairs = list(zip(names, label_values[:len(names)]))
+    pairs.extend(label_values[len(names):])
+    return pairs
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+REQUEST_LABELS = ('method', 'view')
+
+requests_total = registry.counter(
+    'http_requests_total', 'HTTP requests handled.', REQUEST_LABELS + ('status',)
+)
+request_duration = registry.histogram(
+    'http_request_duration_seconds', 'End-to-end request latency.', REQUEST_LABELS
+)
+request_queries = registry.histogram(
+    'http_request_db_queries', 'SQL queries issued per request.', REQUEST_LABELS,
+    buckets=QUERY_COUNT_BUCKETS,
+)
+request_db_time = registry.histogram(
+    'http_request_db_seconds', 'Time spent executing SQL per request.', REQUEST_LABELS
+)
+request_serializer_time = registry.histogram(
+    'http_request_serializer_seconds', 'Time spent rendering response data per request.',
+    REQUEST_LABELS,
+)
+response_size = registry.histogram(
+    'http_response_bytes', 'Size of non-streaming response bodies.', REQUEST_LABELS,
+    buckets=SIZE_BUCKETS,
+)
+
+
+class RequestMetrics:
+    """Measurements of the request being handled, shared with the hooks below"""
+
+    __slots__ = ('queries', 'query_seconds', 'serializer_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serializer_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper counting and timing every query"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - started
+
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match and match.view_name else UNMATCHED
+        if view == 'metrics':
+            return response
+
+        labels = (request.method, view)
+        requests_total.inc(labels + (str(response.status_code),))
+        request_duration.observe(labels, duration)
+        request_queries.observe(labels, metrics.queries)
+        request_db_time.observe(labels, metrics.query_seconds)
+        request_serializer_time.observe(labels, metrics.serializer_seconds)
+        if not response.streaming:
+            response_size.observe(labels, len(response.content))
+        return response
+
+    def process_template_response(self, request, response):
+        """Render DRF responses here so the time their renderer takes is recorded"""
+        metrics = _current.get()
+        if metrics is None:
+            return response
+        started = time.perf_counter()
+        try:
+            return response.render()
+        finally:
+            metrics.serializer_seconds += time.perf_counter() - started
+
+
+def _verifier_collector():
+    from api.auth.dispatch import get_verifier_stats
+
+    stats = get_verifier_stats()
+    return [
+        ('auth_verifier_calls_total', 'counter', 'Authentication verifier calls.',
+         [({'verifier': name}, values['calls']) for name, values in stats.items()]),
+        ('auth_verifier_failures_total', 'counter', 'Authentication verifier rejections.',
+         [({'verifier': name}, values['failures']) for name, values in stats.items()]),
+        ('auth_verifier_seconds_total', 'counter', 'Time spent in authentication verifiers.',
+         [({'verifier': name}, values['total_seconds']) for name, values in stats.items()]),
+    ]
+
+
+registry.register_collector(_verifier_collector)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, closed unless METRICS_TOKEN is set"""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not hmac.compare_digest(authorization, f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_catalog_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('catalog', models.CharField(max_length=50)),
+                ('version', models.BigIntegerField()),
+                ('object_id', models.CharField(max_length=64)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['catalog', 'version'], name='api_catalog_catalog_111a44_idx')],
+            },
+        ),
+    ]
@@ -58,3 +58,32 @@ class UserSettings(models.Model):
     
     def __str__(self):
         return f"Settings for {self.user_id}"
+
+class CatalogVersion(models.Model):
+    """
+    Change counter of a reference catalog (exercises, food categories, meal
+    types, foods), bumped whenever its rows are written. See api.catalog.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+class CatalogChange(models.Model):
+    """
+    A catalog row written (or deleted) at a catalog version, read by clients
+    syncing their copy of the catalogs. See api.catalog_sync.
+    """
+    catalog = models.CharField(max_length=50)
+    version = models.BigIntegerField()
+    object_id = models.CharField(max_length=64)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['catalog', 'version']),
+        ]
+    
+    def __str__(self):
+        return f"{self.catalog} v{self.version}: {self.object_id}"
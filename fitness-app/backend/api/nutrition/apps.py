@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class NutritionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api.nutrition'
-    label = 'nutrition' 
\ No newline at end of file
+    label = 'nutrition'
+
+    def ready(self):
+        from . import signals  # noqa: F401
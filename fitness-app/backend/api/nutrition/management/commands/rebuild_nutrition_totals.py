@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.nutrition.totals import rebuild_totals
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}". Use YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily nutrition totals from meal entries for a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First date to rebuild (YYYY-MM-DD), default: earliest')
+        parser.add_argument('--end', help='Last date to rebuild (YYYY-MM-DD), default: latest')
+        parser.add_argument(
+            '--user', action='append', dest='users',
+            help='Only rebuild this user ID (may be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        start = _parse_date(options['start']) if options['start'] else None
+        end = _parse_date(options['end']) if options['end'] else None
+        if start and end and start > end:
+            raise CommandError('--start must not be after --end')
+
+        count = rebuild_totals(start, end, user_ids=options['users'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} daily totals'))
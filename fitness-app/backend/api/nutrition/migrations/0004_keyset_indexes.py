@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0003_mealtype_nutritiongoal_mealentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(fields=['name', 'id'], name='nutrition_f_name_bea996_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mealentry',
+            index=models.Index(fields=['user_id', '-date', 'time', 'id'], name='nutrition_m_user_id_90f592_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfooditem',
+            index=models.Index(fields=['user_id', '-created_at', 'id'], name='nutrition_u_user_id_c7730c_idx'),
+        ),
+    ]
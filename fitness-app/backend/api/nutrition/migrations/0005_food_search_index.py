@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:30
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def index_existing_foods(apps, schema_editor):
+    # Frozen copy of the api.nutrition.search tokenizer as of this migration
+    token_re = re.compile(r'[a-z0-9]+')
+
+    def tokenize(text):
+        text = unicodedata.normalize('NFKD', text or '')
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+        return [token[:64] for token in token_re.findall(text.lower())]
+
+    def index_terms(name, brand):
+        terms = set()
+        for word in tokenize(name) + tokenize(brand):
+            terms.add(('w', word))
+            terms.update(('t', word[index:index + 3]) for index in range(len(word) - 2))
+        return terms
+
+    FoodItem = apps.get_model('nutrition', 'FoodItem')
+    FoodSearchTerm = apps.get_model('nutrition', 'FoodSearchTerm')
+    batch = []
+    for food_id, name, brand in FoodItem.objects.values_list('pk', 'name', 'brand').iterator():
+        batch.extend(
+            FoodSearchTerm(food_item_id=food_id, kind=kind, term=term)
+            for kind, term in index_terms(name, brand)
+        )
+        if len(batch) >= 2000:
+            FoodSearchTerm.objects.bulk_create(batch)
+            batch = []
+    FoodSearchTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('w', 'Word'), ('t', 'Trigram')], max_length=1)),
+                ('term', models.CharField(max_length=64)),
+                ('food_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='nutrition.fooditem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'term', 'food_item'], name='nutrition_f_kind_4fdd81_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_foods, migrations.RunPython.noop),
+    ]
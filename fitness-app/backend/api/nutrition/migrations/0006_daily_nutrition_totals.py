@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:32
+
+import uuid
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+NUTRIENT_FIELDS = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium')
+
+
+def backfill_daily_totals(apps, schema_editor):
+    MealEntry = apps.get_model('nutrition', 'MealEntry')
+    DailyNutritionTotals = apps.get_model('nutrition', 'DailyNutritionTotals')
+    rows = MealEntry.objects.order_by().values('user_id', 'date').annotate(
+        entry_count=Count('id'),
+        **{field: Sum(field) for field in NUTRIENT_FIELDS},
+    )
+    DailyNutritionTotals.objects.bulk_create(
+        [
+            DailyNutritionTotals(
+                user_id=row['user_id'],
+                date=row['date'],
+                entry_count=row['entry_count'],
+                **{field: row[field] or 0 for field in NUTRIENT_FIELDS},
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0005_food_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyNutritionTotals',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('user_id', models.CharField(max_length=255)),
+                ('date', models.DateField()),
+                ('entry_count', models.IntegerField(default=0)),
+                ('calories', models.IntegerField(default=0)),
+                ('protein', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('carbs', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('fat', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('fiber', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('sugar', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('sodium', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily nutrition totals',
+                'ordering': ['user_id', 'date'],
+                'unique_together': {('user_id', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_totals, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,5 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 class FoodCategory(models.Model):
@@ -54,6 +54,8 @@ class FoodItem(models.Model):
         indexes = [
             models.Index(fields=['name']),
             models.Index(fields=['barcode']),
+            # Keyset pagination
+            models.Index(fields=['name', 'id']),
         ]
     
     def __str__(self):
@@ -61,6 +63,31 @@ class FoodItem(models.Model):
             return f"{self.name} ({self.brand})"
         return self.name
 
+class FoodSearchTerm(models.Model):
+    """
+    Inverted index of food names and brands used by food search
+    (see api/nutrition/search.py). Words are stored whole for exact and
+    prefix matching; trigrams of each word support substring matching.
+    """
+    WORD = 'w'
+    TRIGRAM = 't'
+    KIND_CHOICES = [
+        (WORD, 'Word'),
+        (TRIGRAM, 'Trigram'),
+    ]
+    
+    food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE, related_name='search_terms')
+    kind = models.CharField(max_length=1, choices=KIND_CHOICES)
+    term = models.CharField(max_length=64)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'term', 'food_item']),
+        ]
+    
+    def __str__(self):
+        return f"{self.term} -> {self.food_item_id}"
+
 class UserFoodItem(models.Model):
     """
     Custom food items created by users
@@ -78,6 +105,10 @@ class UserFoodItem(models.Model):
     class Meta:
         unique_together = ['user_id', 'food_item']
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of a user's foods
+            models.Index(fields=['user_id', '-created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.food_item.name} - {self.user_id}"
@@ -164,6 +195,8 @@ class MealEntry(models.Model):
         indexes = [
             models.Index(fields=['user_id', 'date']),
             models.Index(fields=['meal_type']),
+            # Keyset pagination of a user's entries (MealEntryViewSet.ordering)
+            models.Index(fields=['user_id', '-date', 'time', 'id']),
         ]
     
     def __str__(self):
@@ -186,4 +219,36 @@ class MealEntry(models.Model):
         if not self.sodium:
             self.sodium = self.food_item.sodium * self.servings
         
-        super().save(*args, **kwargs)
+        # Daily totals are updated by post_save handlers (api.nutrition.signals);
+        # keep them in the same transaction as the entry itself
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class DailyNutritionTotals(models.Model):
+    """
+    Pre-summed nutrition of a user's meal entries for one day, maintained as
+    entries are created, updated and deleted (see api/nutrition/totals.py)
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user_id = models.CharField(max_length=255)  # Match to user ID
+    date = models.DateField()
+    
+    entry_count = models.IntegerField(default=0)
+    calories = models.IntegerField(default=0)
+    protein = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # in grams
+    carbs = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # in grams
+    fat = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # in grams
+    fiber = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # in grams
+    sugar = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # in grams
+    sodium = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # in mg
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Daily nutrition totals"
+        unique_together = ['user_id', 'date']
+        ordering = ['user_id', 'date']
+    
+    def __str__(self):
+        return f"Nutrition totals - {self.user_id} - {self.date}"
@@ -0,0 +1,248 @@
+"""
+Indexed food search.
+
+Food names and brands are tokenized into an inverted index (FoodSearchTerm):
+one row per distinct word and one per distinct trigram of each word. A query
+is answered by index range scans for word prefixes of its tokens, falling
+back to trigram intersection for substring matches; digit queries match
+barcodes by prefix. Candidates are fetched favorites first, then verified,
+then shortest name, so the bounded candidate set holds the rows the boosts
+favour, and are then ranked in Python:
+
+    exact name > name prefix > word match > word prefix > substring
+
+with verified foods and the user's favorites boosted. The index is kept up to
+date by the FoodItem signal handlers in api.nutrition.signals.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.db.models.functions import Length
+
+from .models import FoodItem, FoodSearchTerm, UserFoodItem
+
+# Longest indexed term; longer words are truncated on both index and query side
+MAX_TERM_LENGTH = 64
+
+# Candidate rows fetched from the index before ranking
+CANDIDATE_LIMIT = 200
+
+# Order in which candidates are fetched: the boosted rows first, then the
+# shortest names, which hold the exact and prefix matches
+CANDIDATE_ORDER = ('-favorite', '-is_verified', 'name_length', 'name', 'pk')
+
+# Queries made of digits this long are treated as barcodes
+MIN_BARCODE_LENGTH = 6
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Ranking weights
+EXACT_NAME = 1000
+NAME_PREFIX = 600
+NAME_WORD = 120
+NAME_WORD_PREFIX = 80
+NAME_SUBSTRING = 30
+BRAND_WORD = 50
+BRAND_WORD_PREFIX = 35
+BRAND_SUBSTRING = 15
+VERIFIED_BOOST = 50
+FAVORITE_BOOST = 100
+
+
+def normalize(text):
+    """Lowercase and strip accents so 'Crème Brûlée' matches 'creme brulee'"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(_TOKEN_RE.findall(text.lower()))
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH] for token in _TOKEN_RE.findall(normalize(text))]
+
+
+def trigrams(word):
+    return {word[index:index + 3] for index in range(len(word) - 2)}
+
+
+def index_terms(name, brand):
+    """All (kind, term) pairs indexed for a food with the given name and brand"""
+    terms = set()
+    for word in tokenize(name) + tokenize(brand):
+        terms.add((FoodSearchTerm.WORD, word))
+        terms.update((FoodSearchTerm.TRIGRAM, gram) for gram in trigrams(word))
+    return terms
+
+
+def index_food(food_item):
+    """Replace the index rows of a single food"""
+    index_foods([food_item])
+
+
+def index_foods(food_items):
+    """Replace the index rows of several foods, e.g. after a bulk upsert that bypassed the signals"""
+    with transaction.atomic():
+        FoodSearchTerm.objects.filter(food_item__in=[food_item.pk for food_item in food_items]).delete()
+        FoodSearchTerm.objects.bulk_create([
+            FoodSearchTerm(food_item=food_item, kind=kind, term=term)
+            for food_item in food_items
+            for kind, term in index_terms(food_item.name, food_item.brand)
+        ])
+
+
+def rebuild_index(batch_size=2000, stdout=None):
+    """Rebuild the whole index, e.g. after importing a catalog with bulk_create"""
+    FoodSearchTerm.objects.all().delete()
+    foods = FoodItem.objects.order_by('pk').values_list('pk', 'name', 'brand')
+    indexed = 0
+    batch = []
+    for food_id, name, brand in foods.iterator(chunk_size=batch_size):
+        batch.extend(
+            FoodSearchTerm(food_item_id=food_id, kind=kind, term=term)
+            for kind, term in index_terms(name, brand)
+        )
+        indexed += 1
+        if len(batch) >= batch_size:
+            FoodSearchTerm.objects.bulk_create(batch)
+            batch = []
+            if stdout is not None:
+                stdout.write(f'Indexed {indexed} foods')
+    FoodSearchTerm.objects.bulk_create(batch)
+    return indexed
+
+
+def _word_candidates(queryset, tokens):
+    """
+    Foods having a word for every query token: whole-word matches first, then
+    word-prefix matches. Each token adds its own join on the index, so the
+    database intersects the posting lists.
+    """
+    exact = queryset
+    for token in tokens:
+        exact = exact.filter(
+            search_terms__kind=FoodSearchTerm.WORD,
+            search_terms__term=token,
+        )
+    candidates = list(exact.distinct().order_by(*CANDIDATE_ORDER)[:CANDIDATE_LIMIT])
+    if len(candidates) >= CANDIDATE_LIMIT:
+        return candidates
+
+    prefix = queryset
+    for token in tokens:
+        prefix = prefix.filter(
+            search_terms__kind=FoodSearchTerm.WORD,
+            search_terms__term__gte=token,
+            search_terms__term__lt=token + '\uffff',
+        )
+    prefix = prefix.exclude(pk__in=[food.pk for food in candidates])
+    return candidates + list(
+        prefix.distinct().order_by(*CANDIDATE_ORDER)[:CANDIDATE_LIMIT - len(candidates)]
+    )
+
+
+def _substring_candidates(queryset, token, exclude):
+    """Visible foods having every trigram of the token, in CANDIDATE_ORDER"""
+    grams = trigrams(token)
+    if not grams:
+        return []
+    food_ids = FoodSearchTerm.objects.filter(
+        kind=FoodSearchTerm.TRIGRAM,
+        term__in=grams,
+        food_item__in=queryset,
+    ).values('food_item').annotate(
+        matched=Count('id'),
+    ).filter(matched=len(grams)).values('food_item')
+    candidates = queryset.filter(pk__in=food_ids).exclude(pk__in=exclude)
+    return list(candidates.order_by(*CANDIDATE_ORDER)[:CANDIDATE_LIMIT])
+
+
+def _token_score(token, name, name_words, brand, brand_words):
+    if token in name_words:
+        return NAME_WORD
+    if any(word.startswith(token) for word in name_words):
+        return NAME_WORD_PREFIX
+    if token in name:
+        return NAME_SUBSTRING
+    if token in brand_words:
+        return BRAND_WORD
+    if any(word.startswith(token) for word in brand_words):
+        return BRAND_WORD_PREFIX
+    if token in brand:
+        return BRAND_SUBSTRING
+    return None
+
+
+def score(food_item, query, tokens, favorite_ids=()):
+    """Relevance of a food for a normalized query, or None if it does not match"""
+    name = normalize(food_item.name)
+    brand = normalize(food_item.brand)
+    if name == query:
+        relevance = EXACT_NAME
+    elif name.startswith(query):
+        relevance = NAME_PREFIX
+    else:
+        relevance = 0
+        name_words = name.split()
+        brand_words = brand.split()
+        for token in tokens:
+            token_score = _token_score(token, name, name_words, brand, brand_words)
+            if token_score is None:
+                return None
+            relevance += token_score
+
+    if food_item.is_verified:
+        relevance += VERIFIED_BOOST
+    if food_item.pk in favorite_ids:
+        relevance += FAVORITE_BOOST
+    return relevance
+
+
+def search_foods(user_id, query, category=None, limit=20):
+    """
+    Ranked foods visible to user_id (verified or created by them) matching query
+    """
+    queryset = FoodItem.objects.filter(
+        Q(is_verified=True) | Q(created_by=user_id)
+    ).select_related('category')
+    if category:
+        queryset = queryset.filter(category=category)
+    queryset = queryset.annotate(
+        favorite=Exists(UserFoodItem.objects.filter(
+            user_id=user_id, is_favorite=True, food_item=OuterRef('pk'),
+        )),
+        name_length=Length('name'),
+    )
+
+    normalized = normalize(query)
+    tokens = tokenize(query)
+    if not tokens:
+        return list(queryset.order_by('name', 'id')[:limit])
+
+    if normalized.isdigit() and len(normalized) >= MIN_BARCODE_LENGTH:
+        # Barcode prefix match on the barcode index, the exact barcode first
+        candidates = list(queryset.filter(barcode__startswith=normalized).order_by(
+            Length('barcode'), 'barcode', 'pk',
+        )[:limit])
+        if candidates:
+            return candidates
+
+    candidates = _word_candidates(queryset, tokens)
+    # Substring fallback on the longest, usually most selective, token
+    driver = max(tokens, key=len)
+    if len(candidates) < limit and len(driver) >= 3:
+        candidates += _substring_candidates(
+            queryset, driver, exclude=[food.pk for food in candidates]
+        )
+    if not candidates:
+        return []
+
+    favorite_ids = {food.pk for food in candidates if food.favorite}
+
+    ranked = []
+    for food_item in candidates:
+        relevance = score(food_item, normalized, tokens, favorite_ids)
+        if relevance is not None:
+            ranked.append((-relevance, len(food_item.name), food_item.name, food_item))
+    ranked.sort(key=lambda row: row[:3])
+    return [row[3] for row in ranked[:limit]]
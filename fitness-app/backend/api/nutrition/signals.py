@@ -0,0 +1,46 @@
+"""
+Keep derived nutrition tables in step with catalog and diary writes.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import search, totals
+from .models import FoodItem, MealEntry
+
+
+@receiver(post_save, sender=FoodItem)
+def update_search_index(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Reindex a food when its name or brand may have changed"""
+    if raw:
+        return
+    if update_fields is not None and not {'name', 'brand'} & set(update_fields):
+        return
+    search.index_food(instance)
+
+
+@receiver(pre_save, sender=MealEntry)
+def capture_previous_entry(sender, instance, raw=False, **kwargs):
+    """Remember the stored version of an entry so its old contribution can be removed"""
+    instance._previous_state = None
+    if raw or instance._state.adding:
+        return
+    instance._previous_state = MealEntry.objects.filter(pk=instance.pk).values(
+        'user_id', 'date', *totals.NUTRIENT_FIELDS
+    ).first()
+
+
+@receiver(post_save, sender=MealEntry)
+def update_totals_on_entry_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    if previous:
+        totals.apply_entry_delta(previous['user_id'], previous['date'], previous, sign=-1)
+    totals.apply_entry_delta(instance.user_id, instance.date, totals.entry_values(instance))
+
+
+@receiver(post_delete, sender=MealEntry)
+def update_totals_on_entry_delete(sender, instance, **kwargs):
+    totals.apply_entry_delta(
+        instance.user_id, instance.date, totals.entry_values(instance), sign=-1
+    )
@@ -0,0 +1,352 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+import json
+import uuid
+
+from .models import (
+    DailyNutritionTotals, FoodItem, FoodSearchTerm, MealEntry, MealType, NutritionGoal, UserFoodItem
+)
+from api.models import UserProfile  # Import for authentication mocking
+
+class FoodSearchTests(APITestCase):
+    """Tests for the indexed food search endpoint"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Search User",
+            email="search@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        self.url = reverse('food-search')
+    
+    def create_food(self, name, brand='', **kwargs):
+        defaults = {
+            'serving_size': 100, 'serving_unit': 'g', 'calories': 100,
+            'protein': 1, 'carbs': 1, 'fat': 1, 'is_verified': True,
+        }
+        defaults.update(kwargs)
+        return FoodItem.objects.create(name=name, brand=brand, **defaults)
+    
+    def search(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [food['name'] for food in response.data]
+    
+    def test_ranking_exact_prefix_substring(self):
+        """Exact names rank above prefixes, which rank above substrings"""
+        self.create_food('Pineapple')
+        self.create_food('Apple Pie')
+        self.create_food('Apple')
+        self.create_food('Green Apple')
+        
+        self.assertEqual(
+            self.search('apple'),
+            ['Apple', 'Apple Pie', 'Green Apple', 'Pineapple']
+        )
+    
+    def test_prefix_and_multi_word_queries(self):
+        """Partial words match as prefixes and every word must match"""
+        self.create_food('Chicken Breast', brand='Tyson')
+        self.create_food('Chicken Thigh')
+        self.create_food('Beef Brisket')
+        
+        self.assertEqual(self.search('chick'), ['Chicken Thigh', 'Chicken Breast'])
+        self.assertEqual(self.search('chicken br'), ['Chicken Breast'])
+        self.assertEqual(self.search('tyson'), ['Chicken Breast'])
+    
+    def test_visibility_and_boosts(self):
+        """Other users' custom foods are hidden; favorites and verified foods rank higher"""
+        self.create_food('Oat Milk', is_verified=False, created_by=str(uuid.uuid4()))
+        mine = self.create_food('Oat Bar', is_verified=False, created_by=self.user_id)
+        self.create_food('Oat Bran')
+        
+        self.assertEqual(self.search('oat'), ['Oat Bran', 'Oat Bar'])
+        
+        UserFoodItem.objects.create(user_id=self.user_id, food_item=mine, is_favorite=True)
+        self.assertEqual(self.search('oat'), ['Oat Bar', 'Oat Bran'])
+    
+    def test_candidate_limit_keeps_boosted_and_visible_foods(self):
+        """Candidates are cut after ordering by boosts and after the visibility filter"""
+        for name in ['Oat Alpha', 'Oat Beta', 'Oat Gamma']:
+            self.create_food(name)
+        favorite = self.create_food('Oat Zeta', is_verified=False, created_by=self.user_id)
+        UserFoodItem.objects.create(user_id=self.user_id, food_item=favorite, is_favorite=True)
+        for index in range(5):
+            self.create_food(f'Xoatmeal {index}', is_verified=False, created_by=str(uuid.uuid4()))
+        self.create_food('Oatmeal Cookie')
+        
+        with mock.patch('api.nutrition.search.CANDIDATE_LIMIT', 3):
+            self.assertEqual(self.search('oat')[0], 'Oat Zeta')
+            self.assertEqual(self.search('atmeal'), ['Oatmeal Cookie'])
+    
+    def test_index_follows_food_changes(self):
+        """Renaming or deleting a food updates the index"""
+        food = self.create_food('Yogurt')
+        self.assertEqual(self.search('yog'), ['Yogurt'])
+        
+        food.name = 'Greek Yoghurt'
+        food.save()
+        self.assertEqual(self.search('yogu'), [])
+        self.assertEqual(self.search('greek'), ['Greek Yoghurt'])
+        
+        food.delete()
+        self.assertEqual(self.search('greek'), [])
+        self.assertFalse(FoodSearchTerm.objects.exists())
+    
+    def test_barcode_and_limit(self):
+        """Digit queries match barcodes by prefix, exact first, and limit bounds the results"""
+        self.create_food('Protein Bar', barcode='0123456789012')
+        self.create_food('Protein Bar Box', barcode='01234567890123')
+        for index in range(5):
+            self.create_food(f'Rice {index}')
+        
+        self.assertEqual(self.search('0123456789012'), ['Protein Bar', 'Protein Bar Box'])
+        self.assertEqual(self.search('012345678'), ['Protein Bar', 'Protein Bar Box'])
+        self.assertEqual(self.search('99999999'), [])
+        self.assertEqual(len(self.search('rice', limit=3)), 3)
+
+
+class DailyNutritionTotalsTests(APITestCase):
+    """Tests for the maintained per-day nutrition totals"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Totals User",
+            email="totals@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        self.meal_type = MealType.objects.create(name="Lunch")
+        self.food = FoodItem.objects.create(
+            name="Rice", serving_size=100, serving_unit="g", calories=130,
+            protein=Decimal('2.70'), carbs=Decimal('28.00'), fat=Decimal('0.30'),
+            is_verified=True,
+        )
+        self.today = date.today()
+    
+    def log(self, servings=1, day=None):
+        return MealEntry.objects.create(
+            user_id=self.user_id, food_item=self.food, meal_type=self.meal_type,
+            servings=Decimal(servings), date=day or self.today,
+        )
+    
+    def totals(self, day=None):
+        return DailyNutritionTotals.objects.get(user_id=self.user_id, date=day or self.today)
+    
+    def test_totals_follow_entry_writes(self):
+        """Creating, editing, moving and deleting entries keeps the day totals exact"""
+        first = self.log(servings=1)
+        self.log(servings=2)
+        self.assertEqual(self.totals().calories, 390)
+        self.assertEqual(self.totals().entry_count, 2)
+        self.assertEqual(self.totals().protein, Decimal('8.10'))
+        
+        first.calories = 200
+        first.save()
+        self.assertEqual(self.totals().calories, 460)
+        
+        yesterday = self.today - timedelta(days=1)
+        first.date = yesterday
+        first.save()
+        self.assertEqual(self.totals().calories, 260)
+        self.assertEqual(self.totals(yesterday).calories, 200)
+        
+        first.delete()
+        self.assertEqual(self.totals(yesterday).calories, 0)
+        self.assertEqual(self.totals(yesterday).entry_count, 0)
+    
+    def test_summary_and_weekly_read_totals(self):
+        """Summary and weekly views report the maintained totals with gaps filled"""
+        self.log(servings=2)
+        self.log(servings=1, day=self.today - timedelta(days=3))
+        
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('meal-entry-summary'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_calories'], 260)
+        self.assertEqual(response.data['total_carbs'], '56.00')
+        self.assertEqual(len(response.data['meals']['Lunch']), 1)
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('meal-entry-weekly'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([day['calories'] for day in response.data], [0, 0, 0, 130, 0, 0, 260])
+    
+    def test_rebuild_command(self):
+        """The rebuild command repairs drifted totals within the requested range only"""
+        self.log(servings=1)
+        old_day = self.today - timedelta(days=10)
+        self.log(servings=1, day=old_day)
+        DailyNutritionTotals.objects.update(calories=999)
+        
+        call_command(
+            'rebuild_nutrition_totals',
+            '--start', (self.today - timedelta(days=1)).isoformat(),
+            '--end', self.today.isoformat(),
+            stdout=StringIO(),
+        )
+        self.assertEqual(self.totals().calories, 130)
+        self.assertEqual(self.totals(old_day).calories, 999)
+
+
+class NutritionRangeTests(APITestCase):
+    """Tests for the bucketed nutrition range endpoint"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Range User",
+            email="range@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        self.url = reverse('meal-entry-range')
+        NutritionGoal.objects.create(user_id=self.user_id, calorie_target=2000)
+    
+    def log_day(self, day, calories):
+        DailyNutritionTotals.objects.create(
+            user_id=self.user_id, date=day, entry_count=1, calories=calories,
+            protein=Decimal('100.00'),
+        )
+    
+    def test_daily_buckets_fill_gaps(self):
+        """Every day of the range is returned with rolling averages over logged days"""
+        start = date(2024, 1, 1)
+        self.log_day(start, 1000)
+        self.log_day(start + timedelta(days=2), 3000)
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {
+                'start': '2024-01-01', 'end': '2024-01-04', 'window': 3,
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        series = response.data['series']
+        self.assertEqual([row['period'] for row in series],
+                         ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04'])
+        self.assertEqual([row['totals']['calories'] for row in series], [1000, 0, 3000, 0])
+        self.assertEqual([row['daily_average']['calories'] for row in series],
+                         [1000, None, 3000, None])
+        self.assertEqual([row['rolling_average']['calories'] for row in series],
+                         [1000, 1000, 2000, 3000])
+        self.assertEqual(series[0]['adherence']['calories'], 50)
+        self.assertEqual(response.data['summary']['days_logged'], 2)
+        self.assertEqual(response.data['summary']['adherence']['calories'], 100)
+    
+    def test_week_and_month_buckets(self):
+        """Days are grouped into Monday-based weeks and calendar months"""
+        self.log_day(date(2024, 1, 31), 1000)
+        self.log_day(date(2024, 2, 1), 2000)
+        self.log_day(date(2024, 2, 2), 3000)
+        
+        response = self.client.get(self.url, {
+            'start': '2024-01-30', 'end': '2024-02-14', 'bucket': 'week',
+        })
+        series = response.data['series']
+        self.assertEqual([row['period'] for row in series],
+                         ['2024-01-29', '2024-02-05', '2024-02-12'])
+        self.assertEqual([row['days'] for row in series], [6, 7, 3])
+        self.assertEqual(series[0]['totals']['calories'], 6000)
+        self.assertEqual(series[0]['daily_average']['calories'], 2000)
+        
+        response = self.client.get(self.url, {
+            'start': '2024-01-15', 'end': '2024-02-14', 'bucket': 'month',
+        })
+        series = response.data['series']
+        self.assertEqual([row['period'] for row in series], ['2024-01-01', '2024-02-01'])
+        self.assertEqual([row['days_logged'] for row in series], [1, 2])
+    
+    def test_invalid_parameters(self):
+        """Bad buckets, dates, ranges and windows are rejected"""
+        for params in [
+            {'bucket': 'year'},
+            {'start': '2024-13-01'},
+            {'start': '2024-02-01', 'end': '2024-01-01'},
+            {'start': '2020-01-01', 'end': '2024-01-01'},
+            {'window': 0},
+        ]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class MealEntryExportTests(APITestCase):
+    """Tests for the streaming meal entry export"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Export User",
+            email="export@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        meal_type = MealType.objects.create(name="Dinner")
+        food = FoodItem.objects.create(
+            name="Salmon", brand="Fresh Farms", serving_size=100, serving_unit="g", calories=208,
+            protein=Decimal('20.00'), carbs=Decimal('0.00'), fat=Decimal('13.00'),
+        )
+        for days_ago in (2, 1):
+            MealEntry.objects.create(
+                user_id=self.user_id, food_item=food, meal_type=meal_type,
+                servings=Decimal('1.5'), date=date.today() - timedelta(days=days_ago),
+            )
+    
+    def test_export_formats(self):
+        """Entries stream as CSV or NDJSON with meal type and food names joined in"""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('meal-entry-export'), {'format': 'csv'})
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(lines[0].split(',')[:7], ['id', 'date', 'time', 'meal_type', 'food', 'brand', 'servings'])
+        self.assertEqual(len(lines), 3)
+        self.assertIn(',Dinner,Salmon,Fresh Farms,1.50,312,30.00,', lines[1])
+        
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        response = self.client.get(reverse('meal-entry-export'), {'format': 'ndjson', 'start': yesterday})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['date'], yesterday)
+        self.assertEqual(records[0]['protein'], '30.00')
+
+class SeedFoodsTests(APITestCase):
+    """Tests for the idempotent seed_foods command"""
+    
+    def seed(self, *args):
+        out = StringIO()
+        call_command('seed_foods', *args, stdout=out)
+        return out.getvalue()
+    
+    def test_reseed_updates_in_place(self):
+        """Re-seeding changes nothing, restores edited foods and keeps custom ones"""
+        output = self.seed()
+        self.assertIn('Categories: 10 created, 0 updated, 0 unchanged', output)
+        self.assertIn('Foods: 15 created, 0 updated, 0 unchanged', output)
+        apple = FoodItem.objects.get(name='Apple', brand='Generic')
+        self.assertTrue(FoodSearchTerm.objects.filter(food_item=apple, kind=FoodSearchTerm.WORD, term='apple').exists())
+        
+        FoodItem.objects.filter(pk=apple.pk).update(calories=500)
+        custom = FoodItem.objects.create(
+            name='Apple', brand='Generic', serving_size=1, serving_unit='g', calories=1,
+            protein=0, carbs=0, fat=0, is_custom=True, created_by='someone',
+        )
+        MealEntry.objects.create(
+            user_id=str(uuid.uuid4()), food_item=apple, meal_type=MealType.objects.create(name='Lunch'),
+            servings=1, date=date.today(),
+        )
+        
+        output = self.seed()
+        self.assertIn('Categories: 0 created, 0 updated, 10 unchanged', output)
+        self.assertIn('Foods: 0 created, 1 updated, 14 unchanged', output)
+        self.assertEqual(FoodItem.objects.get(pk=apple.pk).calories, 95)
+        self.assertEqual(FoodItem.objects.get(pk=custom.pk).calories, 1)
+        self.assertEqual(MealEntry.objects.filter(food_item=apple).count(), 1)
+        self.assertIn('Foods: 0 created, 0 updated, 15 unchanged', self.seed())
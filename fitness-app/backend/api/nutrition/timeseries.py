@@ -0,0 +1,164 @@
+"""
+Nutrition time series over arbitrary date ranges.
+
+Daily totals (DailyNutritionTotals) are grouped into day/week/month buckets by
+the database; the sparse grouped rows are scattered into dense numpy arrays
+covering every bucket of the range, and rolling averages and goal adherence
+are computed on those arrays instead of per-day Python objects.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import Trunc
+
+from .models import DailyNutritionTotals, NutritionGoal
+from .totals import NUTRIENT_FIELDS
+
+BUCKETS = ('day', 'week', 'month')
+
+# Buckets covered by the rolling average unless the client asks otherwise
+DEFAULT_WINDOWS = {'day': 7, 'week': 4, 'month': 3}
+MAX_WINDOW = 90
+
+# Longest range a single request may cover
+MAX_RANGE_DAYS = 731
+
+# Nutrients with a daily target on NutritionGoal
+GOAL_FIELDS = {
+    'calories': 'calorie_target',
+    'protein': 'protein_target',
+    'carbs': 'carbs_target',
+    'fat': 'fat_target',
+    'fiber': 'fiber_target',
+    'sugar': 'sugar_target',
+    'sodium': 'sodium_target',
+}
+
+
+def bucket_starts(start_date, end_date, bucket):
+    """First day of every bucket overlapping [start_date, end_date] (datetime64[D])"""
+    last = np.datetime64(end_date, 'D')
+    if bucket == 'day':
+        return np.arange(np.datetime64(start_date, 'D'), last + 1)
+    if bucket == 'week':
+        # Weeks start on Monday, as with the database's week truncation
+        first = np.datetime64(start_date - timedelta(days=start_date.weekday()), 'D')
+        return np.arange(first, last + 1, 7)
+    months = np.arange(
+        np.datetime64(start_date, 'M'), np.datetime64(end_date, 'M') + 1
+    )
+    return months.astype('datetime64[D]')
+
+
+def _grouped_totals(user_id, start_date, end_date, bucket):
+    """One row per non-empty bucket, summed by the database"""
+    queryset = DailyNutritionTotals.objects.filter(
+        user_id=user_id,
+        date__gte=start_date,
+        date__lte=end_date,
+        entry_count__gt=0,
+    )
+    return queryset.values(
+        period=Trunc('date', bucket, output_field=DateField())
+    ).order_by('period').annotate(
+        days_logged=Count('id'),
+        **{field: Sum(field) for field in NUTRIENT_FIELDS},
+    ).values_list('period', 'days_logged', *NUTRIENT_FIELDS)
+
+
+def _trailing_sum(values, window):
+    """Sum of each element and the window - 1 elements before it (axis 0)"""
+    cumulative = np.cumsum(values, axis=0)
+    shifted = np.zeros_like(cumulative)
+    shifted[window:] = cumulative[:-window]
+    return cumulative - shifted
+
+
+def _per_day(totals, days):
+    """totals / days with NaN where no day was logged"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(days > 0, totals / days, np.nan)
+
+
+def _round(values):
+    return [None if np.isnan(value) else value for value in np.round(values, 2).tolist()]
+
+
+def _nutrient_dict(matrix, index):
+    return {field: matrix[index][column] for column, field in enumerate(NUTRIENT_FIELDS)}
+
+
+def nutrition_series(user_id, start_date, end_date, bucket='day', window=None):
+    """
+    Bucketed nutrition for a user between start_date and end_date (inclusive).
+
+    Each bucket reports its totals, the average per logged day, a rolling
+    average per logged day over the last `window` buckets and adherence to the
+    user's daily goals (average per logged day as a percentage of the target).
+    """
+    window = window or DEFAULT_WINDOWS[bucket]
+    periods = bucket_starts(start_date, end_date, bucket)
+
+    # Days of each bucket that fall inside the requested range
+    first_day = np.datetime64(start_date, 'D')
+    next_starts = np.append(periods[1:], np.datetime64(end_date, 'D') + 1)
+    days = (next_starts - np.maximum(periods, first_day)).astype(int)
+
+    totals = np.zeros((len(periods), len(NUTRIENT_FIELDS)))
+    days_logged = np.zeros(len(periods), dtype=int)
+    rows = list(_grouped_totals(user_id, start_date, end_date, bucket))
+    if rows:
+        positions = np.searchsorted(
+            periods, np.array([row[0] for row in rows], dtype='datetime64[D]')
+        )
+        days_logged[positions] = [row[1] for row in rows]
+        totals[positions] = np.array([row[2:] for row in rows], dtype=float)
+
+    logged = days_logged[:, None]
+    daily_average = _per_day(totals, logged)
+    rolling_average = _per_day(
+        _trailing_sum(totals, window), _trailing_sum(days_logged, window)[:, None]
+    )
+
+    goal = NutritionGoal.objects.filter(user_id=user_id).first() or NutritionGoal(user_id=user_id)
+    targets = np.array([float(getattr(goal, GOAL_FIELDS[field])) for field in NUTRIENT_FIELDS])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        adherence = np.where(targets > 0, daily_average / targets * 100, np.nan)
+
+    columns = {
+        'totals': np.round(totals, 2).tolist(),
+        'daily_average': [_round(row) for row in daily_average],
+        'rolling_average': [_round(row) for row in rolling_average],
+        'adherence': [_round(row) for row in adherence],
+    }
+    series = [
+        {
+            'period': period,
+            'days': day_count,
+            'days_logged': logged_count,
+            **{key: _nutrient_dict(values, index) for key, values in columns.items()},
+        }
+        for index, (period, day_count, logged_count) in enumerate(zip(
+            periods.astype(str).tolist(), days.tolist(), days_logged.tolist()
+        ))
+    ]
+
+    range_logged = int(days_logged.sum())
+    range_average = _per_day(totals.sum(axis=0), range_logged)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        range_adherence = np.where(targets > 0, range_average / targets * 100, np.nan)
+    return {
+        'start': start_date,
+        'end': end_date,
+        'bucket': bucket,
+        'window': window,
+        'goals': dict(zip(NUTRIENT_FIELDS, targets.tolist())),
+        'summary': {
+            'days': int(days.sum()),
+            'days_logged': range_logged,
+            'daily_average': dict(zip(NUTRIENT_FIELDS, _round(range_average))),
+            'adherence': dict(zip(NUTRIENT_FIELDS, _round(range_adherence))),
+        },
+        'series': series,
+    }
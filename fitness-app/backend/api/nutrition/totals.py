@@ -0,0 +1,104 @@
+"""
+Incrementally maintained daily nutrition totals.
+
+The summary and weekly endpoints read DailyNutritionTotals rows instead of
+summing a user's MealEntry rows on every request. The write path (see
+api.nutrition.signals) applies the delta of every entry change inside the same
+transaction as the write; rebuild_totals recomputes rows from scratch.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import DailyNutritionTotals, MealEntry
+
+NUTRIENT_FIELDS = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium')
+
+
+def entry_values(entry):
+    """Nutrient values of a meal entry, keyed by NUTRIENT_FIELDS"""
+    return {field: getattr(entry, field) or 0 for field in NUTRIENT_FIELDS}
+
+
+def apply_entry_delta(user_id, date, values, sign=1):
+    """Add (sign=1) or subtract (sign=-1) one entry's nutrients on a user's day"""
+    deltas = {field: sign * values[field] for field in NUTRIENT_FIELDS}
+    deltas['entry_count'] = sign
+    lookup = {'user_id': user_id, 'date': date}
+    updates = {field: F(field) + value for field, value in deltas.items()}
+
+    if DailyNutritionTotals.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            DailyNutritionTotals.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Another writer created the row first
+        DailyNutritionTotals.objects.filter(**lookup).update(**updates)
+
+
+def _empty_day(user_id, date):
+    return DailyNutritionTotals(
+        user_id=user_id,
+        date=date,
+        **{field: Decimal('0.00') for field in NUTRIENT_FIELDS if field != 'calories'},
+    )
+
+
+def get_daily_totals(user_id, start_date, end_date):
+    """
+    Totals for every day in [start_date, end_date], in date order; days without
+    entries are filled with zeros
+    """
+    rows = {
+        row.date: row
+        for row in DailyNutritionTotals.objects.filter(
+            user_id=user_id, date__gte=start_date, date__lte=end_date
+        )
+    }
+    days = []
+    current_date = start_date
+    while current_date <= end_date:
+        days.append(rows.get(current_date) or _empty_day(user_id, current_date))
+        current_date += timedelta(days=1)
+    return days
+
+
+def rebuild_totals(start_date=None, end_date=None, user_ids=None):
+    """
+    Recompute totals from the raw MealEntry table for a date range.
+
+    Used after bulk writes that bypass model signals and to repair drift.
+    Either bound may be omitted; pass user_ids to limit the rebuild to specific
+    users. Returns the number of totals rows written.
+    """
+    entries = MealEntry.objects.all()
+    totals = DailyNutritionTotals.objects.all()
+    if start_date is not None:
+        entries = entries.filter(date__gte=start_date)
+        totals = totals.filter(date__gte=start_date)
+    if end_date is not None:
+        entries = entries.filter(date__lte=end_date)
+        totals = totals.filter(date__lte=end_date)
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+        totals = totals.filter(user_id__in=user_ids)
+
+    with transaction.atomic():
+        totals.delete()
+        rows = [
+            DailyNutritionTotals(
+                user_id=row['user_id'],
+                date=row['date'],
+                entry_count=row['entry_count'],
+                **{field: row[field] or 0 for field in NUTRIENT_FIELDS},
+            )
+            for row in entries.order_by().values('user_id', 'date').annotate(
+                entry_count=Count('id'),
+                **{field: Sum(field) for field in NUTRIENT_FIELDS},
+            )
+        ]
+        DailyNutritionTotals.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
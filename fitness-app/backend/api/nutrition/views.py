@@ -5,9 +5,13 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Sum, F
 from django.utils import timezone
 from datetime import datetime, timedelta
-from decimal import Decimal
 
+from api.catalog import CachedCatalogMixin
+from api.export import EXPORT_CHUNK_SIZE, EXPORT_RENDERERS, export_response, parse_export_range
 from .models import FoodCategory, FoodItem, UserFoodItem, NutritionGoal, MealType, MealEntry
+from .search import search_foods
+from .timeseries import BUCKETS, DEFAULT_WINDOWS, MAX_RANGE_DAYS, MAX_WINDOW, nutrition_series
+from .totals import NUTRIENT_FIELDS, get_daily_totals
 from .serializers import (
     FoodCategorySerializer, FoodItemSerializer, 
     UserFoodItemSerializer, FoodItemCreateSerializer,
@@ -15,13 +19,23 @@ from .serializers import (
     DailyNutritionSummarySerializer
 )
 
-class FoodCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+# Exported fields of a meal entry: (name, lookup from MealEntry)
+MEAL_ENTRY_EXPORT_FIELDS = [
+    ('id', 'id'), ('date', 'date'), ('time', 'time'), ('meal_type', 'meal_type__name'),
+    ('food', 'food_item__name'), ('brand', 'food_item__brand'), ('servings', 'servings'),
+    *((field, field) for field in NUTRIENT_FIELDS), ('notes', 'notes'),
+]
+
+class FoodCategoryViewSet(CachedCatalogMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for food categories
     """
     queryset = FoodCategory.objects.all()
     serializer_class = FoodCategorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Reference catalog, always returned whole
+    pagination_class = None
+    catalog = 'food_categories'
 
 class FoodItemViewSet(viewsets.ModelViewSet):
     """
@@ -42,7 +56,7 @@ class FoodItemViewSet(viewsets.ModelViewSet):
         user_id = self.request.user.user_id
         return FoodItem.objects.filter(
             Q(is_verified=True) | Q(created_by=user_id)
-        )
+        ).select_related('category')
     
     def get_serializer_class(self):
         """
@@ -63,7 +77,7 @@ class FoodItemViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def search(self, request):
         """
-        Search for food items by name, brand, or barcode
+        Search for food items by name, brand, or barcode, best matches first
         """
         query = request.query_params.get('q', '')
         category = request.query_params.get('category', None)
@@ -75,24 +89,12 @@ class FoodItemViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        queryset = self.get_queryset()
-        
-        # Filter by category if provided
-        if category:
-            queryset = queryset.filter(category=category)
-        
-        # Search by query if provided
-        if query:
-            queryset = queryset.filter(
-                Q(name__icontains=query) | 
-                Q(brand__icontains=query) |
-                Q(barcode__icontains=query)
-            )
-        
-        # Limit results
-        queryset = queryset[:limit]
+        # Ranked lookup through the food search index (see search.py)
+        foods = search_foods(
+            request.user.user_id, query, category=category, limit=limit
+        )
         
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(foods, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -101,7 +103,7 @@ class FoodItemViewSet(viewsets.ModelViewSet):
         Get all custom foods created by the user
         """
         user_id = request.user.user_id
-        queryset = FoodItem.objects.filter(created_by=user_id, is_custom=True)
+        queryset = FoodItem.objects.filter(created_by=user_id, is_custom=True).select_related('category')
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
@@ -113,7 +115,7 @@ class FoodItemViewSet(viewsets.ModelViewSet):
         user_id = request.user.user_id
         user_food_items = UserFoodItem.objects.filter(user_id=user_id, is_favorite=True)
         food_ids = user_food_items.values_list('food_item_id', flat=True)
-        queryset = FoodItem.objects.filter(id__in=food_ids)
+        queryset = FoodItem.objects.filter(id__in=food_ids).select_related('category')
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
@@ -130,7 +132,7 @@ class FoodItemViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            food_item = FoodItem.objects.get(barcode=barcode)
+            food_item = FoodItem.objects.select_related('category').get(barcode=barcode)
             serializer = self.get_serializer(food_item)
             return Response(serializer.data)
         except FoodItem.DoesNotExist:
@@ -190,7 +192,7 @@ class UserFoodItemViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user_id = self.request.user.user_id
-        return UserFoodItem.objects.filter(user_id=user_id)
+        return UserFoodItem.objects.filter(user_id=user_id).select_related('food_item__category')
     
     def perform_create(self, serializer):
         serializer.save(user_id=self.request.user.user_id)
@@ -201,6 +203,8 @@ class NutritionGoalViewSet(viewsets.ModelViewSet):
     """
     serializer_class = NutritionGoalSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # A user has at most one goal
+    pagination_class = None
     
     def get_queryset(self):
         user_id = self.request.user.user_id
@@ -225,13 +229,16 @@ class NutritionGoalViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(goal)
             return Response(serializer.data)
 
-class MealTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class MealTypeViewSet(CachedCatalogMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for meal types
     """
     queryset = MealType.objects.all()
     serializer_class = MealTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Reference catalog, always returned whole
+    pagination_class = None
+    catalog = 'meal_types'
     
     @action(detail=False, methods=['get'])
     def seed(self, request):
@@ -264,11 +271,35 @@ class MealEntryViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user_id = self.request.user.user_id
-        return MealEntry.objects.filter(user_id=user_id)
+        return MealEntry.objects.filter(user_id=user_id).select_related(
+            'food_item__category', 'meal_type'
+        )
     
     def perform_create(self, serializer):
         serializer.save(user_id=self.request.user.user_id)
     
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """
+        Stream all of the user's meal entries as CSV or NDJSON, one entry per
+        row, optionally between `start` and `end`
+        """
+        try:
+            start_date, end_date = parse_export_range(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        entries = MealEntry.objects.filter(user_id=request.user.user_id)
+        if start_date:
+            entries = entries.filter(date__gte=start_date)
+        if end_date:
+            entries = entries.filter(date__lte=end_date)
+        rows = entries.order_by('date', 'time', 'id').values_list(
+            *(lookup for _, lookup in MEAL_ENTRY_EXPORT_FIELDS)
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        
+        return export_response(request, 'meals', [name for name, _ in MEAL_ENTRY_EXPORT_FIELDS], rows)
+    
     @action(detail=False, methods=['get'])
     def daily(self, request):
         """
@@ -288,7 +319,7 @@ class MealEntryViewSet(viewsets.ModelViewSet):
         else:
             date = timezone.now().date()
         
-        entries = MealEntry.objects.filter(user_id=user_id, date=date)
+        entries = self.get_queryset().filter(date=date)
         serializer = self.get_serializer(entries, many=True)
         return Response(serializer.data)
     
@@ -312,7 +343,7 @@ class MealEntryViewSet(viewsets.ModelViewSet):
             date = timezone.now().date()
         
         # Get all entries for the date
-        entries = MealEntry.objects.filter(user_id=user_id, date=date)
+        entries = self.get_queryset().filter(date=date)
         
         # Get or create nutrition goal
         try:
@@ -320,21 +351,9 @@ class MealEntryViewSet(viewsets.ModelViewSet):
         except NutritionGoal.DoesNotExist:
             goal = NutritionGoal.objects.create(user_id=user_id)
         
-        # Calculate totals
-        totals = entries.aggregate(
-            total_calories=Sum('calories'),
-            total_protein=Sum('protein'),
-            total_carbs=Sum('carbs'),
-            total_fat=Sum('fat'),
-            total_fiber=Sum('fiber'),
-            total_sugar=Sum('sugar'),
-            total_sodium=Sum('sodium')
-        )
-        
-        # Replace None values with 0
-        for key, value in totals.items():
-            if value is None:
-                totals[key] = 0 if 'calories' in key else Decimal('0.0')
+        # Totals are maintained on write (api/nutrition/totals.py)
+        day = get_daily_totals(user_id, date, date)[0]
+        totals = {f'total_{field}': getattr(day, field) for field in NUTRIENT_FIELDS}
         
         # Calculate progress percentages
         calorie_progress = int((totals['total_calories'] / goal.calorie_target) * 100) if goal.calorie_target > 0 else 0
@@ -383,50 +402,69 @@ class MealEntryViewSet(viewsets.ModelViewSet):
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=6)  # Last 7 days
         
-        # Get all entries for the date range
-        entries = MealEntry.objects.filter(
-            user_id=user_id, 
-            date__gte=start_date,
-            date__lte=end_date
-        )
+        # One pre-summed row per logged day, gaps filled with zeros
+        result = [
+            {
+                'date': day.date,
+                'calories': day.calories,
+                'protein': day.protein,
+                'carbs': day.carbs,
+                'fat': day.fat,
+            }
+            for day in get_daily_totals(user_id, start_date, end_date)
+        ]
         
-        # Group by date
-        daily_data = {}
-        for entry in entries:
-            date_str = entry.date.strftime('%Y-%m-%d')
-            if date_str not in daily_data:
-                daily_data[date_str] = {
-                    'date': entry.date,
-                    'calories': 0,
-                    'protein': Decimal('0.0'),
-                    'carbs': Decimal('0.0'),
-                    'fat': Decimal('0.0')
-                }
-            
-            daily_data[date_str]['calories'] += entry.calories
-            daily_data[date_str]['protein'] += entry.protein
-            daily_data[date_str]['carbs'] += entry.carbs
-            daily_data[date_str]['fat'] += entry.fat
+        return Response(result)
+    
+    @action(detail=False, methods=['get'], url_path='range', url_name='range')
+    def date_range(self, request):
+        """
+        Get nutrition totals, rolling averages and goal adherence between
+        `start` and `end` (YYYY-MM-DD), grouped by `bucket` (day, week or month)
+        """
+        user_id = request.user.user_id
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in BUCKETS:
+            return Response(
+                {"error": f"Invalid bucket. Use one of: {', '.join(BUCKETS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Fill in missing dates
-        current_date = start_date
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y-%m-%d')
-            if date_str not in daily_data:
-                daily_data[date_str] = {
-                    'date': current_date,
-                    'calories': 0,
-                    'protein': Decimal('0.0'),
-                    'carbs': Decimal('0.0'),
-                    'fat': Decimal('0.0')
-                }
-            current_date += timedelta(days=1)
+        start_str = request.query_params.get('start', None)
+        end_str = request.query_params.get('end', None)
+        try:
+            end_date = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else timezone.now().date()
+            start_date = (
+                datetime.strptime(start_str, '%Y-%m-%d').date() if start_str
+                else end_date - timedelta(days=29)  # Last 30 days
+            )
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format. Use YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start_date > end_date:
+            return Response(
+                {"error": "start must not be after end"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if (end_date - start_date).days >= MAX_RANGE_DAYS:
+            return Response(
+                {"error": f"Range must not exceed {MAX_RANGE_DAYS} days"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Convert to list and sort by date
-        result = list(daily_data.values())
-        result.sort(key=lambda x: x['date'])
+        try:
+            window = int(request.query_params.get('window', DEFAULT_WINDOWS[bucket]))
+        except ValueError:
+            window = 0
+        if not 1 <= window <= MAX_WINDOW:
+            return Response(
+                {"error": f"window must be between 1 and {MAX_WINDOW}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        return Response(result)
+        return Response(nutrition_series(user_id, start_date, end_date, bucket, window))
     
     @action(detail=False, methods=['get'])
     def frequently_used(self, request):
@@ -449,7 +487,7 @@ class MealEntryViewSet(viewsets.ModelViewSet):
         
         # Get the food items
         food_ids = [entry['food_item'] for entry in entries]
-        food_items = FoodItem.objects.filter(id__in=food_ids)
+        food_items = FoodItem.objects.filter(id__in=food_ids).select_related('category')
         
         # Sort by frequency
         food_dict = {str(item.id): item for item in food_items}
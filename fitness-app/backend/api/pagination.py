@@ -0,0 +1,182 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are selected with a WHERE clause on the ordering columns of the row the
+client last saw instead of an OFFSET, so a deep page costs the same index range
+scan as the first one. The ordering always ends in the primary key so every
+row has a unique position.
+"""
+import base64
+import json
+from urllib import parse
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward/backward keyset pagination keyed on the full ordering of the view.
+
+    The ordering is taken from the request (when the view uses OrderingFilter),
+    then the view's `ordering` attribute, then the model's Meta.ordering; the
+    primary key is appended as a tie-breaker. Ordering fields must be concrete,
+    non-null columns of the model.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE or 50
+    page_size_query_param = 'limit'
+    max_page_size = 200
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [self._get_field(queryset.model, name) for name in self.ordering]
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+        ordering = [self._invert(name) for name in self.ordering] if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self._after(ordering, cursor['values']))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        filter_backends = getattr(view, 'filter_backends', None) or []
+        if any(issubclass(backend, OrderingFilter) for backend in filter_backends):
+            ordering = OrderingFilter().get_ordering(request, queryset, view)
+        if not ordering:
+            ordering = getattr(view, 'ordering', None)
+        if not ordering:
+            ordering = queryset.model._meta.ordering
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        ordering = list(ordering)
+        pk_name = queryset.model._meta.pk.name
+        if not any(name.lstrip('-') in ('pk', pk_name) for name in ordering):
+            ordering.append(pk_name)
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        values = []
+        for field in self.fields:
+            value = field.value_from_object(obj)
+            values.append(None if value is None else field.value_to_string(obj))
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(parse.unquote(encoded).encode('ascii')))
+            values = payload['v']
+            if len(values) != len(self.fields):
+                raise ValueError(encoded)
+            return {
+                'values': [
+                    None if value is None else field.to_python(value)
+                    for field, value in zip(self.fields, values)
+                ],
+                'reverse': bool(payload.get('r')),
+            }
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, ordering, values):
+        """Rows strictly after `values` in lexicographic `ordering`"""
+        condition = Q()
+        equal_so_far = Q()
+        for name, value in zip(ordering, values):
+            column = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= equal_so_far & Q(**{f'{column}__{lookup}': value})
+            equal_so_far &= Q(**{column: value})
+        return condition
+
+    @staticmethod
+    def _invert(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    @staticmethod
+    def _get_field(model, name):
+        name = name.lstrip('-')
+        if name == 'pk':
+            return model._meta.pk
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(
+                f'KeysetPagination cannot order {model.__name__} by "{name}"; '
+                'only concrete model fields are supported.'
+            )
+        if not field.concrete or field.is_relation:
+            raise ImproperlyConfigured(
+                f'KeysetPagination cannot order {model.__name__} by relation "{name}".'
+            )
+        return field
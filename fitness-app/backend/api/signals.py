@@ -0,0 +1,35 @@
+"""
+Keep per-process caches in step with UserProfile and reference catalog writes.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .auth.principals import principal_cache
+from .catalog import catalog_changed
+from .models import UserProfile
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_principals(sender, instance, **kwargs):
+    """Drop cached principals of a changed profile, again once the write commits"""
+    user_id = instance.user_id
+    principal_cache.invalidate_user(user_id)
+    # A concurrent request may have cached the old row before the commit
+    transaction.on_commit(lambda: principal_cache.invalidate_user(user_id))
+
+
+@receiver(post_save, sender='workouts.Exercise')
+@receiver(post_delete, sender='workouts.Exercise')
+@receiver(post_save, sender='nutrition.FoodCategory')
+@receiver(post_delete, sender='nutrition.FoodCategory')
+@receiver(post_save, sender='nutrition.MealType')
+@receiver(post_delete, sender='nutrition.MealType')
+@receiver(post_save, sender='nutrition.FoodItem')
+@receiver(post_delete, sender='nutrition.FoodItem')
+def invalidate_cached_catalog(sender, instance, raw=False, **kwargs):
+    """Bump the version of a catalog whose rows changed and log the row"""
+    if raw:
+        return
+    catalog_changed(sender, [instance])
@@ -0,0 +1,51 @@
+"""
+Sampled, structured logging for request hot paths.
+
+    logger = logging.getLogger(__name__)
+    log_event(logger, 'workouts.list', user_id=user_id)
+
+Events below WARNING are only emitted for a random LOG_SAMPLE_RATE fraction of
+calls, and the sampling decision is made before a log record is built, so an
+unsampled call costs one random() draw. Warnings and errors are always
+emitted. StructuredFormatter renders records as one JSON object per line.
+"""
+import json
+import logging
+import random
+
+from django.conf import settings
+
+
+def log_event(logger, event, level=logging.INFO, sample_rate=None, **fields):
+    """
+    Log `event` with key/value fields, sampled unless level >= WARNING.
+
+    The effective sample rate is attached to the record so aggregated counts
+    can be scaled back up.
+    """
+    if sample_rate is None:
+        sample_rate = 1.0 if level >= logging.WARNING else getattr(settings, 'LOG_SAMPLE_RATE', 1.0)
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(level, event, extra={'fields': fields, 'sample_rate': sample_rate})
+
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, event and fields"""
+
+    def format(self, record):
+        payload = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        payload.update(getattr(record, 'fields', None) or {})
+        sample_rate = getattr(record, 'sample_rate', None)
+        if sample_rate is not None and sample_rate < 1.0:
+            payload['sample_rate'] = sample_rate
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
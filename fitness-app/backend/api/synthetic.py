@@ -0,0 +1,436 @@
+"""
+Reproducible synthetic data at production scale.
+
+    python manage.py generate_dataset --users 1000 --years 3 --seed 42
+
+For every user this writes a UserProfile, UserSettings and NutritionGoal,
+years of workouts that follow a training split with progressive overload,
+daily meal logs drawn from a shared food catalog, custom foods and favorites.
+Ids and values come from random generators seeded with --seed and the user
+id. The same arguments therefore produce the same rows, and each user's data
+does not depend on how many other users are generated.
+
+Rows are written with bulk_create in batches, which bypasses model signals:
+search index rows are written alongside the foods, and training rollups and
+daily nutrition totals are rebuilt for the generated users afterwards.
+"""
+import itertools
+import random
+import time as clock
+import uuid
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.catalog import catalog_changed
+from api.models import UserProfile, UserSettings
+from api.nutrition.models import (
+    FoodCategory, FoodItem, FoodSearchTerm, MealEntry, MealType, NutritionGoal, UserFoodItem
+)
+from api.nutrition.search import index_terms
+from api.nutrition.totals import rebuild_totals
+from workouts.models import Exercise, Workout, WorkoutSet
+from workouts.rollups import rebuild_user_stats
+
+CENTS = Decimal('0.01')
+
+# Users per rebuild query, well under SQLite's bound parameter limit
+REBUILD_CHUNK = 500
+
+# Training split cycled through by each user: (workout name, muscle groups)
+SPLIT = [
+    ('Push Day', ('chest', 'shoulders', 'arms')),
+    ('Pull Day', ('back', 'arms', 'core')),
+    ('Leg Day', ('legs', 'core')),
+    ('Full Body', ('full_body', 'legs', 'chest', 'back')),
+]
+CARDIO_DAY = ('Cardio', ('cardio',))
+
+# Starting working weight (kg) of an intermediate lifter, and the increment
+# used when a session goes well. None for bodyweight exercises.
+STARTING_WEIGHT = {
+    'legs': 80, 'back': 60, 'chest': 55, 'full_body': 50, 'shoulders': 30, 'arms': 15, 'core': None,
+}
+INCREMENT = {
+    'legs': 2.5, 'back': 2.5, 'chest': 2.5, 'full_body': 2.5, 'shoulders': 1.25, 'arms': 1.25,
+}
+LEVEL_FACTOR = {'beginner': 0.6, 'intermediate': 1.0, 'advanced': 1.4}
+
+# Every DELOAD_WEEKS-th week lifts drop to DELOAD_FACTOR of the working weight
+DELOAD_WEEKS = 6
+DELOAD_FACTOR = 0.9
+
+# Base foods per category: name -> (serving g/ml, kcal, protein, carbs, fat, fiber, sugar, sodium)
+BASE_FOODS = {
+    'Fruits': {
+        'Apple': (182, 95, 0.5, 25, 0.3, 4.4, 19, 2), 'Banana': (118, 105, 1.3, 27, 0.4, 3.1, 14, 1),
+        'Blueberries': (148, 84, 1.1, 21, 0.5, 3.6, 15, 1), 'Mango': (165, 99, 1.4, 25, 0.6, 2.6, 23, 2),
+    },
+    'Vegetables': {
+        'Broccoli': (91, 31, 2.5, 6, 0.3, 2.4, 1.5, 30), 'Spinach': (30, 7, 0.9, 1.1, 0.1, 0.7, 0.1, 24),
+        'Sweet Potato': (130, 112, 2, 26, 0.1, 3.9, 5.4, 72), 'Carrots': (61, 25, 0.6, 6, 0.1, 1.7, 2.9, 42),
+    },
+    'Grains': {
+        'Oats': (40, 150, 5, 27, 3, 4, 1, 0), 'Brown Rice': (195, 216, 5, 45, 1.8, 3.5, 0.7, 10),
+        'Pasta': (140, 221, 8, 43, 1.3, 2.5, 0.8, 1), 'Bread': (32, 82, 4, 14, 1.1, 1.9, 1.4, 146),
+    },
+    'Protein': {
+        'Chicken Breast': (120, 198, 37, 0, 4.3, 0, 0, 89), 'Salmon': (100, 208, 20, 0, 13, 0, 0, 59),
+        'Eggs': (100, 143, 12.6, 0.7, 9.5, 0, 0.4, 142), 'Tofu': (126, 94, 10, 2.3, 5.9, 0.4, 0.8, 9),
+    },
+    'Dairy': {
+        'Yogurt': (170, 100, 17, 6, 0.7, 0, 6, 61), 'Milk': (244, 103, 8, 12, 2.4, 0, 12, 107),
+        'Cheddar': (28, 113, 7, 0.4, 9.3, 0, 0.1, 174), 'Cottage Cheese': (113, 98, 11, 3.4, 4.3, 0, 2.7, 364),
+    },
+    'Snacks': {
+        'Granola Bar': (42, 190, 4, 29, 7, 2, 12, 95), 'Almonds': (28, 164, 6, 6, 14, 3.5, 1.2, 0),
+        'Tortilla Chips': (28, 140, 2, 18, 7, 1, 0, 120), 'Protein Bar': (60, 210, 20, 22, 7, 3, 6, 190),
+    },
+    'Beverages': {
+        'Orange Juice': (248, 112, 1.7, 26, 0.5, 0.5, 21, 2), 'Protein Shake': (330, 160, 30, 5, 3, 1, 1, 250),
+        'Cola': (355, 140, 0, 39, 0, 0, 39, 45), 'Latte': (350, 190, 12, 18, 7, 0, 17, 170),
+    },
+    'Prepared Meals': {
+        'Burrito': (250, 430, 20, 55, 15, 7, 3, 1050), 'Chicken Curry': (300, 390, 28, 30, 17, 4, 8, 890),
+        'Veggie Pizza': (150, 360, 14, 42, 15, 3, 5, 720), 'Sushi Roll': (200, 300, 12, 50, 6, 2, 8, 560),
+    },
+}
+VARIANTS = [
+    '', 'Organic', 'Low Fat', 'Whole Grain', 'Smoked', 'Roasted', 'Grilled', 'Honey',
+    'Spicy', 'Classic', 'Unsweetened', 'High Protein', 'Light', 'Family Size',
+]
+BRANDS = ['', 'Generic', 'Fresh Farms', 'Green Valley', 'Nutri', 'Daily Harvest', 'Peak', 'Kirkwood']
+
+DEFAULT_MEAL_TYPES = [('Breakfast', 1), ('Lunch', 2), ('Dinner', 3), ('Snack', 4)]
+# Hour range of each meal, by MealType.order
+MEAL_HOURS = {1: (6, 9), 2: (11, 14), 3: (17, 21), 4: (14, 22)}
+SERVINGS = [Decimal('0.5'), Decimal('1'), Decimal('1'), Decimal('1'), Decimal('1.5'), Decimal('2')]
+NUTRIENTS = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium')
+
+# Foods a user eats regularly, drawn from the catalog and their custom foods
+PANTRY_SIZE = 40
+
+
+def seeded_uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def round_weight(weight):
+    """Nearest loadable weight: multiples of 1.25 kg"""
+    return round(weight / 1.25) * 1.25
+
+
+class BulkWriter:
+    """
+    Buffers rows and writes them with bulk_create. Models are flushed in the
+    order given, parents before children, so foreign keys always resolve.
+    """
+
+    def __init__(self, models, batch_size):
+        self.batch_size = batch_size
+        self.buffers = {model: [] for model in models}
+        self.pending = 0
+        self.written = {model: 0 for model in models}
+
+    def add(self, row):
+        self.buffers[type(row)].append(row)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with transaction.atomic():
+            for model, rows in self.buffers.items():
+                if rows:
+                    model.objects.bulk_create(rows, batch_size=self.batch_size)
+                    self.written[model] += len(rows)
+                    rows.clear()
+        self.pending = 0
+
+
+class DatasetGenerator:
+    def __init__(self, users=10, years=2.0, foods=5000, custom_foods=5, favorites=10,
+                 seed=0, prefix='synthetic-', batch_size=5000, end_date=None, stdout=None):
+        self.users = users
+        self.years = years
+        self.foods = foods
+        self.custom_foods = custom_foods
+        self.favorites = favorites
+        self.seed = seed
+        self.prefix = prefix
+        self.end_date = end_date or timezone.now().date()
+        self.start_date = self.end_date - timedelta(days=max(int(years * 365), 1) - 1)
+        self.stdout = stdout
+        self.writer = BulkWriter([
+            UserProfile, UserSettings, NutritionGoal, FoodItem, FoodSearchTerm,
+            UserFoodItem, Workout, WorkoutSet, MealEntry,
+        ], batch_size)
+
+    def user_ids(self):
+        return [f'{self.prefix}{index:06d}' for index in range(self.users)]
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def generate(self):
+        """Write the dataset, rebuild derived tables and return rows written per model"""
+        started = clock.perf_counter()
+        self.exercises = self.load_exercises()
+        self.meal_types = self.load_meal_types()
+        self.catalog = self.generate_catalog()
+
+        user_ids = self.user_ids()
+        for count, user_id in enumerate(user_ids, start=1):
+            self.generate_user(user_id)
+            if count % 10 == 0 or count == len(user_ids):
+                elapsed = clock.perf_counter() - started
+                self.log(f'{count}/{len(user_ids)} users, {sum(self.writer.written.values())} rows, {elapsed:.0f}s')
+        self.writer.flush()
+
+        self.log('Rebuilding training rollups and nutrition totals...')
+        for index in range(0, len(user_ids), REBUILD_CHUNK):
+            chunk = user_ids[index:index + REBUILD_CHUNK]
+            rebuild_user_stats(user_ids=chunk)
+            rebuild_totals(user_ids=chunk)
+        return {model.__name__: count for model, count in self.writer.written.items()}
+
+    def load_exercises(self):
+        by_group = {}
+        for exercise in Exercise.objects.filter(is_custom=False).order_by('name'):
+            by_group.setdefault(exercise.muscle_group, []).append(exercise)
+        return by_group
+
+    def load_meal_types(self):
+        if not MealType.objects.exists():
+            created = MealType.objects.bulk_create([
+                MealType(name=name, order=order) for name, order in DEFAULT_MEAL_TYPES
+            ])
+            catalog_changed(MealType, created)
+        return list(MealType.objects.order_by('order', 'name'))
+
+    def food_row(self, rng, category, base_name, profile, **fields):
+        """A FoodItem built around a base food with jittered nutrients"""
+        variant = rng.choice(VARIANTS)
+        serving, *values = profile
+        scale = rng.uniform(0.85, 1.15)
+        return FoodItem(
+            id=seeded_uuid(rng),
+            name=f'{variant} {base_name}'.strip(),
+            brand=rng.choice(BRANDS),
+            category=category,
+            serving_size=Decimal(serving),
+            serving_unit='ml' if category.name == 'Beverages' else 'g',
+            calories=int(values[0] * scale),
+            **{
+                nutrient: Decimal(value * scale).quantize(CENTS)
+                for nutrient, value in zip(NUTRIENTS[1:], values[1:])
+            },
+            **fields,
+        )
+
+    def add_food(self, food):
+        self.writer.add(food)
+        for kind, term in index_terms(food.name, food.brand):
+            self.writer.add(FoodSearchTerm(food_item_id=food.id, kind=kind, term=term))
+
+    def generate_catalog(self):
+        """The shared food catalog; foods already written by an earlier run are reused"""
+        rng = random.Random(f'{self.seed}:catalog')
+        self.categories = {}
+        for name in BASE_FOODS:
+            self.categories[name], _ = FoodCategory.objects.get_or_create(name=name)
+        bases = [
+            (self.categories[category], name, profile)
+            for category, foods in BASE_FOODS.items()
+            for name, profile in foods.items()
+        ]
+
+        catalog = []
+        for _ in range(self.foods):
+            category, base_name, profile = rng.choice(bases)
+            catalog.append(self.food_row(
+                rng, category, base_name, profile,
+                is_verified=rng.random() < 0.3,
+                barcode=str(rng.randrange(10 ** 12, 10 ** 13)) if rng.random() < 0.6 else '',
+            ))
+
+        existing = set()
+        for index in range(0, len(catalog), REBUILD_CHUNK):
+            existing.update(FoodItem.objects.filter(
+                pk__in=[food.id for food in catalog[index:index + REBUILD_CHUNK]]
+            ).values_list('pk', flat=True))
+        new = [food for food in catalog if food.id not in existing]
+        for food in new:
+            self.add_food(food)
+        # Bulk inserts bypass the catalog signals; log the synced foods so
+        # clients receive them in deltas
+        self.writer.flush()
+        catalog_changed(FoodItem, [food for food in new if food.is_verified])
+        return catalog
+
+    def generate_user(self, user_id):
+        rng = random.Random(f'{self.seed}:{user_id}')
+        level = rng.choices(list(LEVEL_FACTOR), weights=[5, 4, 1])[0]
+        days_per_week = rng.choice([2, 3, 3, 4, 4, 5, 6])
+        self.writer.add(UserProfile(
+            user_id=user_id,
+            display_name=f'Synthetic User {user_id[len(self.prefix):]}',
+            email=f'{user_id}@example.com',
+            fitness_level=level,
+            height=round(rng.gauss(172, 9), 1),
+            weight=round(rng.gauss(75, 12), 1),
+            date_of_birth=date(rng.randint(1960, 2005), rng.randint(1, 12), rng.randint(1, 28)),
+        ))
+        self.writer.add(UserSettings(
+            user_id=user_id,
+            primary_goal=rng.choice(['strength', 'weight_loss', 'muscle_gain', 'endurance']),
+            workout_days_per_week=days_per_week,
+        ))
+        calorie_target = rng.randrange(1600, 3201, 100)
+        self.writer.add(NutritionGoal(
+            id=seeded_uuid(rng),
+            user_id=user_id,
+            calorie_target=calorie_target,
+            protein_target=Decimal(calorie_target * 0.3 / 4).quantize(CENTS),
+            carbs_target=Decimal(calorie_target * 0.45 / 4).quantize(CENTS),
+            fat_target=Decimal(calorie_target * 0.25 / 9).quantize(CENTS),
+        ))
+        self.generate_workouts(rng, user_id, level, days_per_week)
+        self.generate_meals(rng, user_id)
+
+    def generate_workouts(self, rng, user_id, level, days_per_week):
+        # A fixed program per day of the split, so the same lifts progress over time
+        program = {}
+        for name, groups in SPLIT + [CARDIO_DAY]:
+            choices = [exercise for group in groups for exercise in self.exercises.get(group, [])]
+            program[name] = rng.sample(choices, min(len(choices), rng.randint(4, 6)))
+        working_weight = {}
+        training_days = sorted(rng.sample(range(7), days_per_week))
+        cardio = rng.random() < 0.4
+
+        session = 0
+        day = self.start_date
+        while day <= self.end_date:
+            week = (day - self.start_date).days // 7
+            if day.weekday() in training_days and rng.random() > 0.15:
+                if cardio and session % 4 == 3:
+                    name, _ = CARDIO_DAY
+                else:
+                    name, _ = SPLIT[session % len(SPLIT)]
+                session += 1
+                if program[name]:
+                    self.generate_workout(
+                        rng, user_id, day, name, program[name], working_weight, level,
+                        deload=week % DELOAD_WEEKS == DELOAD_WEEKS - 1,
+                    )
+            day += timedelta(days=1)
+
+    def generate_workout(self, rng, user_id, day, name, exercises, working_weight, level, deload):
+        duration = rng.randint(35, 90)
+        start = datetime.combine(day, time(rng.randint(6, 20), rng.choice([0, 15, 30, 45])))
+        end = min(start + timedelta(minutes=duration), datetime.combine(day, time(23, 59)))
+        workout = Workout(
+            id=seeded_uuid(rng),
+            user_id=user_id,
+            name=name,
+            date=day,
+            start_time=start.time(),
+            end_time=end.time(),
+            duration=duration,
+            calories_burned=int(duration * rng.uniform(6, 10)),
+        )
+        self.writer.add(workout)
+
+        for exercise in exercises:
+            group = exercise.muscle_group
+            if exercise.is_cardio or group == 'cardio':
+                minutes = rng.randint(15, 45)
+                self.writer.add(WorkoutSet(
+                    id=seeded_uuid(rng), workout_id=workout.id, exercise_id=exercise.id,
+                    set_number=1, reps=1, duration=minutes * 60,
+                    distance=round(minutes * rng.uniform(120, 200)), rpe=rng.randint(5, 9),
+                ))
+                continue
+
+            weight = working_weight.get(exercise.id)
+            if weight is None and STARTING_WEIGHT.get(group) is not None:
+                weight = STARTING_WEIGHT[group] * LEVEL_FACTOR[level] * rng.uniform(0.8, 1.2)
+            elif weight is not None and rng.random() < 0.7:
+                # Beginners progress faster than advanced lifters
+                weight += INCREMENT[group] * (1.5 if level == 'beginner' else 1.0)
+            working_weight[exercise.id] = weight
+            lifted = None
+            if weight:
+                lifted = round_weight(weight * DELOAD_FACTOR if deload else weight)
+
+            set_number = 1
+            if lifted and group in ('legs', 'back', 'chest') and rng.random() < 0.5:
+                self.writer.add(WorkoutSet(
+                    id=seeded_uuid(rng), workout_id=workout.id, exercise_id=exercise.id,
+                    set_number=set_number, reps=10, weight=round_weight(lifted * 0.5), is_warmup=True,
+                ))
+                set_number += 1
+            target_reps = rng.choice([5, 6, 8, 8, 10, 12])
+            for working_set in range(rng.randint(3, 5)):
+                self.writer.add(WorkoutSet(
+                    id=seeded_uuid(rng), workout_id=workout.id, exercise_id=exercise.id,
+                    set_number=set_number,
+                    reps=max(1, target_reps - rng.randint(0, working_set)),
+                    weight=lifted,
+                    rpe=min(10, rng.randint(6, 8) + working_set // 2),
+                ))
+                set_number += 1
+
+    def generate_meals(self, rng, user_id):
+        custom = []
+        for _ in range(self.custom_foods):
+            category = rng.choice(list(BASE_FOODS))
+            base_name, profile = rng.choice(list(BASE_FOODS[category].items()))
+            food = self.food_row(
+                rng, self.categories[category], base_name, profile,
+                is_custom=True, created_by=user_id,
+            )
+            food.name = f'My {food.name}'
+            self.add_food(food)
+            custom.append(food)
+
+        pantry = rng.sample(self.catalog, min(len(self.catalog), PANTRY_SIZE)) + custom
+        rng.shuffle(pantry)
+        for food in rng.sample(pantry, min(len(pantry), self.favorites)):
+            self.writer.add(UserFoodItem(
+                id=seeded_uuid(rng), user_id=user_id, food_item_id=food.id, is_favorite=True,
+            ))
+        if not pantry:
+            return
+
+        # Zipf-like preference: a few foods are eaten most days
+        cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(pantry))))
+        adherence = rng.uniform(0.6, 0.95)
+        day = self.start_date
+        while day <= self.end_date:
+            if rng.random() < adherence:
+                for meal_type in self.meal_types:
+                    if meal_type.order > 3 and rng.random() < 0.4:
+                        continue
+                    first, last = MEAL_HOURS.get(meal_type.order, (8, 20))
+                    for food in rng.choices(pantry, cum_weights=cum_weights, k=rng.randint(1, 3)):
+                        servings = rng.choice(SERVINGS)
+                        self.writer.add(MealEntry(
+                            id=seeded_uuid(rng),
+                            user_id=user_id,
+                            food_item_id=food.id,
+                            meal_type_id=meal_type.id,
+                            date=day,
+                            time=time(rng.randint(first, last), rng.randint(0, 59)),
+                            servings=servings,
+                            calories=int(food.calories * servings),
+                            **{
+                                nutrient: (getattr(food, nutrient) * servings).quantize(CENTS)
+                                for nutrient in NUTRIENTS[1:]
+                            },
+                        ))
+            day += timedelta(days=1)
+
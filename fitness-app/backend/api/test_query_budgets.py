@@ -0,0 +1,270 @@
+"""
+Query-count budgets for every API route.
+
+Every route in core/urls.py (including workouts/urls.py, api/nutrition/urls.py
+and api/analytics/urls.py) must either declare an Endpoint below or be listed in
+SKIPPED with a reason. Each declared endpoint is requested as a user with a
+small data set and as a user with SCALE times more data; the test fails when
+an endpoint issues more queries for the larger user (an N+1 or per-row query)
+or more queries than its declared budget.
+"""
+from dataclasses import dataclass
+from datetime import time, timedelta
+from decimal import Decimal
+from typing import Callable
+from types import SimpleNamespace
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.catalog import catalog_cache
+from api.models import UserProfile, UserSettings
+from api.nutrition.models import (
+    FoodCategory, FoodItem, MealEntry, MealType, NutritionGoal, UserFoodItem
+)
+from workouts.models import Exercise, Workout, WorkoutSet
+
+SMALL = 1
+SCALE = 50
+
+
+@dataclass
+class Endpoint:
+    budget: int
+    method: str = 'get'
+    kwargs: Callable = lambda data: {}
+    params: Callable = lambda data: {}
+    status: int = 200
+
+
+def _pk(attribute):
+    return lambda data: {'pk': getattr(data, attribute).pk}
+
+
+ENDPOINTS = {
+    # core/urls.py
+    # Refuses scrapes without METRICS_TOKEN configured
+    'metrics': Endpoint(budget=0, status=403),
+
+    # api/urls.py
+    'test_auth': Endpoint(budget=0),
+    'user_profile': Endpoint(budget=1),
+    'user_settings': Endpoint(budget=1),
+    'user_profile_complete': Endpoint(budget=2),
+    # Cold: catalog versions, then the version and rows of the four catalogs
+    'catalog_bundle': Endpoint(budget=6),
+    # Versions, changed ids, then the changed rows of each catalog
+    'catalog_delta': Endpoint(budget=6, params=lambda data: {'since': '0.0.0.0'}),
+
+    # workouts/urls.py
+    'api-root': Endpoint(budget=0),
+    # Cached catalogs: a cold cache reads the catalog versions, then the list
+    'exercise-list': Endpoint(budget=2),
+    'exercise-detail': Endpoint(budget=1, kwargs=_pk('exercise')),
+    'exercise-progression': Endpoint(budget=2, kwargs=_pk('exercise')),
+    # Cold: catalog versions and list, then the user's usage rows
+    'exercise-selector': Endpoint(budget=3),
+    'workout-list': Endpoint(budget=2),
+    'workout-detail': Endpoint(budget=2, kwargs=_pk('workout')),
+    'workout-history': Endpoint(budget=2),
+    'workout-export': Endpoint(budget=1),
+    'workout-stats': Endpoint(budget=1),
+    'workout-records': Endpoint(budget=1),
+    'workout-set-list': Endpoint(
+        budget=1, kwargs=lambda data: {'workout_pk': data.workout.pk},
+    ),
+    'workout-set-detail': Endpoint(
+        budget=1, kwargs=lambda data: {'workout_pk': data.workout.pk, 'pk': data.workout_set.pk},
+    ),
+    'workout-set-bulk': Endpoint(
+        budget=16, method='post', status=201,
+        kwargs=lambda data: {'workout_pk': data.workout.pk},
+        params=lambda data: [{
+            'exercise': str(data.exercise.pk), 'set_number': 99, 'reps': 5, 'weight': 100,
+        }],
+    ),
+
+    # api/analytics/urls.py
+    'analytics-dashboard': Endpoint(budget=1),
+
+    # api/nutrition/urls.py
+    'foodcategory-list': Endpoint(budget=2),
+    'foodcategory-detail': Endpoint(budget=1, kwargs=_pk('category')),
+    'food-list': Endpoint(budget=1),
+    'food-detail': Endpoint(budget=1, kwargs=_pk('food')),
+    'food-search': Endpoint(budget=4, params=lambda data: {'q': 'oat'}),
+    'food-barcode': Endpoint(budget=1, params=lambda data: {'code': data.verified_food.barcode}),
+    'food-custom': Endpoint(budget=1),
+    'food-favorites': Endpoint(budget=1),
+    # object lookup, then get_or_create: SELECT, SAVEPOINT, INSERT, RELEASE
+    'food-favorite': Endpoint(budget=5, method='post', kwargs=_pk('verified_food')),
+    'food-unfavorite': Endpoint(budget=3, method='post', kwargs=_pk('food')),
+    'user-food-list': Endpoint(budget=1),
+    'user-food-detail': Endpoint(budget=1, kwargs=_pk('user_food')),
+    'nutrition-goal-list': Endpoint(budget=1),
+    'nutrition-goal-detail': Endpoint(budget=1, kwargs=_pk('goal')),
+    'nutrition-goal-current': Endpoint(budget=1),
+    'meal-type-list': Endpoint(budget=2),
+    'meal-type-detail': Endpoint(budget=1, kwargs=_pk('meal_type')),
+    'meal-type-seed': Endpoint(budget=1),
+    'meal-entry-list': Endpoint(budget=1),
+    'meal-entry-detail': Endpoint(budget=1, kwargs=_pk('meal_entry')),
+    'meal-entry-daily': Endpoint(budget=1),
+    'meal-entry-summary': Endpoint(budget=3),
+    'meal-entry-weekly': Endpoint(budget=1),
+    'meal-entry-range': Endpoint(budget=2),
+    'meal-entry-export': Endpoint(budget=1),
+    'meal-entry-frequently-used': Endpoint(budget=2),
+}
+
+SKIPPED = {
+    'register': 'calls the Supabase auth service',
+    'login': 'authenticates against django.contrib.auth users, not a data endpoint',
+    'signup': 'creates django.contrib.auth users, not a data endpoint',
+    'password_reset': 'calls the Supabase auth service',
+    'password_reset_confirm': 'password reset flow, not a data endpoint',
+    'me': 'requires a DRF authtoken Bearer header, not a data endpoint',
+    'workout-import': 'multipart upload writing in batches; see workouts.tests.WorkoutImportTests',
+}
+
+# URL namespaces that are not part of the API
+SKIPPED_PREFIXES = ('admin/',)
+
+
+def walk_routes(patterns=None, prefix=''):
+    """(route, name) for every URL pattern, following includes"""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from walk_routes(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            yield route, pattern.name
+
+
+def api_route_names():
+    return {
+        name for route, name in walk_routes()
+        if not route.startswith(SKIPPED_PREFIXES)
+    }
+
+
+def seed_user(user_id, scale, catalog):
+    """A user with `scale` workouts, custom foods, favorites and logged days"""
+    today = timezone.now().date()
+    profile = UserProfile.objects.create(
+        user_id=user_id, email=f'{user_id}@example.com', display_name=user_id,
+    )
+    UserSettings.objects.create(user_id=user_id)
+    goal = NutritionGoal.objects.create(user_id=user_id)
+
+    workouts = []
+    for index in range(scale):
+        workout = Workout.objects.create(
+            user_id=user_id, name=f'Workout {index}', date=today - timedelta(days=index),
+            start_time=time(7, 0), duration=45,
+        )
+        for set_number, exercise in enumerate(catalog.exercises, start=1):
+            WorkoutSet.objects.create(
+                workout=workout, exercise=exercise, set_number=set_number,
+                reps=8, weight=60 + index,
+            )
+        workouts.append(workout)
+
+    foods = []
+    for index in range(scale):
+        food = FoodItem.objects.create(
+            name=f'Oat bar {index}', category=catalog.category, serving_size=50,
+            serving_unit='g', calories=200, protein=5, carbs=30, fat=6,
+            is_custom=True, created_by=user_id,
+        )
+        UserFoodItem.objects.create(user_id=user_id, food_item=food, is_favorite=True)
+        foods.append(food)
+
+    entries = []
+    for index in range(scale):
+        entries.append(MealEntry.objects.create(
+            user_id=user_id, food_item=foods[index], meal_type=catalog.meal_type,
+            date=today - timedelta(days=index % 7), servings=Decimal('1.0'),
+        ))
+
+    return SimpleNamespace(
+        profile=profile,
+        goal=goal,
+        workout=workouts[0],
+        workout_set=workouts[0].sets.first(),
+        food=foods[0],
+        user_food=UserFoodItem.objects.get(user_id=user_id, food_item=foods[0]),
+        meal_entry=entries[0],
+        exercise=catalog.exercises[0],
+        category=catalog.category,
+        meal_type=catalog.meal_type,
+        verified_food=catalog.verified_food,
+    )
+
+
+class QueryBudgetTests(APITestCase):
+    """Query counts of every endpoint must not grow with data size or exceed their budget"""
+
+    @classmethod
+    def setUpTestData(cls):
+        catalog = SimpleNamespace(
+            exercises=[
+                Exercise.objects.create(name='Bench Press', muscle_group='chest'),
+                Exercise.objects.create(name='Squat', muscle_group='legs'),
+                Exercise.objects.create(name='Row', muscle_group='back'),
+            ],
+            category=FoodCategory.objects.create(name='Snacks'),
+            meal_type=MealType.objects.create(name='Breakfast', order=1),
+        )
+        catalog.verified_food = FoodItem.objects.create(
+            name='Rolled oats', category=catalog.category, serving_size=40, serving_unit='g',
+            calories=150, protein=5, carbs=27, fat=3, is_verified=True, barcode='1234567890123',
+        )
+        cls.small = seed_user('budget-small', SMALL, catalog)
+        cls.large = seed_user('budget-large', SCALE, catalog)
+
+    def measure(self, name, endpoint, data):
+        # Both users are measured against a cold catalog cache, so a cached
+        # catalog read by the small user cannot hide queries from the large one
+        catalog_cache.clear()
+        self.client.force_authenticate(user=data.profile)
+        url = reverse(name, kwargs=endpoint.kwargs(data))
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, endpoint.method)(
+                url, endpoint.params(data), format='json' if endpoint.method != 'get' else None,
+            )
+            # Streaming responses query as their content is produced
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(
+            response.status_code, endpoint.status,
+            f'{name} returned {response.status_code}: {getattr(response, "data", "")}'
+        )
+        return len(queries)
+
+    def test_every_route_is_declared(self):
+        """New routes must declare a query budget or a reason to skip them"""
+        undeclared = api_route_names() - set(ENDPOINTS) - set(SKIPPED)
+        self.assertEqual(undeclared, set(), 'Add these routes to ENDPOINTS or SKIPPED')
+        stale = (set(ENDPOINTS) | set(SKIPPED)) - api_route_names()
+        self.assertEqual(stale, set(), 'These declared routes no longer exist')
+
+    def test_query_budgets(self):
+        """Each endpoint stays within budget and does not scale with data size"""
+        for name, endpoint in ENDPOINTS.items():
+            with self.subTest(endpoint=name):
+                small = self.measure(name, endpoint, self.small)
+                large = self.measure(name, endpoint, self.large)
+                self.assertLessEqual(
+                    large, small,
+                    f'{name}: {small} queries with {SMALL} rows, {large} with {SCALE}'
+                )
+                self.assertLessEqual(
+                    max(small, large), endpoint.budget,
+                    f'{name}: {max(small, large)} queries, budget is {endpoint.budget}'
+                )
@@ -1,3 +1,629 @@
-from django.test import TestCase
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from io import StringIO
 
-# Create your tests here.
+import jwt
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APITestCase
+from workouts.models import Exercise, UserTrainingStats, Workout, WorkoutSet
+
+from .auth.dispatch import DispatchAuthentication, get_verifier_stats, reset_verifier_stats
+from .auth.middleware import SimpleTokenAuthentication, SupabaseAuthentication
+from .auth.principals import PrincipalCache, principal_cache
+from .auth.supabase_client import ClientPool
+from .catalog import catalog_cache
+from .catalog_sync import catalog_delta, parse_version
+from .metrics import registry
+from .models import CatalogVersion, UserProfile, UserSettings
+from .nutrition.models import (
+    DailyNutritionTotals, FoodCategory, FoodItem, FoodSearchTerm, MealEntry, MealType, NutritionGoal,
+    UserFoodItem,
+)
+from .structured_logging import StructuredFormatter, log_event
+
+# Token signatures are not verified; any key long enough for HS256 will do
+SIGNING_KEY = 'test-signing-key-not-used-for-verification'
+
+
+class PrincipalCacheTests(TestCase):
+    """Tests for the authenticated principal cache"""
+    
+    def setUp(self):
+        principal_cache.clear()
+        self.factory = RequestFactory()
+        self.user_id = str(uuid.uuid4())
+    
+    def tearDown(self):
+        principal_cache.clear()
+    
+    def make_jwt(self, **claims):
+        payload = {'sub': self.user_id, 'email': 'cached@example.com'}
+        payload.update(claims)
+        return jwt.encode(payload, SIGNING_KEY, algorithm='HS256')
+    
+    def authenticate(self, authenticator, header):
+        request = self.factory.get('/', HTTP_AUTHORIZATION=header)
+        return authenticator.authenticate(request)
+    
+    def test_repeat_requests_skip_database(self):
+        """Only the first request of a new user touches the database"""
+        token = self.make_jwt(exp=int(time.time()) + 3600)
+        with self.assertNumQueries(4):  # SELECT, then INSERT within a savepoint
+            profile, _ = self.authenticate(SupabaseAuthentication(), f'Bearer {token}')
+        self.assertEqual(profile.user_id, self.user_id)
+        
+        with self.assertNumQueries(0):
+            cached, _ = self.authenticate(SupabaseAuthentication(), f'Bearer {token}')
+            # A new token of an already seen user reuses the cached profile
+            other = self.make_jwt(exp=int(time.time()) + 7200)
+            self.authenticate(SupabaseAuthentication(), f'Bearer {other}')
+        self.assertEqual(cached.pk, profile.pk)
+        self.assertIsNot(cached, profile)
+        
+        with self.assertNumQueries(0):
+            self.authenticate(SimpleTokenAuthentication(), f'Token {self.user_id}:abc')
+            self.authenticate(SimpleTokenAuthentication(), f'Token {self.user_id}:abc')
+    
+    def test_requests_get_their_own_profile(self):
+        """Changing one request's cached profile does not leak into other requests"""
+        header = f'Token {self.user_id}'
+        first, _ = self.authenticate(SimpleTokenAuthentication(), header)
+        first.display_name = 'Changed in a view'
+        
+        with self.assertNumQueries(0):
+            second, _ = self.authenticate(SimpleTokenAuthentication(), header)
+            second.display_name = 'Changed in another view'
+            third, _ = self.authenticate(SimpleTokenAuthentication(), header)
+        self.assertNotEqual(third.display_name, 'Changed in a view')
+        self.assertNotEqual(third.display_name, 'Changed in another view')
+        self.assertEqual(principal_cache.get_profile(self.user_id).display_name, third.display_name)
+    
+    def test_profile_update_invalidates(self):
+        """Saving a profile drops its cached principals"""
+        header = f'Token {self.user_id}'
+        self.authenticate(SimpleTokenAuthentication(), header)
+        
+        profile = UserProfile.objects.get(user_id=self.user_id)
+        profile.display_name = 'Renamed'
+        profile.save()
+        
+        with self.assertNumQueries(1):
+            refreshed, _ = self.authenticate(SimpleTokenAuthentication(), header)
+        self.assertEqual(refreshed.display_name, 'Renamed')
+    
+    def test_expired_tokens_are_not_cached(self):
+        """Entries never outlive the token's exp claim"""
+        token = self.make_jwt(exp=int(time.time()) - 10)
+        self.authenticate(SupabaseAuthentication(), f'Bearer {token}')
+        self.assertIsNone(principal_cache.get(token, realm=SupabaseAuthentication.realm))
+        self.assertEqual(len(principal_cache), 0)
+    
+    def test_lru_eviction_and_ttl(self):
+        """The cache is bounded and entries expire after the TTL"""
+        cache = PrincipalCache(max_size=2, ttl=60)
+        profiles = [UserProfile(user_id=str(index), email=f'{index}@example.com') for index in range(3)]
+        cache.set('a', profiles[0])
+        cache.set('b', profiles[1])
+        cache.get('a')
+        cache.set('c', profiles[2])
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNone(cache.get_profile('1'))
+        
+        cache.ttl = 0
+        cache.set('d', profiles[1])
+        self.assertIsNone(cache.get('d'))
+
+
+class CatalogCacheTests(APITestCase):
+    """Tests for the versioned reference catalog cache"""
+    
+    def setUp(self):
+        catalog_cache.clear()
+        profile = UserProfile.objects.create(user_id=str(uuid.uuid4()), email='catalog@example.com')
+        self.client.force_authenticate(user=profile)
+        Exercise.objects.create(name='Squat', muscle_group='legs')
+        Exercise.objects.create(name='Rowing', muscle_group='back', is_cardio=True)
+    
+    def tearDown(self):
+        catalog_cache.clear()
+    
+    def test_steady_state_reads_skip_database(self):
+        """Repeated catalog lists are served from the cache with a stable ETag"""
+        url = reverse('exercise-list')
+        with self.assertNumQueries(2):  # catalog versions, then the list
+            first = self.client.get(url)
+        # Each filter combination is its own entry
+        with self.assertNumQueries(1):
+            self.client.get(url, {'is_cardio': 'true'})
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+            cardio = self.client.get(url, {'is_cardio': 'True'})
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual([exercise['name'] for exercise in cardio.data], ['Rowing'])
+        self.assertNotEqual(cardio['ETag'], first['ETag'])
+        
+        # Searches are answered from the cached search index
+        with self.assertNumQueries(1):
+            self.client.get(url, {'search': 'squ'})
+        with self.assertNumQueries(0):
+            self.client.get(url, {'search': 'row'})
+    
+    def test_if_none_match_returns_not_modified(self):
+        """Clients revalidating with the current ETag get an empty 304"""
+        url = reverse('meal-type-list')
+        MealType.objects.create(name='Breakfast', order=1)
+        etag = self.client.get(url)['ETag']
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+    
+    def test_writes_bump_the_version(self):
+        """Saves, deletes and re-seeding invalidate the cached lists"""
+        url = reverse('exercise-list')
+        etag = self.client.get(url)['ETag']
+        
+        squat = Exercise.objects.get(name='Squat')
+        squat.name = 'Back Squat'
+        squat.save()
+        response = self.client.get(url)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Back Squat', [exercise['name'] for exercise in response.data])
+        
+        squat.delete()
+        self.assertEqual([exercise['name'] for exercise in self.client.get(url).data], ['Rowing'])
+        
+        version = CatalogVersion.objects.get(name='exercises').version
+        call_command('seed_exercises', stdout=StringIO())
+        self.assertGreater(CatalogVersion.objects.get(name='exercises').version, version)
+        self.assertEqual(len(self.client.get(url).data), Exercise.objects.count())
+    
+    def test_other_processes_are_seen_after_ttl(self):
+        """A version bumped elsewhere is picked up once the stored versions are re-read"""
+        url = reverse('exercise-list')
+        self.client.get(url)
+        # Written without signals, as another process's change appears here
+        Exercise.objects.filter(name='Squat').update(name='Front Squat')
+        CatalogVersion.objects.filter(name='exercises').update(version=100)
+        self.assertIn('Squat', [exercise['name'] for exercise in self.client.get(url).data])
+        
+        catalog_cache.ttl = 0
+        try:
+            names = [exercise['name'] for exercise in self.client.get(url).data]
+        finally:
+            catalog_cache.ttl = 30
+        self.assertIn('Front Squat', names)
+
+
+class CatalogSyncTests(APITestCase):
+    """Tests for catalog bundles and delta sync"""
+    
+    def setUp(self):
+        catalog_cache.clear()
+        profile = UserProfile.objects.create(user_id=str(uuid.uuid4()), email='sync@example.com')
+        self.client.force_authenticate(user=profile)
+        self.squat = Exercise.objects.create(name='Squat', muscle_group='legs')
+        Exercise.objects.create(
+            name='My Lift', muscle_group='legs', is_custom=True, created_by=profile.user_id
+        )
+        self.snack = MealType.objects.create(name='Snack', order=4)
+        self.fruits = FoodCategory.objects.create(name='Fruits')
+        FoodItem.objects.create(
+            name='Apple', category=self.fruits, serving_size=100, serving_unit='g',
+            calories=52, protein=0.3, carbs=14, fat=0.2, is_verified=True,
+        )
+        FoodItem.objects.create(
+            name='Homemade Pie', serving_size=100, serving_unit='g', calories=300,
+            protein=3, carbs=40, fat=14, is_custom=True, created_by=profile.user_id,
+        )
+    
+    def tearDown(self):
+        catalog_cache.clear()
+    
+    def names(self, catalog):
+        name = catalog['fields'].index('name')
+        return [row[name] for row in catalog['rows']]
+    
+    def test_bundle_holds_public_rows(self):
+        """The bundle has every public catalog row and a hash stable across rebuilds"""
+        url = reverse('catalog_bundle')
+        response = self.client.get(url)
+        bundle = response.data
+        # Custom exercises bump the version, since exercise lists include
+        # them; private foods are in no cached data and leave it alone
+        self.assertEqual(bundle['version'], '2.1.1.1')
+        self.assertEqual(self.names(bundle['catalogs']['exercises']), ['Squat'])
+        self.assertEqual(self.names(bundle['catalogs']['foods']), ['Apple'])
+        self.assertEqual(self.names(bundle['catalogs']['meal_types']), ['Snack'])
+        self.assertEqual(self.names(bundle['catalogs']['food_categories']), ['Fruits'])
+        
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        
+        catalog_cache.clear()
+        self.assertEqual(self.client.get(url).data['hash'], bundle['hash'])
+    
+    def test_delta_returns_changed_rows(self):
+        """Only rows written since the client's version come back, deletions by id"""
+        version = self.client.get(reverse('catalog_bundle')).data['version']
+        url = reverse('catalog_delta')
+        
+        self.squat.description = 'Barbell back squat'
+        self.squat.save()
+        snack_id = str(self.snack.pk)
+        self.snack.delete()
+        Exercise.objects.create(name='Another Lift', muscle_group='back', is_custom=True)
+        FoodItem.objects.create(
+            name='Banana', category=self.fruits, serving_size=100, serving_unit='g',
+            calories=89, protein=1.1, carbs=23, fat=0.3, is_verified=True,
+        )
+        
+        delta = self.client.get(url, {'since': version}).data
+        self.assertFalse(delta['reset'])
+        self.assertEqual(delta['version'], '4.1.2.2')
+        catalogs = delta['catalogs']
+        self.assertEqual(set(catalogs), {'exercises', 'meal_types', 'foods'})
+        exercises = catalogs['exercises']
+        self.assertEqual(self.names(exercises), ['Squat'])
+        description = exercises['fields'].index('description')
+        self.assertEqual(exercises['rows'][0][description], 'Barbell back squat')
+        self.assertEqual(catalogs['meal_types'], {
+            'fields': ['id', 'name', 'order'], 'rows': [], 'deleted': [snack_id],
+        })
+        self.assertEqual(self.names(catalogs['foods']), ['Banana'])
+        
+        self.assertEqual(self.client.get(url, {'since': delta['version']}).data['catalogs'], {})
+    
+    def test_private_foods_leave_the_version_alone(self):
+        """Custom food writes neither bump the foods version nor drop the cached bundle"""
+        url = reverse('catalog_bundle')
+        etag = self.client.get(url)['ETag']
+        pie = FoodItem.objects.get(name='Homemade Pie')
+        pie.calories = 320
+        pie.save()
+        pie.delete()
+        self.assertEqual(CatalogVersion.objects.get(name='foods').version, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+    
+    def test_delta_validation(self):
+        """Malformed versions are rejected; versions ahead of the server ask for a reset"""
+        url = reverse('catalog_delta')
+        for since in ('', '1.2.3', '1.2.3.x', '-1.0.0.0'):
+            response = self.client.get(url, {'since': since})
+            self.assertEqual(response.status_code, 400, since)
+        
+        delta = self.client.get(url, {'since': '99.0.0.0'}).data
+        self.assertTrue(delta['reset'])
+        self.assertEqual(delta['version'], '2.1.1.1')
+
+
+class DispatchAuthenticationTests(TestCase):
+    """Tests for the single-dispatch authentication front-end"""
+    
+    def setUp(self):
+        principal_cache.clear()
+        reset_verifier_stats()
+        self.factory = RequestFactory()
+        self.user_id = str(uuid.uuid4())
+    
+    def tearDown(self):
+        principal_cache.clear()
+    
+    def authenticate(self, header):
+        request = self.factory.get('/', HTTP_AUTHORIZATION=header)
+        return DispatchAuthentication().authenticate(request)
+    
+    def calls(self):
+        return {name: stats['calls'] for name, stats in get_verifier_stats().items()}
+    
+    def test_routes_by_scheme_and_token_shape(self):
+        """JWTs go to Supabase whatever the scheme; other Token values to the simple verifier"""
+        token = jwt.encode({'sub': self.user_id, 'email': 'dispatch@example.com'}, SIGNING_KEY, algorithm='HS256')
+        
+        profile, _ = self.authenticate(f'Bearer {token}')
+        self.assertEqual(profile.user_id, self.user_id)
+        profile, _ = self.authenticate(f'Token {token}')
+        self.assertEqual(profile.user_id, self.user_id)
+        self.assertEqual(self.calls(), {'supabase': 2})
+        
+        profile, _ = self.authenticate(f'Token {self.user_id}:secret')
+        self.assertEqual(profile.user_id, self.user_id)
+        self.assertEqual(self.calls(), {'supabase': 2, 'simple': 1})
+    
+    def test_rejections_cost_no_lookups(self):
+        """Unknown schemes skip every verifier and bad tokens fail without queries"""
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.authenticate(''))
+            self.assertIsNone(self.authenticate('Basic dXNlcjpwYXNz'))
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate('Bearer not-a-jwt')
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate('Token')
+        
+        stats = get_verifier_stats()
+        self.assertEqual(stats['supabase']['calls'], 1)
+        self.assertEqual(stats['supabase']['failures'], 1)
+        self.assertGreater(stats['supabase']['total_seconds'], 0)
+    
+    def test_default_authentication(self):
+        """API requests authenticate through the dispatcher"""
+        url = reverse('exercise-list')
+        response = self.client.get(url, HTTP_AUTHORIZATION=f'Token {self.user_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.calls(), {'simple': 1})
+        
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 403)
+
+
+STARTUP_SCRIPT = """
+import json, sys
+import django
+django.setup()
+from django.core.management import call_command
+from django.urls import get_resolver
+from api.auth import supabase_client
+created = []
+supabase_client.create_client = lambda: created.append(1)
+call_command('check', verbosity=0)
+get_resolver().url_patterns
+print(json.dumps({
+    'clients_created': len(created),
+    'pool_created': supabase_client._pool is not None,
+    'supabase_modules': sorted(
+        name for name in sys.modules if name.split('.')[0] in ('supabase', 'supabase_auth', 'gotrue', 'postgrest')
+    ),
+}))
+"""
+
+
+class StartupTests(TestCase):
+    """Process startup must not construct or import the Supabase client"""
+    
+    def test_startup_without_supabase(self):
+        """Settings, checks and URLs load without Supabase credentials or SDK import"""
+        env = {
+            key: value for key, value in os.environ.items()
+            if not key.startswith('SUPABASE_')
+        }
+        env['DJANGO_SETTINGS_MODULE'] = 'core.settings'
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT],
+            cwd=backend_dir, env=env, capture_output=True, text=True, timeout=60,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertEqual(report['supabase_modules'], [])
+        self.assertEqual(report['clients_created'], 0)
+        self.assertFalse(report['pool_created'])
+    
+    def test_client_pool_reuses_and_bounds_clients(self):
+        """Clients are created on first borrow, reused, and capped at the pool size"""
+        created = []
+        pool = ClientPool(lambda: created.append(object()) or created[-1], size=2, timeout=0)
+        self.assertEqual(created, [])
+        
+        with pool.client() as first:
+            pass
+        with pool.client() as again:
+            self.assertIs(again, first)
+        self.assertEqual(len(created), 1)
+        
+        held = [pool.acquire(), pool.acquire()]
+        self.assertEqual(len(created), 2)
+        with self.assertRaises(TimeoutError):
+            pool.acquire()
+        
+        pool.release(held[0])
+        self.assertIs(pool.acquire(), held[0])
+        self.assertEqual(len(created), 2)
+    
+    def test_client_pool_discards_signed_in_clients(self):
+        """A client released with discard is never lent again and frees its slot"""
+        created = []
+        pool = ClientPool(lambda: created.append(object()) or created[-1], size=1, timeout=0)
+        
+        with pool.client(discard=True) as signed_in:
+            with self.assertRaises(TimeoutError):
+                pool.acquire()
+        with pool.client() as client:
+            self.assertIsNot(client, signed_in)
+        self.assertEqual(len(created), 2)
+        self.assertEqual(pool.created, 1)
+    
+    def test_client_pool_frees_slot_when_factory_fails(self):
+        """A failed client construction does not use up a slot of the pool"""
+        def factory():
+            raise ImproperlyConfigured('no credentials')
+        pool = ClientPool(factory, size=1, timeout=0)
+        
+        for _ in range(2):
+            with self.assertRaises(ImproperlyConfigured):
+                pool.acquire()
+        self.assertEqual(pool.created, 0)
+
+
+class MetricsTests(TestCase):
+    """Tests for the request metrics middleware and Prometheus endpoint"""
+    
+    def setUp(self):
+        registry.clear()
+        self.user_id = str(uuid.uuid4())
+    
+    def scrape(self, **headers):
+        response = self.client.get(reverse('metrics'), **headers)
+        return response, response.content.decode()
+    
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_requests_are_recorded_per_view(self):
+        """Latency, queries, serializer time and response size are exported per view"""
+        header = {'HTTP_AUTHORIZATION': f'Token {self.user_id}'}
+        self.client.get(reverse('exercise-list'), **header)
+        self.client.get(reverse('exercise-list'), **header)
+        
+        response, body = self.scrape(HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        labels = 'method="GET",view="exercise-list"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 2', body)
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 2', body)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', body)
+        self.assertIn(f'http_request_db_queries_count{{{labels}}} 2', body)
+        self.assertIn(f'http_request_serializer_seconds_count{{{labels}}} 2', body)
+        self.assertNotIn(f'http_request_serializer_seconds_sum{{{labels}}} 0.0\n', body)
+        self.assertIn(f'http_response_bytes_count{{{labels}}} 2', body)
+        self.assertIn('auth_verifier_calls_total{verifier="simple"}', body)
+        # Scrapes are not recorded themselves
+        self.assertNotIn('view="metrics"', body)
+    
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_metrics_token(self):
+        """A configured token is required to scrape"""
+        response, _ = self.scrape()
+        self.assertEqual(response.status_code, 403)
+        response, _ = self.scrape(HTTP_AUTHORIZATION='Bearer wrong-secret')
+        self.assertEqual(response.status_code, 403)
+        response, _ = self.scrape(HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+    
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_closed_without_token(self):
+        """Nothing can scrape when no token is configured"""
+        response, _ = self.scrape()
+        self.assertEqual(response.status_code, 403)
+        response, _ = self.scrape(HTTP_AUTHORIZATION='Bearer None')
+        self.assertEqual(response.status_code, 403)
+
+
+class StructuredLoggingTests(TestCase):
+    """Tests for sampled structured log events"""
+    
+    def setUp(self):
+        self.logger = logging.getLogger('api.tests.structured')
+    
+    def test_sampling(self):
+        """Informational events are sampled, warnings are always emitted"""
+        with self.assertLogs(self.logger, level='INFO') as captured:
+            log_event(self.logger, 'dropped', sample_rate=0.0)
+            log_event(self.logger, 'kept', sample_rate=1.0, user_id='u1')
+            with override_settings(LOG_SAMPLE_RATE=0.0):
+                log_event(self.logger, 'dropped.by.settings')
+                log_event(self.logger, 'warned', level=logging.WARNING)
+        self.assertEqual([record.getMessage() for record in captured.records], ['kept', 'warned'])
+        
+        line = json.loads(StructuredFormatter().format(captured.records[0]))
+        self.assertEqual(line['event'], 'kept')
+        self.assertEqual(line['user_id'], 'u1')
+        self.assertEqual(line['level'], 'INFO')
+
+
+def create_exercises():
+    for name, group in [('Bench Press', 'chest'), ('Squat', 'legs'), ('Row', 'back'),
+                        ('Overhead Press', 'shoulders'), ('Plank', 'core')]:
+        Exercise.objects.create(name=name, muscle_group=group)
+    Exercise.objects.create(name='Running', muscle_group='cardio', is_cardio=True)
+
+
+class GenerateDatasetTests(TestCase):
+    """Tests for the synthetic dataset generator"""
+    
+    def setUp(self):
+        create_exercises()
+    
+    def generate(self, *args):
+        call_command(
+            'generate_dataset', '--users', '2', '--years', '0.25', '--foods', '30', '--seed', '7',
+            *args, stdout=StringIO(),
+        )
+    
+    def test_generates_consistent_dataset(self):
+        """Generated rows come with their rollups, daily totals and search index"""
+        self.generate()
+        user_id = 'synthetic-000001'
+        
+        self.assertEqual(UserProfile.objects.filter(user_id__startswith='synthetic-').count(), 2)
+        self.assertEqual(FoodItem.objects.filter(is_custom=False).count(), 30)
+        sets = WorkoutSet.objects.filter(workout__user_id=user_id)
+        self.assertTrue(sets.exists())
+        self.assertEqual(UserTrainingStats.objects.get(user_id=user_id).total_sets, sets.count())
+        self.assertEqual(
+            DailyNutritionTotals.objects.filter(user_id=user_id).aggregate(total=Sum('calories')),
+            MealEntry.objects.filter(user_id=user_id).aggregate(total=Sum('calories')),
+        )
+        custom = FoodItem.objects.filter(created_by=user_id).first()
+        self.assertTrue(FoodSearchTerm.objects.filter(food_item=custom).exists())
+        
+        # Verified catalog foods are logged for delta sync like any catalog write
+        verified = {str(pk) for pk in FoodItem.objects.filter(is_verified=True).values_list('pk', flat=True)}
+        self.assertTrue(verified)
+        foods = catalog_delta(parse_version('0.0.0.0'))['catalogs']['foods']
+        self.assertEqual({str(row[0]) for row in foods['rows']}, verified)
+        
+        with self.assertRaises(CommandError):
+            self.generate()
+    
+    def test_same_seed_same_data(self):
+        """Regenerating with the same seed reproduces the same rows"""
+        self.generate()
+        snapshot = list(WorkoutSet.objects.order_by('id').values_list('id', 'weight', 'reps'))
+        
+        Workout.objects.all().delete()
+        MealEntry.objects.all().delete()
+        FoodItem.objects.filter(is_custom=True).delete()
+        UserProfile.objects.all().delete()
+        for model in (UserSettings, NutritionGoal, UserFoodItem):
+            model.objects.all().delete()
+        self.generate()
+        self.assertEqual(
+            list(WorkoutSet.objects.order_by('id').values_list('id', 'weight', 'reps')), snapshot
+        )
+
+
+class BenchmarkTests(TestCase):
+    """Tests for the in-process API benchmark"""
+    
+    def setUp(self):
+        create_exercises()
+        call_command(
+            'generate_dataset', '--users', '2', '--years', '0.1', '--foods', '30', stdout=StringIO(),
+        )
+    
+    def test_benchmark_report(self):
+        """Scenarios are replayed, summarized per endpoint and rolled back"""
+        workouts = Workout.objects.count()
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command(
+                'benchmark', '--requests', '40', '--warmup', '5',
+                '--output', output.name, stdout=StringIO(),
+            )
+            report = json.load(output)
+            call_command('benchmark', '--requests', '10', '--baseline', output.name, stdout=StringIO())
+        
+        self.assertGreaterEqual(report['total']['count'], 40)
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertIn('GET food-search', report['endpoints'])
+        for stats in report['endpoints'].values():
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+            self.assertGreaterEqual(stats['mean_queries'], 1)
+        self.assertEqual(Workout.objects.count(), workouts)
@@ -0,0 +1,107 @@
+"""
+Diffing bulk upsert used to seed reference catalogs.
+
+    result = upsert(Exercise, rows, keys=[('id',), ('name',)], fields=FIELDS,
+                    queryset=Exercise.objects.filter(is_custom=False))
+
+Every desired row (an unsaved model instance) is matched to a stored row of
+`queryset` by the first of `keys` whose values agree. Unmatched rows are
+inserted with bulk_create; matched rows whose `fields` differ are updated
+with bulk_update, in one transaction. Stored rows missing from `rows` are
+left alone: nothing is deleted, so rows referenced by user data survive.
+bulk_create and bulk_update send no model signals, so the version of a cached
+catalog (api.catalog) is bumped here in the same transaction, and
+rows_bulk_updated is sent for data derived from the updated fields.
+"""
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from api.catalog import catalog_changed
+
+BATCH_SIZE = 500
+
+# Sent with sender=<model>, instances=<updated rows> and previous=<{pk: {field
+# name: stored value}}> of the changed fields, inside the upsert's transaction
+rows_bulk_updated = Signal()
+
+
+class UpsertResult:
+    __slots__ = ('created', 'updated', 'unchanged')
+
+    def __init__(self, created=(), updated=(), unchanged=0):
+        self.created = list(created)
+        self.updated = list(updated)
+        self.unchanged = unchanged
+
+    def __str__(self):
+        return f'{len(self.created)} created, {len(self.updated)} updated, {self.unchanged} unchanged'
+
+
+def _key(instance, fields):
+    return tuple(_value(instance, field) for field in fields)
+
+
+def _value(instance, field):
+    # attname reads a foreign key's id without fetching the related row
+    return field.to_python(getattr(instance, field.attname))
+
+
+def upsert(model, rows, keys, fields, queryset=None, dry_run=False):
+    """Insert or update `rows` so the stored catalog matches them; see module docstring"""
+    if queryset is None:
+        queryset = model.objects.all()
+    fields = [model._meta.get_field(name) for name in fields]
+    # Compared as to_python values, so a fixture's string pk matches a UUID
+    keys = [[model._meta.get_field(name) for name in key] for key in keys]
+    stored = list(queryset)
+    indexes = []
+    for key in keys:
+        index = {}
+        for instance in stored:
+            index.setdefault(_key(instance, key), instance)
+        indexes.append(index)
+
+    created, updated, changed_fields = [], [], set()
+    previous = {}
+    matched = set()
+    unchanged = 0
+    for row in rows:
+        current = None
+        for key, index in zip(keys, indexes):
+            current = index.get(_key(row, key))
+            if current is not None:
+                break
+        if current is None or current.pk in matched:
+            created.append(row)
+            continue
+        matched.add(current.pk)
+
+        changes = [field for field in fields if _value(current, field) != _value(row, field)]
+        if not changes:
+            unchanged += 1
+            continue
+        previous[current.pk] = {field.name: getattr(current, field.attname) for field in changes}
+        for field in changes:
+            setattr(current, field.attname, getattr(row, field.attname))
+            changed_fields.add(field.name)
+        updated.append(current)
+
+    if not dry_run and (created or updated):
+        # bulk_update skips auto_now fields unless they are listed
+        auto_now = [
+            field.name for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)
+        ]
+        now = timezone.now()
+        for instance in updated:
+            for field in auto_now:
+                setattr(instance, field, now)
+        with transaction.atomic():
+            model.objects.bulk_create(created, batch_size=BATCH_SIZE)
+            if updated:
+                model.objects.bulk_update(
+                    updated, sorted(changed_fields) + auto_now, batch_size=BATCH_SIZE
+                )
+                rows_bulk_updated.send(sender=model, instances=updated, previous=previous)
+            catalog_changed(model, created + updated)
+    return UpsertResult(created, updated, unchanged)
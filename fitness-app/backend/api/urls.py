@@ -6,6 +6,7 @@ from api.auth.views import (
 from api.views.test_views import TestAuthView
 from api.views.auth_views import SignUpView, SignInView, CurrentUserView
 from api.views.profile_views import UserProfileView, UserSettingsView, UserProfileCompleteView
+from api.views.catalog_views import CatalogBundleView, CatalogDeltaView
 
 urlpatterns = [
     path('auth/register/', RegisterView.as_view(), name='register'),
@@ -18,4 +19,6 @@ urlpatterns = [
     path('profile/', UserProfileView.as_view(), name='user_profile'),
     path('profile/settings/', UserSettingsView.as_view(), name='user_settings'),
     path('profile/complete/', UserProfileCompleteView.as_view(), name='user_profile_complete'),
+    path('catalog/bundle/', CatalogBundleView.as_view(), name='catalog_bundle'),
+    path('catalog/delta/', CatalogDeltaView.as_view(), name='catalog_delta'),
 ]
\ No newline at end of file
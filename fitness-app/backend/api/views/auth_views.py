@@ -1,3 +1,5 @@
+import logging
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -8,13 +10,14 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework.permissions import AllowAny
 
+logger = logging.getLogger(__name__)
+
 @method_decorator(csrf_exempt, name='dispatch')
 class SignUpView(APIView):
     permission_classes = [AllowAny]
     
     def post(self, request):
         from ..serializers import UserSerializer
-        import traceback  # Add this import
         
         try:
             serializer = UserSerializer(data=request.data)
@@ -35,22 +38,20 @@ class SignUpView(APIView):
                             }, status=status.HTTP_201_CREATED)
                         except Exception as e:
                             # If token creation fails, log the error and return it
-                            print(f"Token creation error: {str(e)}")
+                            logger.exception("Token creation error")
                             return Response({
                                 'error': f"Failed to create authentication token: {str(e)}"
                             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
                 except Exception as e:
                     # If saving the user fails, log the error and return it
-                    print(f"User save error: {str(e)}")
-                    print(traceback.format_exc())  # Print the full traceback
+                    logger.exception("User save error")
                     return Response({
                         'error': f"Failed to save user: {str(e)}"
                     }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             # Catch any other exceptions
-            print(f"Unexpected error in SignUpView: {str(e)}")
-            print(traceback.format_exc())  # Print the full traceback
+            logger.exception("Unexpected error in SignUpView")
             return Response({
                 'error': f"An unexpected error occurred: {str(e)}"
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
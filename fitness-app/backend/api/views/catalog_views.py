@@ -0,0 +1,28 @@
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from ..catalog import catalog_response
+from ..catalog_sync import catalog_bundle, catalog_delta, parse_version
+
+class CatalogBundleView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """Every reference catalog in one content-hashed bundle, with an ETag"""
+        return catalog_response(request, catalog_bundle())
+
+class CatalogDeltaView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """Catalog rows changed since the version in ?since=, as returned by the bundle"""
+        since = request.query_params.get('since')
+        if not since:
+            return Response({"error": "since is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            versions = parse_version(since)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(catalog_delta(versions))
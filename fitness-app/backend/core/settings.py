@@ -1,7 +1,6 @@
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
-import supabase
 
 load_dotenv()
 
@@ -23,7 +22,51 @@ CORS_ALLOW_CREDENTIALS = True
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
-supabase_client = supabase.create_client(SUPABASE_URL, SUPABASE_KEY)
+# Clients are created on first use (api/auth/supabase_client.py)
+SUPABASE_CLIENT_POOL_SIZE = int(os.getenv('SUPABASE_CLIENT_POOL_SIZE', 4))
+
+# Prometheus scrape endpoint (/metrics); scrapers must send
+# "Authorization: Bearer <METRICS_TOKEN>", and it refuses every request when unset
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Fraction of informational hot-path log events emitted (api/structured_logging.py)
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 0.01))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            '()': 'api.structured_logging.StructuredFormatter',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['console'],
+            'level': os.getenv('LOG_LEVEL', 'INFO'),
+        },
+        'workouts': {
+            'handlers': ['console'],
+            'level': os.getenv('LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+# Authenticated principals cached per process (api/auth/principals.py); other
+# workers see profile changes up to AUTH_PRINCIPAL_CACHE_TTL seconds late
+AUTH_PRINCIPAL_CACHE_SIZE = int(os.getenv('AUTH_PRINCIPAL_CACHE_SIZE', 10000))
+AUTH_PRINCIPAL_CACHE_TTL = int(os.getenv('AUTH_PRINCIPAL_CACHE_TTL', 300))  # seconds
+
+# Serialized reference catalogs cached per process (api/catalog.py); stored
+# catalog versions are re-read at most every CATALOG_CACHE_TTL seconds
+CATALOG_CACHE_SIZE = int(os.getenv('CATALOG_CACHE_SIZE', 256))
+CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', 30))  # seconds
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -42,9 +85,12 @@ INSTALLED_APPS = [
     'api',
     'workouts',  # Add this line
     'api.nutrition.apps.NutritionConfig',  # Use the proper app config
+    'api.analytics.apps.AnalyticsConfig',
 ]
 
 MIDDLEWARE = [
+    # Outermost, so latency and query counts cover every other middleware
+    'api.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -57,14 +103,15 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'api.auth.middleware.SimpleTokenAuthentication',
-        'api.auth.middleware.SupabaseAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        # Routes each Authorization header to exactly one verifier
+        'api.auth.dispatch.DispatchAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    # Keyset pagination keyed on each view's ordering; see api/pagination.py
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
 SIMPLE_JWT = {
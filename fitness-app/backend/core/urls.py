@@ -17,6 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from api.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
@@ -24,4 +26,8 @@ urlpatterns = [
     path('api/workouts/', include('workouts.urls')),
     # Use 'api/nutrition/' prefix for all nutrition endpoints
     path('api/nutrition/', include('api.nutrition.urls')),
+    # Use 'api/analytics/' prefix for all analytics endpoints
+    path('api/analytics/', include('api.analytics.urls')),
+    # Prometheus metrics of this process
+    path('metrics', metrics_view, name='metrics'),
 ]
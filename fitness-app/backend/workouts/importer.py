@@ -0,0 +1,440 @@
+"""
+Bulk import of workout history from CSV exports of other training logs.
+
+Headers of Strong, Hevy and this app's own CSV export (see
+WorkoutViewSet.export) are recognised; see COLUMN_ALIASES. The file is read
+row by row. Consecutive rows with the same date, start time and workout name
+form one Workout, and each row becomes one WorkoutSet.
+
+Exercise names are resolved once per distinct name against the catalog and
+the user's own custom exercises, in this order:
+- an exact match after normalization;
+- the name without a parenthesised suffix, e.g. "Bench Press (Barbell)";
+- the same words in any order;
+- a close fuzzy match.
+Sets of names that still don't match are skipped and the names reported;
+an import never adds exercises, which every user would see in the shared
+catalog.
+
+Workouts are written in batches of about batch_size sets, each batch in one
+transaction. Workout ids are derived from the user and the workout's
+date, time and name, so re-running an interrupted or repeated import skips
+workouts that are already stored and resumes where it stopped. Training
+rollups are rebuilt for the user once the import finishes or stops, so
+batches committed before an error are counted.
+"""
+import csv
+import difflib
+import re
+import uuid
+from datetime import datetime, time
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Exercise, Workout, WorkoutSet
+from .rollups import rebuild_user_stats
+
+# Namespace of the deterministic ids of imported workouts
+IMPORT_NAMESPACE = uuid.UUID('6f0d3f1e-9a4b-4c55-8f43-1b7e2d9c0a61')
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Similarity (0-1) a fuzzy exercise match needs
+FUZZY_CUTOFF = 0.85
+
+# Row errors kept in the import summary
+MAX_REPORTED_ERRORS = 20
+
+KG_PER_LB = 0.45359237
+
+# Normalized CSV header -> (field, scale applied to numeric values)
+COLUMN_ALIASES = {
+    'date': ('date', None),
+    'workout_date': ('date', None),
+    'start_time': ('start_time', None),
+    'time': ('start_time', None),
+    'end_time': ('end_time', None),
+    'workout_name': ('workout', None),
+    'title': ('workout', None),
+    'duration': ('duration', None),
+    'workout_duration': ('duration', None),
+    'workout_notes': ('workout_notes', None),
+    'description': ('workout_notes', None),
+    'exercise': ('exercise', None),
+    'exercise_name': ('exercise', None),
+    'exercise_title': ('exercise', None),
+    'set_order': ('set_order', None),
+    'set_number': ('set_order', None),
+    'set_index': ('set_order', None),
+    'set_type': ('set_type', None),
+    'is_warmup': ('is_warmup', None),
+    'weight': ('weight', None),
+    'weight_kg': ('weight', 1.0),
+    'weight_lb': ('weight', KG_PER_LB),
+    'weight_lbs': ('weight', KG_PER_LB),
+    'reps': ('reps', None),
+    'distance': ('distance', None),
+    'distance_m': ('distance', 1.0),
+    'distance_km': ('distance', 1000.0),
+    'seconds': ('seconds', None),
+    'duration_seconds': ('seconds', None),
+    'set_duration': ('seconds', None),
+    'rpe': ('rpe', None),
+    'notes': ('notes', None),
+    'set_notes': ('notes', None),
+    'exercise_notes': ('notes', None),
+}
+
+DATETIME_FORMATS = [
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d',
+    '%d %b %Y, %H:%M', '%d %b %Y', '%m/%d/%Y %H:%M', '%m/%d/%Y',
+]
+TIME_FORMATS = ['%H:%M:%S', '%H:%M']
+
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+_PARENTHESIZED_RE = re.compile(r'\([^)]*\)')
+_DURATION_RE = re.compile(r'^(?:(\d+)\s*h)?\s*(?:(\d+)\s*m(?:in)?)?\s*(?:(\d+)\s*s)?$')
+
+
+class WorkoutImportError(ValueError):
+    """A row or file that cannot be imported"""
+
+
+def exercise_owner(user_id):
+    """Exercise.created_by of a user's custom exercises; None unless the user id is a UUID"""
+    try:
+        return uuid.UUID(str(user_id))
+    except ValueError:
+        return None
+
+
+def normalize_name(name):
+    return ' '.join(_NON_ALNUM_RE.sub(' ', (name or '').lower()).split())
+
+
+def normalize_header(header):
+    return '_'.join(_NON_ALNUM_RE.sub(' ', (header or '').lower()).split())
+
+
+def parse_datetime(value):
+    """(date, time or None) of a date or date-time string"""
+    value = value.strip()
+    for fmt in DATETIME_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        has_time = '%H' in fmt
+        return parsed.date(), parsed.time() if has_time else None
+    raise WorkoutImportError(f'Unrecognised date "{value}"')
+
+
+def parse_time(value):
+    value = value.strip()
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    return parse_datetime(value)[1]
+
+
+def parse_minutes(value):
+    """Workout duration in minutes, from "75", "1h 15m" or "4500s" """
+    value = value.strip().lower()
+    if not value:
+        return 0
+    try:
+        return int(float(value))
+    except ValueError:
+        pass
+    match = _DURATION_RE.match(value)
+    if not match or not any(match.groups()):
+        raise WorkoutImportError(f'Unrecognised duration "{value}"')
+    hours, minutes, seconds = (int(group or 0) for group in match.groups())
+    return hours * 60 + minutes + seconds // 60
+
+
+def parse_number(value, scale=None, integer=False):
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise WorkoutImportError(f'Invalid number "{value}"')
+    if scale is not None:
+        number *= scale
+    return int(number) if integer else number
+
+
+class ExerciseIndex:
+    """In-memory name index of the exercises a user may log"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.by_name = {}
+        self.by_words = {}
+        self.cache = {}
+        visible = Q(is_custom=False)
+        owner = exercise_owner(user_id)
+        if owner is not None:
+            visible |= Q(is_custom=True, created_by=owner)
+        exercises = Exercise.objects.filter(visible)
+        for exercise in exercises.order_by('is_custom', 'name'):
+            self.add(exercise)
+
+    def add(self, exercise):
+        key = normalize_name(exercise.name)
+        self.by_name.setdefault(key, exercise)
+        self.by_words.setdefault(' '.join(sorted(key.split())), exercise)
+
+    def resolve(self, name):
+        """The exercise for a name as written in the file, or None"""
+        if name not in self.cache:
+            self.cache[name] = self.match(name)
+        return self.cache[name]
+
+    def match(self, name):
+        key = normalize_name(name)
+        if not key:
+            return None
+        candidates = [key, normalize_name(_PARENTHESIZED_RE.sub(' ', name))]
+        for candidate in candidates:
+            if candidate in self.by_name:
+                return self.by_name[candidate]
+        for candidate in candidates:
+            words = ' '.join(sorted(candidate.split()))
+            if words in self.by_words:
+                return self.by_words[words]
+        close = difflib.get_close_matches(key, list(self.by_name), n=1, cutoff=FUZZY_CUTOFF)
+        return self.by_name[close[0]] if close else None
+
+
+class ImportStats:
+    """Progress and outcome of an import"""
+
+    __slots__ = (
+        'rows', 'invalid_rows', 'duplicate_rows', 'workouts', 'skipped_workouts', 'sets',
+        'unknown_exercises', 'errors',
+    )
+
+    def __init__(self):
+        self.rows = 0
+        self.invalid_rows = 0
+        self.duplicate_rows = 0
+        self.workouts = 0
+        self.skipped_workouts = 0
+        self.sets = 0
+        self.unknown_exercises = set()
+        self.errors = []
+
+    def error(self, line, message):
+        self.invalid_rows += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'invalid_rows': self.invalid_rows,
+            'duplicate_rows': self.duplicate_rows,
+            'workouts': self.workouts,
+            'skipped_workouts': self.skipped_workouts,
+            'sets': self.sets,
+            'unknown_exercises': sorted(self.unknown_exercises),
+            'errors': self.errors,
+        }
+
+
+class PendingWorkout:
+    """A workout being assembled from consecutive rows"""
+
+    __slots__ = ('workout', 'sets', 'set_numbers')
+
+    def __init__(self, workout):
+        self.workout = workout
+        self.sets = []
+        # Next set number per exercise; file set orders may repeat or be
+        # letters (W, D, F), so numbers are allocated in file order
+        self.set_numbers = {}
+
+    def add_set(self, exercise, **fields):
+        set_number = self.set_numbers.get(exercise.id, 0) + 1
+        self.set_numbers[exercise.id] = set_number
+        self.sets.append(WorkoutSet(
+            workout=self.workout, exercise=exercise, set_number=set_number, **fields
+        ))
+
+
+class WorkoutImporter:
+    """
+    Imports one user's workout history from CSV rows.
+
+        importer = WorkoutImporter(user_id, progress=callback)
+        stats = importer.run(text_file)
+
+    progress(stats) is called after each committed batch.
+    """
+
+    def __init__(self, user_id, batch_size=DEFAULT_BATCH_SIZE, weight_scale=1.0, progress=None):
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.weight_scale = weight_scale
+        self.progress = progress
+        self.exercises = ExerciseIndex(user_id)
+        self.stats = ImportStats()
+        self.batch = {}
+        self.batch_sets = 0
+        self.current = None
+        self.finished = set()
+
+    def run(self, text_file):
+        reader = csv.reader(text_file)
+        header = next(reader, None)
+        if header is None:
+            raise WorkoutImportError('The file is empty')
+        columns = self.map_columns(header)
+
+        try:
+            for line, values in enumerate(reader, start=2):
+                if not any(value.strip() for value in values):
+                    continue
+                self.stats.rows += 1
+                row = {}
+                for index, value in enumerate(values):
+                    if index in columns:
+                        field, scale = columns[index]
+                        row.setdefault(field, (value, scale))
+                try:
+                    self.add_row(row)
+                except WorkoutImportError as e:
+                    self.stats.error(line, str(e))
+
+            self.finish_current()
+            self.flush()
+        finally:
+            # Batches bypass the set signals and may be committed before a
+            # read or decode error stops the import
+            rebuild_user_stats(user_ids=[self.user_id])
+        return self.stats
+
+    def map_columns(self, header):
+        """CSV column index -> (field, scale) of every recognised column"""
+        columns = {}
+        fields = set()
+        for index, name in enumerate(header):
+            alias = COLUMN_ALIASES.get(normalize_header(name))
+            if alias and alias[0] not in fields:
+                columns[index] = alias
+                fields.add(alias[0])
+        if 'exercise' not in fields or not fields & {'date', 'start_time'}:
+            raise WorkoutImportError('The file needs an exercise column and a date or start time column')
+        return columns
+
+    def value(self, row, field):
+        return row.get(field, ('', None))[0].strip()
+
+    def number(self, row, field, integer=False, default_scale=None):
+        value, scale = row.get(field, ('', None))
+        return parse_number(value, scale if scale is not None else default_scale, integer)
+
+    def add_row(self, row):
+        day, start_time = parse_datetime(self.value(row, 'date') or self.value(row, 'start_time'))
+        if self.value(row, 'start_time'):
+            start_time = parse_time(self.value(row, 'start_time')) or start_time
+        start_time = start_time or time(0, 0)
+        name = self.value(row, 'workout')[:100] or 'Imported Workout'
+        workout_id = uuid.uuid5(IMPORT_NAMESPACE, f'{self.user_id}|{day}|{start_time}|{name}')
+
+        if self.current is None or self.current.workout.id != workout_id:
+            self.finish_current()
+            if workout_id in self.finished:
+                # A workout whose rows are not contiguous in the file
+                pending = self.batch.get(workout_id)
+                if pending is None:
+                    self.stats.duplicate_rows += 1
+                    return
+                self.current = pending
+            else:
+                self.current = PendingWorkout(self.new_workout(workout_id, row, day, start_time, name))
+
+        reps = self.number(row, 'reps', integer=True)
+        weight = self.number(row, 'weight', default_scale=self.weight_scale)
+        seconds = self.number(row, 'seconds', integer=True)
+        distance = self.number(row, 'distance')
+        rpe = self.number(row, 'rpe')
+
+        exercise_name = self.value(row, 'exercise')
+        if not exercise_name:
+            # Workouts without sets are exported as a row without an exercise
+            return
+        exercise = self.exercises.resolve(exercise_name)
+        if exercise is None:
+            self.stats.unknown_exercises.add(exercise_name)
+            return
+
+        set_type = (self.value(row, 'set_type') or self.value(row, 'set_order')).lower()
+        self.current.add_set(
+            exercise,
+            reps=reps or 0,
+            weight=round(weight, 2) if weight else None,
+            duration=seconds or None,
+            distance=distance or None,
+            rpe=int(round(rpe)) if rpe else None,
+            is_warmup=set_type in ('w', 'warmup') or self.value(row, 'is_warmup').lower() == 'true',
+            notes=self.value(row, 'notes')[:255],
+        )
+
+    def new_workout(self, workout_id, row, day, start_time, name):
+        end_time = None
+        if self.value(row, 'end_time'):
+            end_time = parse_time(self.value(row, 'end_time'))
+        duration = parse_minutes(self.value(row, 'duration'))
+        if not duration and end_time and end_time > start_time:
+            duration = (
+                datetime.combine(day, end_time) - datetime.combine(day, start_time)
+            ).seconds // 60
+        return Workout(
+            id=workout_id,
+            user_id=self.user_id,
+            name=name,
+            date=day,
+            start_time=start_time,
+            end_time=end_time,
+            duration=duration,
+            notes=self.value(row, 'workout_notes'),
+        )
+
+    def finish_current(self):
+        if self.current is None:
+            return
+        workout_id = self.current.workout.id
+        if workout_id not in self.batch:
+            self.batch[workout_id] = self.current
+            self.finished.add(workout_id)
+        self.batch_sets = sum(len(pending.sets) for pending in self.batch.values())
+        self.current = None
+        if self.batch_sets >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the batch in one transaction, skipping workouts stored by an earlier run"""
+        if not self.batch:
+            return
+        with transaction.atomic():
+            existing = set(Workout.objects.filter(pk__in=list(self.batch)).values_list('pk', flat=True))
+            new = [pending for workout_id, pending in self.batch.items() if workout_id not in existing]
+            Workout.objects.bulk_create([pending.workout for pending in new])
+            WorkoutSet.objects.bulk_create(
+                [workout_set for pending in new for workout_set in pending.sets],
+                batch_size=1000,
+            )
+        self.stats.workouts += len(new)
+        self.stats.skipped_workouts += len(existing)
+        self.stats.sets += sum(len(pending.sets) for pending in new)
+        self.batch = {}
+        self.batch_sets = 0
+        if self.progress is not None:
+            self.progress(self.stats)
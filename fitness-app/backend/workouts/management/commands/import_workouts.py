@@ -0,0 +1,61 @@
+import io
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import UserProfile
+from workouts.importer import DEFAULT_BATCH_SIZE, KG_PER_LB, WorkoutImporter, WorkoutImportError
+
+
+class Command(BaseCommand):
+    help = 'Import a workout history CSV (Strong, Hevy or this app\'s export) for a user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument('--user', required=True, help='User ID to import the workouts for')
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Approximate number of sets written per transaction'
+        )
+        parser.add_argument(
+            '--weight-unit', choices=['kg', 'lb'], default='kg',
+            help='Unit of a plain "Weight" column (weight_kg/weight_lbs columns are converted regardless)'
+        )
+
+    def handle(self, *args, **options):
+        user_id = options['user']
+        if not UserProfile.objects.filter(user_id=user_id).exists():
+            raise CommandError(f'User "{user_id}" does not exist')
+        try:
+            size = os.path.getsize(options['path'])
+            raw = open(options['path'], 'rb')
+        except OSError as e:
+            raise CommandError(str(e))
+
+        def progress(stats):
+            percent = raw.tell() * 100 // size if size else 100
+            self.stdout.write(
+                f'{percent}%: {stats.rows} rows, {stats.workouts} workouts, {stats.sets} sets, '
+                f'{stats.skipped_workouts} already imported'
+            )
+
+        importer = WorkoutImporter(
+            user_id,
+            batch_size=max(options['batch_size'], 1),
+            weight_scale=KG_PER_LB if options['weight_unit'] == 'lb' else 1.0,
+            progress=progress,
+        )
+        with raw, io.TextIOWrapper(raw, encoding='utf-8-sig', newline='') as text_file:
+            try:
+                stats = importer.run(text_file)
+            except (WorkoutImportError, UnicodeDecodeError) as e:
+                raise CommandError(f'Import stopped: {e}. Re-run to resume; stored workouts are skipped')
+
+        for error in stats.errors:
+            self.stdout.write(self.style.WARNING(f'Line {error["line"]}: {error["error"]}'))
+        if stats.unknown_exercises:
+            self.stdout.write(f'Skipped unknown exercises: {", ".join(sorted(stats.unknown_exercises))}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {stats.workouts} workouts and {stats.sets} sets from {stats.rows} rows '
+            f'({stats.skipped_workouts} workouts already imported, {stats.invalid_rows} invalid rows)'
+        ))
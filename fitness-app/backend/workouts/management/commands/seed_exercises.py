@@ -1,15 +1,24 @@
 from django.core.management.base import BaseCommand
+from api.upsert import upsert
 from workouts.models import Exercise  # Updated import
 import json
 import os
 
+EXERCISE_FIELDS = [
+    'name', 'description', 'muscle_group', 'is_cardio', 'is_custom', 'equipment_needed',
+    'difficulty_level', 'illustration', 'video_url',
+]
+
 class Command(BaseCommand):
-    help = 'Seed the database with common exercises'
+    help = 'Seed the database with common exercises, updating only what changed'
 
-    def handle(self, *args, **kwargs):
-        # Clear existing exercises that are not custom
-        Exercise.objects.filter(is_custom=False).delete()
-        
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would be created or updated without writing'
+        )
+
+    def handle(self, *args, **options):
         # Path to the exercises.json file
         fixtures_path = os.path.join(
             os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
@@ -29,10 +38,10 @@ class Command(BaseCommand):
         with open(fixtures_path, 'r') as f:
             exercises = json.load(f)
         
-        count = 0
+        rows = []
         for exercise_data in exercises:
             fields = exercise_data.get('fields', {})
-            Exercise.objects.create(
+            rows.append(Exercise(
                 id=exercise_data.get('pk'),
                 name=fields.get('name'),
                 description=fields.get('description'),
@@ -43,10 +52,28 @@ class Command(BaseCommand):
                 difficulty_level=fields.get('difficulty_level', 1),
                 illustration=fields.get('illustration', ''),
                 video_url=fields.get('video_url', '')
-            )
-            count += 1
+            ))
+        
+        # Match by fixture pk, falling back to the name for exercises seeded
+        # before the fixture had stable pks. Exercises dropped from the
+        # fixture are kept since workout sets may reference them.
+        result = upsert(
+            Exercise,
+            rows,
+            keys=[('id',), ('name',)],
+            fields=EXERCISE_FIELDS,
+            queryset=Exercise.objects.filter(is_custom=False),
+            dry_run=options['dry_run'],
+        )
         
-        self.stdout.write(self.style.SUCCESS(f'Successfully seeded {count} exercises'))
+        for exercise in result.created:
+            self.stdout.write(f'Added exercise: {exercise.name}')
+        for exercise in result.updated:
+            self.stdout.write(f'Updated exercise: {exercise.name}')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Dry run, nothing written: {result}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Successfully seeded exercises: {result}'))
     
     def _create_initial_exercises_file(self, filepath):
         """Create a basic exercises fixture file if it doesn't exist"""
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:24
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    Workout = apps.get_model('workouts', 'Workout')
+    WorkoutSet = apps.get_model('workouts', 'WorkoutSet')
+    UserTrainingStats = apps.get_model('workouts', 'UserTrainingStats')
+    UserMuscleGroupStats = apps.get_model('workouts', 'UserMuscleGroupStats')
+
+    stats = {}
+    for row in Workout.objects.values('user_id').annotate(
+        workout_count=Count('id'), duration=Sum('duration')
+    ).order_by():
+        stats[row['user_id']] = UserTrainingStats(
+            user_id=row['user_id'],
+            total_workouts=row['workout_count'],
+            total_duration=row['duration'] or 0,
+        )
+
+    muscle_stats = []
+    for row in WorkoutSet.objects.values('workout__user_id', 'exercise__muscle_group').annotate(
+        set_count=Count('id'), rep_total=Sum('reps'), volume=Sum(F('weight') * F('reps'))
+    ).order_by('workout__user_id', '-set_count', 'exercise__muscle_group'):
+        user_stats = stats.setdefault(
+            row['workout__user_id'], UserTrainingStats(user_id=row['workout__user_id'])
+        )
+        muscle_stats.append(UserMuscleGroupStats(
+            user_id=row['workout__user_id'],
+            muscle_group=row['exercise__muscle_group'],
+            total_sets=row['set_count'],
+            total_reps=row['rep_total'] or 0,
+            total_volume=row['volume'] or 0,
+        ))
+        if not user_stats.most_trained_muscle:
+            user_stats.most_trained_muscle = row['exercise__muscle_group']
+        user_stats.total_sets += row['set_count']
+        user_stats.total_reps += row['rep_total'] or 0
+        user_stats.total_volume += row['volume'] or 0
+
+    UserTrainingStats.objects.bulk_create(stats.values(), batch_size=1000)
+    UserMuscleGroupStats.objects.bulk_create(muscle_stats, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0002_workout_workoutset'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTrainingStats',
+            fields=[
+                ('user_id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('total_workouts', models.IntegerField(default=0)),
+                ('total_duration', models.IntegerField(default=0, help_text='Sum of workout durations in minutes')),
+                ('total_sets', models.IntegerField(default=0)),
+                ('total_reps', models.IntegerField(default=0)),
+                ('total_volume', models.FloatField(default=0, help_text='Sum of weight × reps in kg')),
+                ('most_trained_muscle', models.CharField(blank=True, max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'User training stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserMuscleGroupStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=255)),
+                ('muscle_group', models.CharField(max_length=50)),
+                ('total_sets', models.IntegerField(default=0)),
+                ('total_reps', models.IntegerField(default=0)),
+                ('total_volume', models.FloatField(default=0, help_text='Sum of weight × reps in kg')),
+            ],
+            options={
+                'verbose_name_plural': 'User muscle group stats',
+                'ordering': ['user_id', '-total_sets', 'muscle_group'],
+                'unique_together': {('user_id', 'muscle_group')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
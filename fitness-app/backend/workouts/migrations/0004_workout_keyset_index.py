@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0003_training_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workout',
+            index=models.Index(fields=['user_id', '-date', '-start_time', 'id'], name='workouts_wo_user_id_04dde0_idx'),
+        ),
+    ]
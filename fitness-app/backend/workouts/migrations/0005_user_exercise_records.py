@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_records(apps, schema_editor):
+    # Frozen copy of workouts.records.best_records as of this migration
+    def estimated_1rm(weight, reps):
+        if reps > 12:
+            return None
+        if reps <= 10:
+            return round(weight * 36 / (37 - reps), 2)
+        return round(weight * (1 + reps / 30), 2)
+
+    def beats(value, on, best, best_on):
+        return best is None or value > best or (value == best and on < best_on)
+
+    WorkoutSet = apps.get_model('workouts', 'WorkoutSet')
+    UserExerciseRecord = apps.get_model('workouts', 'UserExerciseRecord')
+    rows = WorkoutSet.objects.filter(weight__gt=0, reps__gt=0, is_warmup=False).values_list(
+        'workout__user_id', 'exercise_id', 'weight', 'reps', 'workout__date'
+    )
+    records = {}
+    for user_id, exercise_id, weight, reps, performed_on in rows.iterator(chunk_size=5000):
+        e1rm = estimated_1rm(weight, reps)
+        record = records.get((user_id, exercise_id))
+        if record is None:
+            records[(user_id, exercise_id)] = UserExerciseRecord(
+                user_id=user_id, exercise_id=exercise_id,
+                best_weight=weight, best_weight_reps=reps, best_weight_date=performed_on,
+                best_e1rm=e1rm, best_e1rm_date=performed_on if e1rm is not None else None,
+                best_volume=weight * reps, best_volume_date=performed_on,
+            )
+            continue
+        if beats(
+            (weight, reps), performed_on,
+            (record.best_weight, record.best_weight_reps), record.best_weight_date,
+        ):
+            record.best_weight = weight
+            record.best_weight_reps = reps
+            record.best_weight_date = performed_on
+        if e1rm is not None and beats(e1rm, performed_on, record.best_e1rm, record.best_e1rm_date):
+            record.best_e1rm = e1rm
+            record.best_e1rm_date = performed_on
+        if beats(weight * reps, performed_on, record.best_volume, record.best_volume_date):
+            record.best_volume = weight * reps
+            record.best_volume_date = performed_on
+    UserExerciseRecord.objects.bulk_create(records.values(), batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0004_workout_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserExerciseRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=255)),
+                ('best_weight', models.FloatField(help_text='Heaviest working set in kg')),
+                ('best_weight_reps', models.IntegerField(help_text='Most reps performed at best_weight')),
+                ('best_weight_date', models.DateField()),
+                ('best_e1rm', models.FloatField(blank=True, help_text='Best estimated one-rep max in kg', null=True)),
+                ('best_e1rm_date', models.DateField(blank=True, null=True)),
+                ('best_volume', models.FloatField(help_text='Highest weight × reps of a single set in kg')),
+                ('best_volume_date', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='records', to='workouts.exercise')),
+            ],
+            options={
+                'unique_together': {('user_id', 'exercise')},
+            },
+        ),
+        migrations.RunPython(backfill_records, migrations.RunPython.noop),
+    ]
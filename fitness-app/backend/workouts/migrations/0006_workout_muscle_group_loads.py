@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_loads(apps, schema_editor):
+    # Frozen copy of workouts.rollups.workout_loads as of this migration
+    WorkoutSet = apps.get_model('workouts', 'WorkoutSet')
+    WorkoutMuscleGroupLoad = apps.get_model('workouts', 'WorkoutMuscleGroupLoad')
+    rows = WorkoutSet.objects.filter(is_warmup=False).values(
+        'workout_id', 'exercise__muscle_group'
+    ).annotate(
+        set_count=models.Count('id'),
+        tonnage=models.Sum(models.F('weight') * models.F('reps')),
+        rpe_total=models.Sum('rpe'),
+        rpe_sets=models.Count('rpe'),
+    ).order_by()
+    WorkoutMuscleGroupLoad.objects.bulk_create((
+        WorkoutMuscleGroupLoad(
+            workout_id=row['workout_id'],
+            muscle_group=row['exercise__muscle_group'],
+            total_sets=row['set_count'],
+            tonnage=row['tonnage'] or 0,
+            rpe_total=row['rpe_total'] or 0,
+            rpe_sets=row['rpe_sets'],
+        )
+        for row in rows.iterator(chunk_size=5000)
+    ), batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0005_user_exercise_records'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutMuscleGroupLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('muscle_group', models.CharField(max_length=50)),
+                ('total_sets', models.IntegerField(default=0)),
+                ('tonnage', models.FloatField(default=0, help_text='Sum of weight × reps in kg')),
+                ('rpe_total', models.IntegerField(default=0, help_text='Sum of the RPE of sets that have one')),
+                ('rpe_sets', models.IntegerField(default=0, help_text='Number of sets with an RPE')),
+                ('workout', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='muscle_group_loads', to='workouts.workout')),
+            ],
+            options={
+                'unique_together': {('workout', 'muscle_group')},
+            },
+        ),
+        migrations.RunPython(backfill_loads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:19
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_usage(apps, schema_editor):
+    # Frozen copy of workouts.rollups.exercise_usage as of this migration
+    epoch = datetime.date(2020, 1, 1)
+
+    def decay(from_day, to_day):
+        return 2.0 ** max(min(from_day - to_day, 0) / 30, -100)
+
+    WorkoutSet = apps.get_model('workouts', 'WorkoutSet')
+    UserExerciseUsage = apps.get_model('workouts', 'UserExerciseUsage')
+    rows = WorkoutSet.objects.values('workout__user_id', 'exercise_id', 'workout__date').annotate(
+        set_count=models.Count('id'),
+    ).order_by()
+    usage = {}
+    for row in rows.iterator(chunk_size=5000):
+        key = (row['workout__user_id'], row['exercise_id'])
+        performed_on = row['workout__date']
+        if isinstance(performed_on, str):
+            performed_on = datetime.date.fromisoformat(performed_on)
+        day = (performed_on - epoch).days
+        if key not in usage:
+            usage[key] = UserExerciseUsage(
+                user_id=key[0], exercise_id=key[1], total_sets=0, score=0.0, scored_day=day
+            )
+        entry = usage[key]
+        reference = max(entry.scored_day, day)
+        entry.score = (
+            entry.score * decay(entry.scored_day, reference)
+            + row['set_count'] * decay(day, reference)
+        )
+        entry.scored_day = reference
+        entry.total_sets += row['set_count']
+    UserExerciseUsage.objects.bulk_create(usage.values(), batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0006_workout_muscle_group_loads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserExerciseUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=255)),
+                ('total_sets', models.IntegerField(default=0)),
+                ('score', models.FloatField(default=0)),
+                ('scored_day', models.IntegerField(default=0)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='workouts.exercise')),
+            ],
+            options={
+                'unique_together': {('user_id', 'exercise')},
+            },
+        ),
+        migrations.RunPython(backfill_usage, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 import uuid
 
 class Exercise(models.Model):
@@ -36,6 +37,36 @@ class Exercise(models.Model):
     def __str__(self):
         return self.name
 
+class WorkoutQuerySet(models.QuerySet):
+    def for_user(self, user_id):
+        return self.filter(user_id=user_id)
+    
+    def with_sets(self):
+        """
+        Load sets and their exercises up front, so serializing any number of
+        workouts with WorkoutSerializer costs a constant number of queries
+        """
+        return self.prefetch_related(
+            models.Prefetch(
+                'sets',
+                queryset=WorkoutSet.objects.select_related('exercise'),
+            )
+        )
+    
+    def for_set_logging(self, exercise_id):
+        """
+        Lock the workouts until the end of the transaction and annotate each
+        with `next_set_number`, the number the next set of the exercise gets.
+        Concurrent writers to a workout queue on its row lock, so numbers are
+        allocated with this one query and never collide.
+        """
+        last = WorkoutSet.objects.filter(
+            workout=models.OuterRef('pk'), exercise_id=exercise_id,
+        ).order_by('-set_number').values('set_number')[:1]
+        return self.select_for_update().annotate(
+            next_set_number=Coalesce(models.Subquery(last), 0) + 1
+        )
+
 class Workout(models.Model):
     """
     Represents a single workout session
@@ -56,14 +87,24 @@ class Workout(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = WorkoutQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-date', '-start_time']
         indexes = [
             models.Index(fields=['user_id', 'date']),
+            # Keyset pagination of a user's workouts
+            models.Index(fields=['user_id', '-date', '-start_time', 'id']),
         ]
     
     def __str__(self):
         return f"{self.name} on {self.date}"
+    
+    def save(self, *args, **kwargs):
+        # Training rollups are updated by post_save handlers (workouts.signals);
+        # keep them in the same transaction as the row itself
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 class WorkoutSet(models.Model):
     """
@@ -88,9 +129,119 @@ class WorkoutSet(models.Model):
     class Meta:
         ordering = ['workout', 'exercise', 'set_number']
         unique_together = ['workout', 'exercise', 'set_number']
+    
+    def save(self, *args, **kwargs):
+        # See Workout.save
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         if self.weight:
             return f"{self.exercise.name}: {self.reps} at {self.weight}kg"
         else:
             return f"{self.exercise.name}: {self.reps} reps"
+
+class UserTrainingStats(models.Model):
+    """
+    Running training totals for a user, maintained as sets and workouts are written
+    """
+    user_id = models.CharField(max_length=255, primary_key=True)  # Match to Supabase user_id
+    total_workouts = models.IntegerField(default=0)
+    total_duration = models.IntegerField(default=0, help_text="Sum of workout durations in minutes")
+    total_sets = models.IntegerField(default=0)
+    total_reps = models.IntegerField(default=0)
+    total_volume = models.FloatField(default=0, help_text="Sum of weight × reps in kg")
+    most_trained_muscle = models.CharField(max_length=50, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "User training stats"
+    
+    @property
+    def average_duration(self):
+        if not self.total_workouts:
+            return 0
+        return self.total_duration / self.total_workouts
+    
+    def __str__(self):
+        return f"Training stats - {self.user_id}"
+
+class UserMuscleGroupStats(models.Model):
+    """
+    Running training totals for a user and muscle group
+    """
+    user_id = models.CharField(max_length=255)
+    muscle_group = models.CharField(max_length=50)
+    total_sets = models.IntegerField(default=0)
+    total_reps = models.IntegerField(default=0)
+    total_volume = models.FloatField(default=0, help_text="Sum of weight × reps in kg")
+    
+    class Meta:
+        verbose_name_plural = "User muscle group stats"
+        unique_together = ['user_id', 'muscle_group']
+        ordering = ['user_id', '-total_sets', 'muscle_group']
+    
+    def __str__(self):
+        return f"{self.muscle_group} stats - {self.user_id}"
+
+class WorkoutMuscleGroupLoad(models.Model):
+    """
+    Working-set totals of one workout and muscle group, maintained as sets are
+    written. Training load analytics read these instead of every set.
+    """
+    workout = models.ForeignKey(Workout, on_delete=models.CASCADE, related_name='muscle_group_loads')
+    muscle_group = models.CharField(max_length=50)
+    total_sets = models.IntegerField(default=0)
+    tonnage = models.FloatField(default=0, help_text="Sum of weight × reps in kg")
+    rpe_total = models.IntegerField(default=0, help_text="Sum of the RPE of sets that have one")
+    rpe_sets = models.IntegerField(default=0, help_text="Number of sets with an RPE")
+    
+    class Meta:
+        unique_together = ['workout', 'muscle_group']
+    
+    def __str__(self):
+        return f"{self.muscle_group} load - {self.workout_id}"
+
+class UserExerciseUsage(models.Model):
+    """
+    How much and how recently a user trains an exercise, maintained as sets are
+    written. Every set weighs half as much per USAGE_HALF_LIFE_DAYS of age
+    (see workouts.rollups); score is the weighted set count as of
+    scored_day, the days since USAGE_EPOCH of the latest set.
+    """
+    user_id = models.CharField(max_length=255)
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name='usage')
+    total_sets = models.IntegerField(default=0)
+    score = models.FloatField(default=0)
+    scored_day = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['user_id', 'exercise']
+    
+    def __str__(self):
+        return f"{self.exercise_id} usage - {self.user_id}"
+
+class UserExerciseRecord(models.Model):
+    """
+    Personal records of a user for one exercise, maintained as sets are
+    written (see workouts.records). Each best is stored with the date it was
+    first reached.
+    """
+    user_id = models.CharField(max_length=255)  # Match to Supabase user_id
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name='records')
+    best_weight = models.FloatField(help_text="Heaviest working set in kg")
+    best_weight_reps = models.IntegerField(help_text="Most reps performed at best_weight")
+    best_weight_date = models.DateField()
+    best_e1rm = models.FloatField(null=True, blank=True, help_text="Best estimated one-rep max in kg")
+    best_e1rm_date = models.DateField(null=True, blank=True)
+    best_volume = models.FloatField(help_text="Highest weight × reps of a single set in kg")
+    best_volume_date = models.DateField()
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['user_id', 'exercise']
+    
+    def __str__(self):
+        return f"{self.exercise_id} records - {self.user_id}"
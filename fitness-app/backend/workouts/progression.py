@@ -0,0 +1,116 @@
+"""
+Per-exercise progression series for charts.
+
+The working sets of one exercise are aggregated per training day in a single
+SQL query (best estimated 1RM, heaviest set, total volume). The series are
+then built with NumPy and each is downsampled with Largest-Triangle-Three-
+Buckets to a point budget, so years of history come back as a few hundred
+points that keep the visible peaks and trends:
+
+    data = progression(user_id, exercise, points=300)
+"""
+from datetime import date
+
+import numpy as np
+from django.db.models import Case, F, FloatField, Max, Sum, When
+
+from .models import WorkoutSet
+from .records import MAX_E1RM_REPS
+
+DEFAULT_POINTS = 300
+MIN_POINTS = 3
+MAX_POINTS = 2000
+
+# Same estimate as workouts.records.estimated_1rm, evaluated per set in SQL
+E1RM = Case(
+    When(reps__lte=10, then=F('weight') * 36.0 / (37 - F('reps'))),
+    When(reps__lte=MAX_E1RM_REPS, then=F('weight') * (1 + F('reps') / 30.0)),
+    output_field=FloatField(),
+)
+
+SERIES = ['e1rm', 'best_e1rm', 'top_set', 'volume']
+
+
+def lttb(x, y, threshold):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+    of the series (x ascending). The first and last points are always kept;
+    from every bucket in between the point forming the largest triangle with
+    the previously kept point and the next bucket's average is chosen.
+    """
+    n = len(x)
+    if threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    a = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        kept[bucket + 1] = a
+    kept[-1] = n - 1
+    return kept
+
+
+def session_rows(user_id, exercise_id, start_date=None, end_date=None):
+    """(date, best e1RM, heaviest weight, volume) per training day, oldest first"""
+    sets = WorkoutSet.objects.filter(
+        workout__user_id=user_id, exercise_id=exercise_id,
+        is_warmup=False, weight__gt=0, reps__gt=0,
+    )
+    if start_date:
+        sets = sets.filter(workout__date__gte=start_date)
+    if end_date:
+        sets = sets.filter(workout__date__lte=end_date)
+    return sets.values('workout__date').annotate(
+        e1rm=Max(E1RM),
+        top_set=Max('weight'),
+        volume=Sum(F('weight') * F('reps')),
+    ).order_by('workout__date').values_list('workout__date', 'e1rm', 'top_set', 'volume')
+
+
+def progression(user_id, exercise, points=DEFAULT_POINTS, start_date=None, end_date=None):
+    """
+    Chart series of the user's progression on an exercise: per-day best
+    estimated 1RM (`e1rm`, missing on days with only high-rep sets), its
+    running best (`best_e1rm`), heaviest set (`top_set`) and volume, each
+    downsampled to at most `points` points as parallel date/value lists
+    """
+    rows = list(session_rows(user_id, exercise.id, start_date, end_date))
+    days = np.fromiter((row[0].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    values = np.array([row[1:] for row in rows], dtype=float).reshape(len(rows), 3)
+    e1rm = values[:, 0]
+    columns = {
+        'e1rm': e1rm,
+        'best_e1rm': np.fmax.accumulate(e1rm) if len(rows) else e1rm,
+        'top_set': values[:, 1],
+        'volume': values[:, 2],
+    }
+
+    series = {}
+    for name in SERIES:
+        present = ~np.isnan(columns[name])
+        x = days[present]
+        y = columns[name][present]
+        kept = lttb(x.astype(float), y, points)
+        series[name] = {
+            'dates': [date.fromordinal(int(day)).isoformat() for day in x[kept]],
+            'values': np.round(y[kept], 2).tolist(),
+        }
+    return {
+        'exercise': str(exercise.id),
+        'exercise_name': exercise.name,
+        'sessions': len(rows),
+        'first_date': rows[0][0] if rows else None,
+        'last_date': rows[-1][0] if rows else None,
+        'points': points,
+        'series': series,
+    }
@@ -0,0 +1,211 @@
+"""
+Incrementally maintained personal records.
+
+UserExerciseRecord holds a user's best weight (with the most reps done at it),
+best estimated one-rep max and best single-set volume per exercise. Warm-up
+sets and sets without weight or reps do not count.
+
+A new set can only raise a record, so it is merged into the stored row
+(record_sets). Changing or deleting a set can lower one, so the exercise's
+records are then recomputed from its sets, but only when the old set was at
+or above a stored best (discard_sets). The write path in workouts.signals
+calls both inside the transaction of the set write.
+"""
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import UserExerciseRecord, WorkoutSet
+
+# Rep range the one-rep max estimate is considered meaningful for
+MAX_E1RM_REPS = 12
+
+RECORD_FIELDS = [
+    'best_weight', 'best_weight_reps', 'best_weight_date', 'best_e1rm', 'best_e1rm_date',
+    'best_volume', 'best_volume_date',
+]
+
+
+def estimated_1rm(weight, reps):
+    """
+    Estimated one-rep max of a set: Brzycki up to 10 reps and Epley above.
+    Both give 4/3 × weight at exactly 10 reps, so the estimate is continuous;
+    Brzycki returns the weight itself for a single, where Epley adds 3%.
+    None for sets above MAX_E1RM_REPS.
+    """
+    if reps > MAX_E1RM_REPS:
+        return None
+    if reps <= 10:
+        return round(weight * 36 / (37 - reps), 2)
+    return round(weight * (1 + reps / 30), 2)
+
+
+def counts(weight, reps, is_warmup):
+    """Whether a set can hold a record"""
+    return bool(weight and weight > 0 and reps and reps > 0 and not is_warmup)
+
+
+def _beats(value, on, best, best_on):
+    return best is None or value > best or (value == best and on < best_on)
+
+
+def merge(record, other):
+    """Raise the bests of `record` to those of `other`; True if any changed"""
+    changed = False
+    if _beats(
+        (other.best_weight, other.best_weight_reps), other.best_weight_date,
+        None if record.best_weight is None else (record.best_weight, record.best_weight_reps),
+        record.best_weight_date,
+    ):
+        record.best_weight = other.best_weight
+        record.best_weight_reps = other.best_weight_reps
+        record.best_weight_date = other.best_weight_date
+        changed = True
+    if other.best_e1rm is not None and _beats(
+        other.best_e1rm, other.best_e1rm_date, record.best_e1rm, record.best_e1rm_date
+    ):
+        record.best_e1rm = other.best_e1rm
+        record.best_e1rm_date = other.best_e1rm_date
+        changed = True
+    if _beats(other.best_volume, other.best_volume_date, record.best_volume, record.best_volume_date):
+        record.best_volume = other.best_volume
+        record.best_volume_date = other.best_volume_date
+        changed = True
+    return changed
+
+
+def set_record(model, weight, reps, performed_on, **lookup):
+    """An unsaved record row holding the bests of a single set"""
+    e1rm = estimated_1rm(weight, reps)
+    return model(
+        best_weight=weight, best_weight_reps=reps, best_weight_date=performed_on,
+        best_e1rm=e1rm, best_e1rm_date=performed_on if e1rm is not None else None,
+        best_volume=weight * reps, best_volume_date=performed_on,
+        **lookup
+    )
+
+
+def best_records(rows, model=UserExerciseRecord):
+    """
+    Unsaved record rows keyed by (user_id, exercise_id), computed from
+    (user_id, exercise_id, weight, reps, is_warmup, date) rows. `model` may be
+    a historical model inside a migration.
+    """
+    records = {}
+    for user_id, exercise_id, weight, reps, is_warmup, performed_on in rows:
+        if not counts(weight, reps, is_warmup):
+            continue
+        candidate = set_record(
+            model, weight, reps, performed_on, user_id=user_id, exercise_id=exercise_id
+        )
+        record = records.get((user_id, exercise_id))
+        if record is None:
+            records[(user_id, exercise_id)] = candidate
+        else:
+            merge(record, candidate)
+    return records
+
+
+def _set_rows(sets):
+    return sets.filter(weight__gt=0, reps__gt=0, is_warmup=False).values_list(
+        'workout__user_id', 'exercise_id', 'weight', 'reps', 'is_warmup', 'workout__date'
+    )
+
+
+def record_sets(user_id, performed_on, workout_sets):
+    """Merge newly written sets of one workout into the user's records"""
+    if isinstance(performed_on, str):
+        performed_on = date.fromisoformat(performed_on)
+    candidates = best_records(
+        (user_id, workout_set.exercise_id, workout_set.weight, workout_set.reps,
+         workout_set.is_warmup, performed_on)
+        for workout_set in workout_sets
+    )
+    if not candidates:
+        return
+    exercise_ids = [exercise_id for _, exercise_id in candidates]
+    with transaction.atomic():
+        stored = {
+            record.exercise_id: record
+            for record in UserExerciseRecord.objects.select_for_update().filter(
+                user_id=user_id, exercise_id__in=exercise_ids
+            )
+        }
+        now = timezone.now()
+        changed = []
+        missing = []
+        for (_, exercise_id), candidate in candidates.items():
+            record = stored.get(exercise_id)
+            if record is None:
+                missing.append(candidate)
+            elif merge(record, candidate):
+                record.updated_at = now
+                changed.append(record)
+        if changed:
+            UserExerciseRecord.objects.bulk_update(changed, RECORD_FIELDS + ['updated_at'])
+        if missing:
+            try:
+                with transaction.atomic():
+                    UserExerciseRecord.objects.bulk_create(missing)
+            except IntegrityError:
+                # Another writer created some of the rows first
+                recompute_records(user_id, [record.exercise_id for record in missing])
+
+
+def discard_sets(user_id, entries):
+    """
+    Account for sets that were changed or deleted, given their old
+    (exercise_id, weight, reps, is_warmup). Exercises where an old set was at
+    or above a stored best are recomputed; the others are unaffected.
+    """
+    entries = [entry for entry in entries if counts(*entry[1:])]
+    if not entries:
+        return
+    stored = {
+        record.exercise_id: record
+        for record in UserExerciseRecord.objects.filter(
+            user_id=user_id, exercise_id__in={entry[0] for entry in entries}
+        )
+    }
+    affected = set()
+    for exercise_id, weight, reps, _ in entries:
+        record = stored.get(exercise_id)
+        if record is None:
+            continue
+        e1rm = estimated_1rm(weight, reps)
+        if (
+            (weight, reps) >= (record.best_weight, record.best_weight_reps)
+            or weight * reps >= record.best_volume
+            or (e1rm is not None and record.best_e1rm is not None and e1rm >= record.best_e1rm)
+        ):
+            affected.add(exercise_id)
+    if affected:
+        recompute_records(user_id, affected)
+
+
+def recompute_records(user_id, exercise_ids):
+    """Recompute the user's records of the given exercises from their sets"""
+    exercise_ids = list(exercise_ids)
+    records = best_records(_set_rows(WorkoutSet.objects.filter(
+        workout__user_id=user_id, exercise_id__in=exercise_ids
+    )))
+    with transaction.atomic():
+        UserExerciseRecord.objects.filter(user_id=user_id, exercise_id__in=exercise_ids).delete()
+        UserExerciseRecord.objects.bulk_create(records.values())
+
+
+def rebuild_records(user_ids=None):
+    """
+    Recompute all records from the raw WorkoutSet table, e.g. after bulk writes
+    that bypassed the signals. Pass user_ids to limit the rebuild.
+    """
+    sets = WorkoutSet.objects.all()
+    stored = UserExerciseRecord.objects.all()
+    if user_ids is not None:
+        sets = sets.filter(workout__user_id__in=user_ids)
+        stored = stored.filter(user_id__in=user_ids)
+    records = best_records(_set_rows(sets).iterator(chunk_size=5000))
+    with transaction.atomic():
+        stored.delete()
+        UserExerciseRecord.objects.bulk_create(records.values(), batch_size=1000)
@@ -0,0 +1,447 @@
+"""
+Incrementally maintained training rollups.
+
+The stats endpoints read a single UserTrainingStats row instead of scanning a
+user's WorkoutSet history, and training load analytics read the
+WorkoutMuscleGroupLoad rows of a workout instead of its sets. The exercise
+selector ranks a user's exercises by their UserExerciseUsage rows. The write
+path (see workouts.signals) applies the delta of every set and workout change
+inside the same transaction as the write.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, FloatField, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least, Power
+
+from .models import (
+    Exercise, UserExerciseUsage, UserMuscleGroupStats, UserTrainingStats, Workout, WorkoutMuscleGroupLoad,
+    WorkoutSet,
+)
+from .records import rebuild_records
+
+# Each set in a usage score weighs half as much per USAGE_HALF_LIFE_DAYS of
+# age. A row's score is stored relative to its scored_day (days since
+# USAGE_EPOCH of its latest set), so exponents are never positive; a decay is
+# clamped at USAGE_MAX_HALF_LIVES so it cannot underflow
+USAGE_EPOCH = datetime.date(2020, 1, 1)
+USAGE_HALF_LIFE_DAYS = 30
+USAGE_MAX_HALF_LIVES = 100
+
+
+def set_volume(weight, reps):
+    """Volume of a single set (weight × reps), zero for bodyweight/cardio sets"""
+    if not weight:
+        return 0
+    return weight * reps
+
+
+def _increment(model, lookup, extra_updates=None, **deltas):
+    """Add deltas to the row matching lookup, creating the row on first write"""
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    updates.update(extra_updates or {})
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Another writer created the row first
+        model.objects.filter(**lookup).update(**updates)
+    if extra_updates:
+        model.objects.filter(**lookup).update(**extra_updates)
+
+
+def _top_muscle_subquery(user_id):
+    top = UserMuscleGroupStats.objects.filter(
+        user_id=user_id,
+        total_sets__gt=0,
+    ).order_by('-total_sets', 'muscle_group').values('muscle_group')[:1]
+    return Coalesce(Subquery(top), Value(''))
+
+
+def apply_set_deltas(deltas):
+    """
+    Apply set contributions to the rollups.
+
+    deltas is an iterable of (user_id, muscle_group, sets, reps, volume) tuples;
+    removals are passed with negative values.
+    """
+    grouped = defaultdict(lambda: [0, 0, 0.0])
+    for user_id, muscle_group, sets, reps, volume in deltas:
+        totals = grouped[(user_id, muscle_group)]
+        totals[0] += sets
+        totals[1] += reps
+        totals[2] += volume
+
+    touched_users = defaultdict(lambda: [0, 0, 0.0])
+    for (user_id, muscle_group), (sets, reps, volume) in grouped.items():
+        if not (sets or reps or volume):
+            continue
+        _increment(
+            UserMuscleGroupStats,
+            {'user_id': user_id, 'muscle_group': muscle_group},
+            total_sets=sets, total_reps=reps, total_volume=volume,
+        )
+        user_totals = touched_users[user_id]
+        user_totals[0] += sets
+        user_totals[1] += reps
+        user_totals[2] += volume
+
+    for user_id, (sets, reps, volume) in touched_users.items():
+        _increment(
+            UserTrainingStats,
+            {'user_id': user_id},
+            extra_updates={'most_trained_muscle': _top_muscle_subquery(user_id)},
+            total_sets=sets, total_reps=reps, total_volume=volume,
+        )
+
+
+def set_delta(workout_set, user_id, muscle_group, sign=1):
+    """Delta tuple for a single set, as consumed by apply_set_deltas"""
+    return (
+        user_id,
+        muscle_group,
+        sign,
+        sign * workout_set.reps,
+        sign * set_volume(workout_set.weight, workout_set.reps),
+    )
+
+
+def record_sets_created(workout, workout_sets):
+    """Add newly created sets of one workout to the rollups"""
+    apply_set_deltas(
+        set_delta(workout_set, workout.user_id, workout_set.exercise.muscle_group)
+        for workout_set in workout_sets
+    )
+    apply_load_deltas(
+        load_delta(
+            workout.pk, workout_set.exercise.muscle_group,
+            workout_set.weight, workout_set.reps, workout_set.rpe,
+        )
+        for workout_set in workout_sets if not workout_set.is_warmup
+    )
+    apply_usage_deltas(
+        (workout.user_id, workout_set.exercise_id, 1, workout.date)
+        for workout_set in workout_sets
+    )
+
+
+def remove_workout_sets(workout):
+    """Subtract every set of a workout from the rollups using one grouped query"""
+    rows = list(WorkoutSet.objects.filter(workout=workout).values(
+        'exercise_id', 'exercise__muscle_group'
+    ).annotate(
+        set_count=Count('id'),
+        rep_total=Sum('reps'),
+        volume=Sum(F('weight') * F('reps')),
+    ).order_by())
+    apply_set_deltas(
+        (workout.user_id, row['exercise__muscle_group'],
+         -row['set_count'], -(row['rep_total'] or 0), -(row['volume'] or 0))
+        for row in rows
+    )
+    apply_usage_deltas(
+        (workout.user_id, row['exercise_id'], -row['set_count'], workout.date)
+        for row in rows
+    )
+
+
+def move_muscle_groups(changes):
+    """
+    Move the contribution of every set of some exercises from their previous
+    muscle group to their current one, in two grouped queries.
+
+    changes maps exercise ids to (previous, current) muscle group pairs.
+    """
+    to_python = Exercise._meta.pk.to_python
+    changes = {
+        to_python(exercise_id): groups for exercise_id, groups in changes.items()
+        if groups[0] != groups[1]
+    }
+    if not changes:
+        return
+    sets = WorkoutSet.objects.filter(exercise_id__in=changes)
+
+    set_deltas = []
+    for row in sets.values('workout__user_id', 'exercise_id').annotate(
+        set_count=Count('id'),
+        rep_total=Sum('reps'),
+        volume=Sum(F('weight') * F('reps')),
+    ).order_by():
+        previous, current = changes[row['exercise_id']]
+        totals = (row['set_count'], row['rep_total'] or 0, row['volume'] or 0)
+        set_deltas.append((row['workout__user_id'], previous, *(-value for value in totals)))
+        set_deltas.append((row['workout__user_id'], current, *totals))
+    apply_set_deltas(set_deltas)
+
+    load_deltas = []
+    for row in sets.filter(is_warmup=False).values('workout_id', 'exercise_id').annotate(
+        set_count=Count('id'),
+        tonnage=Sum(F('weight') * F('reps')),
+        rpe_total=Sum('rpe'),
+        rpe_sets=Count('rpe'),
+    ).order_by():
+        previous, current = changes[row['exercise_id']]
+        totals = (row['set_count'], row['tonnage'] or 0, row['rpe_total'] or 0, row['rpe_sets'])
+        load_deltas.append((row['workout_id'], previous, *(-value for value in totals)))
+        load_deltas.append((row['workout_id'], current, *totals))
+    apply_load_deltas(load_deltas)
+
+
+def usage_day(performed_on):
+    """Days from USAGE_EPOCH to a date (or ISO date string)"""
+    if isinstance(performed_on, str):
+        performed_on = datetime.date.fromisoformat(performed_on)
+    return (performed_on - USAGE_EPOCH).days
+
+
+def usage_decay(from_day, to_day):
+    """Factor carrying a usage score from from_day to max(from_day, to_day)"""
+    half_lives = min(from_day - to_day, 0) / USAGE_HALF_LIFE_DAYS
+    return 2.0 ** max(half_lives, -USAGE_MAX_HALF_LIVES)
+
+
+def usage_decay_expression(from_day, to_day):
+    """usage_decay as a database expression of two integer expressions"""
+    half_lives = Least(from_day - to_day, Value(0)) / Value(float(USAGE_HALF_LIFE_DAYS))
+    return Power(
+        Value(2.0), Greatest(half_lives, Value(-float(USAGE_MAX_HALF_LIVES))),
+        output_field=FloatField(),
+    )
+
+
+def add_usage(score, scored_day, sets, day):
+    """Add sets performed on a day to a score; returns the new (score, scored_day)"""
+    reference = max(scored_day, day)
+    return (
+        score * usage_decay(scored_day, reference) + sets * usage_decay(day, reference),
+        reference,
+    )
+
+
+def apply_usage_deltas(deltas):
+    """
+    Apply set counts to the exercise usage rows.
+
+    deltas is an iterable of (user_id, exercise_id, sets, performed_on)
+    tuples; removals are passed with negative set counts.
+    """
+    grouped = defaultdict(lambda: defaultdict(int))
+    for user_id, exercise_id, sets, performed_on in deltas:
+        grouped[(user_id, exercise_id)][usage_day(performed_on)] += sets
+
+    for (user_id, exercise_id), days in grouped.items():
+        days = {day: sets for day, sets in days.items() if sets}
+        if not days:
+            continue
+        score, scored_day = 0.0, max(days)
+        for day, sets in days.items():
+            score, scored_day = add_usage(score, scored_day, sets, day)
+        _increment_usage(user_id, exercise_id, sum(days.values()), score, scored_day)
+
+
+def _increment_usage(user_id, exercise_id, sets, score, scored_day):
+    """
+    Add a score relative to scored_day to a usage row in one UPDATE, moving the
+    row to the later of the two reference days; creates the row on first write
+    """
+    lookup = {'user_id': user_id, 'exercise_id': exercise_id}
+    updates = {
+        'total_sets': F('total_sets') + sets,
+        'score': Case(
+            # Drop the float residue once every set has been removed
+            When(total_sets=-sets, then=Value(0.0)),
+            default=(
+                F('score') * usage_decay_expression(F('scored_day'), Value(scored_day))
+                + score * usage_decay_expression(Value(scored_day), F('scored_day'))
+            ),
+            output_field=FloatField(),
+        ),
+        'scored_day': Greatest(F('scored_day'), Value(scored_day)),
+    }
+    if UserExerciseUsage.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            UserExerciseUsage.objects.create(
+                **lookup, total_sets=sets, score=score, scored_day=scored_day
+            )
+    except IntegrityError:
+        # Another writer created the row first
+        UserExerciseUsage.objects.filter(**lookup).update(**updates)
+
+
+def move_workout_usage(workout, previous_date):
+    """Move the usage score of a workout's sets from its previous date to its current one"""
+    rows = WorkoutSet.objects.filter(workout=workout).values('exercise_id').annotate(
+        set_count=Count('id'),
+    ).order_by()
+    deltas = []
+    for row in rows:
+        deltas.append((workout.user_id, row['exercise_id'], -row['set_count'], previous_date))
+        deltas.append((workout.user_id, row['exercise_id'], row['set_count'], workout.date))
+    apply_usage_deltas(deltas)
+
+
+def exercise_usage(model, sets):
+    """
+    Unsaved usage rows of the users of the given sets, grouped in one query.
+    `model` may be a historical model inside a migration.
+    """
+    rows = sets.values('workout__user_id', 'exercise_id', 'workout__date').annotate(
+        set_count=Count('id'),
+    ).order_by()
+    usage = {}
+    for row in rows.iterator(chunk_size=5000):
+        key = (row['workout__user_id'], row['exercise_id'])
+        day = usage_day(row['workout__date'])
+        if key not in usage:
+            usage[key] = model(
+                user_id=key[0], exercise_id=key[1], total_sets=0, score=0.0, scored_day=day
+            )
+        usage[key].total_sets += row['set_count']
+        usage[key].score, usage[key].scored_day = add_usage(
+            usage[key].score, usage[key].scored_day, row['set_count'], day
+        )
+    return list(usage.values())
+
+
+def apply_load_deltas(deltas):
+    """
+    Apply working-set contributions to the per-workout load rows.
+
+    deltas is an iterable of (workout_id, muscle_group, sets, tonnage,
+    rpe_total, rpe_sets) tuples; removals are passed with negative values.
+    """
+    grouped = defaultdict(lambda: [0, 0.0, 0, 0])
+    for workout_id, muscle_group, *values in deltas:
+        totals = grouped[(workout_id, muscle_group)]
+        for index, value in enumerate(values):
+            totals[index] += value
+
+    for (workout_id, muscle_group), (sets, tonnage, rpe_total, rpe_sets) in grouped.items():
+        if not (sets or tonnage or rpe_total or rpe_sets):
+            continue
+        _increment(
+            WorkoutMuscleGroupLoad,
+            {'workout_id': workout_id, 'muscle_group': muscle_group},
+            total_sets=sets, tonnage=tonnage, rpe_total=rpe_total, rpe_sets=rpe_sets,
+        )
+
+
+def load_delta(workout_id, muscle_group, weight, reps, rpe, sign=1):
+    """Delta tuple for a single working set, as consumed by apply_load_deltas"""
+    return (
+        workout_id,
+        muscle_group,
+        sign,
+        sign * set_volume(weight, reps),
+        sign * (rpe or 0),
+        sign * (rpe is not None),
+    )
+
+
+def apply_workout_delta(user_id, workouts=0, duration=0):
+    """Adjust the workout count and total duration of a user"""
+    if not (workouts or duration):
+        return
+    _increment(
+        UserTrainingStats,
+        {'user_id': user_id},
+        total_workouts=workouts, total_duration=duration,
+    )
+
+
+def workout_loads(model, sets):
+    """
+    Unsaved load rows of the workouts of the given sets, grouped in one query.
+    `model` may be a historical model inside a migration.
+    """
+    rows = sets.filter(is_warmup=False).values('workout_id', 'exercise__muscle_group').annotate(
+        set_count=Count('id'),
+        tonnage=Sum(F('weight') * F('reps')),
+        rpe_total=Sum('rpe'),
+        rpe_sets=Count('rpe'),
+    ).order_by()
+    return [
+        model(
+            workout_id=row['workout_id'],
+            muscle_group=row['exercise__muscle_group'],
+            total_sets=row['set_count'],
+            tonnage=row['tonnage'] or 0,
+            rpe_total=row['rpe_total'] or 0,
+            rpe_sets=row['rpe_sets'],
+        )
+        for row in rows.iterator(chunk_size=5000)
+    ]
+
+
+def rebuild_user_stats(user_ids=None):
+    """
+    Recompute rollups, workout loads, exercise usage and personal records from
+    the raw Workout/WorkoutSet tables.
+
+    Used after bulk writes that bypass model signals and to repair drift.
+    Pass user_ids to limit the rebuild to specific users.
+    """
+    workouts = Workout.objects.all()
+    sets = WorkoutSet.objects.all()
+    if user_ids is not None:
+        workouts = workouts.filter(user_id__in=user_ids)
+        sets = sets.filter(workout__user_id__in=user_ids)
+
+    with transaction.atomic():
+        stats_rows = UserTrainingStats.objects.all()
+        muscle_rows = UserMuscleGroupStats.objects.all()
+        usage_rows = UserExerciseUsage.objects.all()
+        if user_ids is not None:
+            stats_rows = stats_rows.filter(user_id__in=user_ids)
+            muscle_rows = muscle_rows.filter(user_id__in=user_ids)
+            usage_rows = usage_rows.filter(user_id__in=user_ids)
+        stats_rows.delete()
+        muscle_rows.delete()
+        usage_rows.delete()
+        WorkoutMuscleGroupLoad.objects.filter(workout__in=workouts).delete()
+
+        stats = {}
+        for row in workouts.values('user_id').annotate(
+            workout_count=Count('id'), duration=Sum('duration')
+        ):
+            stats[row['user_id']] = UserTrainingStats(
+                user_id=row['user_id'],
+                total_workouts=row['workout_count'],
+                total_duration=row['duration'] or 0,
+            )
+
+        muscle_stats = []
+        for row in sets.values('workout__user_id', 'exercise__muscle_group').annotate(
+            set_count=Count('id'),
+            rep_total=Sum('reps'),
+            volume=Sum(F('weight') * F('reps')),
+        ).order_by('workout__user_id', '-set_count', 'exercise__muscle_group'):
+            user_id = row['workout__user_id']
+            muscle_stats.append(UserMuscleGroupStats(
+                user_id=user_id,
+                muscle_group=row['exercise__muscle_group'],
+                total_sets=row['set_count'],
+                total_reps=row['rep_total'] or 0,
+                total_volume=row['volume'] or 0,
+            ))
+            user_stats = stats.setdefault(user_id, UserTrainingStats(user_id=user_id))
+            if not user_stats.most_trained_muscle:
+                user_stats.most_trained_muscle = row['exercise__muscle_group']
+            user_stats.total_sets += row['set_count']
+            user_stats.total_reps += row['rep_total'] or 0
+            user_stats.total_volume += row['volume'] or 0
+
+        UserTrainingStats.objects.bulk_create(stats.values(), batch_size=1000)
+        UserMuscleGroupStats.objects.bulk_create(muscle_stats, batch_size=1000)
+        WorkoutMuscleGroupLoad.objects.bulk_create(
+            workout_loads(WorkoutMuscleGroupLoad, sets), batch_size=1000
+        )
+        UserExerciseUsage.objects.bulk_create(
+            exercise_usage(UserExerciseUsage, sets), batch_size=1000
+        )
+        rebuild_records(user_ids)
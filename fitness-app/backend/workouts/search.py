@@ -0,0 +1,235 @@
+"""
+In-memory exercise search.
+
+The exercise catalog is small and read on every keystroke of the exercise
+selector, so it is searched in process instead of with LIKE scans. An
+ExerciseIndex is built from every exercise (name, equipment, muscle group
+and description) and kept in the catalog cache, which rebuilds it once the
+exercises catalog version changes (see api.catalog). Queries never touch the
+database.
+
+Query tokens are expanded through SYNONYMS ("db" -> "dumbbell", "ohp" ->
+"overhead press") and each is matched against the index vocabulary as a
+whole word, then as a word prefix and, when neither matches, by trigram
+similarity for typos ("bnech" -> "bench"). Exercises matching every token
+rank first, scored by where each token matched:
+
+    exact name > name prefix > name word > equipment/muscle word > description word
+"""
+import bisect
+import re
+
+from api.catalog import catalog_cache
+from api.nutrition.search import normalize
+
+from .models import Exercise
+from .serializers import ExerciseSerializer
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Query spellings and abbreviations, after stemming, and what they stand for.
+# A multi-word alternative matches when all its words do.
+SYNONYMS = {
+    'db': ['dumbbell'],
+    'bb': ['barbell'],
+    'kb': ['kettlebell'],
+    'ohp': ['overhead press'],
+    'military': ['overhead'],
+    'rdl': ['romanian deadlift'],
+    'pullup': ['pull up'],
+    'pushup': ['push up'],
+    'chinup': ['chin up'],
+    'flye': ['fly'],
+    'flie': ['fly'],
+    'abs': ['core', 'crunch'],
+    'pec': ['chest'],
+    'quad': ['leg', 'squat'],
+    'glute': ['leg', 'squat', 'deadlift'],
+    'hamstring': ['leg curl', 'romanian deadlift'],
+    'delt': ['shoulder'],
+    'bike': ['cycling', 'bicycle'],
+    'run': ['running'],
+    'jog': ['running'],
+    'treadmill': ['running'],
+    'rower': ['rowing'],
+    'skipping': ['jump rope'],
+}
+
+# Fields searched and the score of a whole-word match in each; word-prefix
+# matches score PREFIX_FACTOR of that and typo matches FUZZY_FACTOR times
+# their trigram similarity
+NAME, EQUIPMENT, MUSCLE_GROUP, DESCRIPTION = range(4)
+FIELD_SCORES = {NAME: 120, EQUIPMENT: 50, MUSCLE_GROUP: 50, DESCRIPTION: 20}
+PREFIX_FACTOR = 0.7
+FUZZY_FACTOR = 0.6
+SYNONYM_FACTOR = 0.9
+
+EXACT_NAME = 1000
+NAME_PREFIX = 600
+
+# Smallest trigram similarity accepted for a typo match
+MIN_SIMILARITY = 0.3
+
+
+def stem(word):
+    """Fold simple plurals so 'dumbbells' matches 'dumbbell'; 'press' is kept"""
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    return [stem(token) for token in _TOKEN_RE.findall(normalize(text))]
+
+
+def trigrams(word):
+    """Trigrams of a word padded at both ends, so short words and typos share some"""
+    padded = f'  {word} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def within_one_edit(a, b):
+    """Whether a and b differ by at most one insertion, deletion, substitution or transposition"""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    start = 0
+    while start < len(a) and a[start] == b[start]:
+        start += 1
+    if len(a) == len(b):
+        rest = a[start + 1:] == b[start + 1:]
+        swapped = a[start:start + 2] == b[start:start + 2][::-1] and a[start + 2:] == b[start + 2:]
+        return rest or swapped
+    return a[start:] == b[start + 1:]
+
+
+class ExerciseIndex:
+    """Inverted index over a snapshot of the exercise catalog"""
+
+    def __init__(self, exercises):
+        """exercises is a list of serialized exercises (ExerciseSerializer data)"""
+        self.exercises = exercises
+        self.names = [normalize(exercise['name']) for exercise in exercises]
+        # word -> [(exercise index, field)]
+        self.postings = {}
+        for position, exercise in enumerate(exercises):
+            fields = {
+                NAME: exercise['name'],
+                EQUIPMENT: exercise['equipment_needed'],
+                MUSCLE_GROUP: exercise['muscle_group'],
+                DESCRIPTION: exercise['description'],
+            }
+            for field, text in fields.items():
+                for word in set(tokenize(text)):
+                    self.postings.setdefault(word, []).append((position, field))
+        self.vocabulary = sorted(self.postings)
+        self.grams = {}
+        for word in self.vocabulary:
+            for gram in trigrams(word):
+                self.grams.setdefault(gram, []).append(word)
+
+    def __len__(self):
+        return len(self.exercises)
+
+    def _word_matches(self, word):
+        """(vocabulary word, score factor) pairs for one query word"""
+        if word in self.postings:
+            matches = [(word, 1.0)]
+        else:
+            matches = []
+        start = bisect.bisect_left(self.vocabulary, word)
+        for candidate in self.vocabulary[start:]:
+            if not candidate.startswith(word):
+                break
+            if candidate != word:
+                matches.append((candidate, PREFIX_FACTOR))
+        if matches or len(word) < 3:
+            return matches
+
+        grams = trigrams(word)
+        shared = {}
+        for gram in grams:
+            for candidate in self.grams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        for candidate, count in shared.items():
+            similarity = count / len(grams | trigrams(candidate))
+            if similarity >= MIN_SIMILARITY or (len(word) >= 4 and within_one_edit(word, candidate)):
+                matches.append((candidate, FUZZY_FACTOR * max(similarity, MIN_SIMILARITY)))
+        return matches
+
+    def _phrase_scores(self, phrase):
+        """Score per exercise index of the exercises matching every word of phrase"""
+        scores = None
+        for word in phrase.split():
+            word_scores = {}
+            for candidate, factor in self._word_matches(word):
+                for position, field in self.postings[candidate]:
+                    score = FIELD_SCORES[field] * factor
+                    if score > word_scores.get(position, 0):
+                        word_scores[position] = score
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {
+                    position: score + word_scores[position]
+                    for position, score in scores.items() if position in word_scores
+                }
+        return scores or {}
+
+    def _token_scores(self, token):
+        """Best score per exercise index for a query token or any of its synonyms"""
+        scores = self._phrase_scores(token)
+        for alternative in SYNONYMS.get(token, ()):
+            words = len(alternative.split())
+            for position, score in self._phrase_scores(alternative).items():
+                score = score / words * SYNONYM_FACTOR
+                if score > scores.get(position, 0):
+                    scores[position] = score
+        return scores
+
+    def search(self, query, muscle_group=None, is_cardio=None, limit=None):
+        """
+        Serialized exercises matching query, best first. Exercises matching
+        every token are returned; when none does, those missing one token.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        phrase = normalize(query)
+        totals = {}
+        matched = {}
+        for token in dict.fromkeys(tokens):
+            for position, score in self._token_scores(token).items():
+                totals[position] = totals.get(position, 0) + score
+                matched[position] = matched.get(position, 0) + 1
+
+        required = len(set(tokens))
+        if required > 1 and required not in matched.values():
+            required -= 1
+        results = []
+        for position, count in matched.items():
+            exercise = self.exercises[position]
+            if count < required:
+                continue
+            if muscle_group and exercise['muscle_group'] != muscle_group:
+                continue
+            if is_cardio is not None and exercise['is_cardio'] != is_cardio:
+                continue
+            score = totals[position]
+            if self.names[position] == phrase:
+                score += EXACT_NAME
+            elif self.names[position].startswith(phrase):
+                score += NAME_PREFIX
+            results.append((-score, self.names[position], position))
+        results.sort()
+        return [self.exercises[position] for _, _, position in results[:limit]]
+
+
+def build_exercise_index():
+    return ExerciseIndex(list(ExerciseSerializer(Exercise.objects.all(), many=True).data))
+
+
+def exercise_index():
+    """The current exercise index, rebuilt once the exercises catalog changes"""
+    return catalog_cache.get('exercises', 'search-index', build_exercise_index).data
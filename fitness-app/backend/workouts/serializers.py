@@ -1,5 +1,36 @@
+import uuid
+from collections import defaultdict
+
+from django.db import transaction
 from rest_framework import serializers
-from .models import Exercise, Workout, WorkoutSet
+from .models import Exercise, UserExerciseRecord, Workout, WorkoutSet
+from .signals import workout_sets_bulk_created
+
+# Upper bound on the number of sets accepted by one bulk request
+BULK_SET_LIMIT = 200
+
+def number_new_sets(items, stored_numbers=()):
+    """
+    Give validated sets submitted without a set_number the next numbers of
+    their exercise, in order, after both the stored numbers ((exercise_id,
+    set_number) pairs already in the workout) and the explicit ones
+    """
+    last = defaultdict(int)
+    explicit = [
+        (item['exercise'].id, item['set_number']) for item in items if 'set_number' in item
+    ]
+    for exercise_id, set_number in list(stored_numbers) + explicit:
+        last[exercise_id] = max(last[exercise_id], set_number)
+    for item in items:
+        if 'set_number' not in item:
+            last[item['exercise'].id] += 1
+            item['set_number'] = last[item['exercise'].id]
+
+def duplicate_set_number(set_number):
+    """The validation error of a set number its exercise already uses in the workout"""
+    return serializers.ValidationError({'set_number': [
+        f'Set number {set_number} already exists for this exercise in this workout.'
+    ]})
 
 class ExerciseSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,49 +47,95 @@ class WorkoutSetSerializer(serializers.ModelSerializer):
         fields = ['id', 'exercise', 'exercise_name', 'set_number', 
                  'reps', 'weight', 'duration', 'distance', 
                  'rpe', 'is_warmup', 'notes']
+        # Allocated by the server when omitted, see workouts.views.save_new_set
+        extra_kwargs = {'set_number': {'required': False}}
+
+class WorkoutSetBulkListSerializer(serializers.ListSerializer):
+    """
+    Validates a batch of sets for one workout with a fixed number of queries:
+    exercises are loaded with a single in_bulk lookup and one query reads the
+    workout's set numbers of those exercises, to reject duplicates and to
+    number the sets submitted without one.
+    
+    Errors are returned per item, in the same order as the submitted sets.
+    """
     
-    def validate(self, data):
-        """Validate that there isn't already a set with the same number for this exercise and workout"""
-        # Get the workout from context
-        workout = self.context.get('workout')
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({
+                'non_field_errors': ['Expected a list of sets.']
+            })
         
-        # If no workout in context, we can't validate
-        if not workout:
-            print("WARNING: No workout in context, skipping duplicate set validation")
-            return data
-            
-        # Check if exercise and set_number are provided
-        if 'exercise' in data and 'set_number' in data:
-            exercise = data['exercise']
-            set_number = data['set_number']
-            
-            # Extract ID from exercise if it's an instance
-            exercise_id = str(exercise.id) if hasattr(exercise, 'id') else str(exercise)
-            
-            # Explicitly log what we're checking
-            print(f"Validating set: workout={workout.id}, exercise={exercise_id}, set_number={set_number}")
-            
-            # Check for existing sets with same workout, exercise, and set number
-            existing_sets = WorkoutSet.objects.filter(
-                workout=workout,
-                exercise__id=exercise_id,
-                set_number=set_number
+        exercise_ids = set()
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            try:
+                exercise_ids.add(uuid.UUID(str(item.get('exercise'))))
+            except ValueError:
+                continue
+        self.context['exercises'] = Exercise.objects.in_bulk(exercise_ids)
+        
+        validated = []
+        errors = []
+        for item in data:
+            try:
+                validated.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                validated.append(None)
+                errors.append(exc.detail)
+        
+        workout = self.context['workout']
+        valid = [item for item in validated if item is not None]
+        stored = set(WorkoutSet.objects.filter(
+            workout=workout,
+            exercise_id__in={item['exercise'].id for item in valid},
+        ).values_list('exercise_id', 'set_number')) if valid else set()
+        
+        keys = {
+            index: (item['exercise'].id, item['set_number'])
+            for index, item in enumerate(validated) if item is not None and 'set_number' in item
+        }
+        seen = set()
+        for index, key in keys.items():
+            if key in stored:
+                errors[index] = duplicate_set_number(key[1]).detail
+            elif key in seen:
+                errors[index] = {'set_number': [
+                    f'Set number {key[1]} appears more than once for this exercise in this batch.'
+                ]}
+            seen.add(key)
+        
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        number_new_sets(validated, stored)
+        return validated
+    
+    def create(self, validated_data):
+        workout = self.context['workout']
+        workout_sets = [WorkoutSet(**item) for item in validated_data]
+        with transaction.atomic():
+            WorkoutSet.objects.bulk_create(workout_sets)
+            workout_sets_bulk_created.send(
+                sender=WorkoutSet, workout=workout, sets=workout_sets
             )
-            
-            # If we're updating an existing instance, exclude it from the check
-            if self.instance:
-                existing_sets = existing_sets.exclude(pk=self.instance.pk)
-                
-            if existing_sets.exists():
-                print(f"Duplicate found: {existing_sets.first()}")
-                # Make sure to raise this
-                raise serializers.ValidationError({
-                    'set_number': f'Set number {set_number} already exists for this exercise in this workout.'
-                })
-            else:
-                print("No duplicates found")
-                
-        return data
+        return workout_sets
+
+class WorkoutSetBulkSerializer(WorkoutSetSerializer):
+    """
+    A single set inside a bulk upload, see WorkoutSetBulkListSerializer
+    """
+    exercise = serializers.UUIDField()
+    
+    class Meta(WorkoutSetSerializer.Meta):
+        list_serializer_class = WorkoutSetBulkListSerializer
+    
+    def validate_exercise(self, value):
+        exercise = self.context['exercises'].get(value)
+        if exercise is None:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return exercise
 
 class WorkoutSerializer(serializers.ModelSerializer):
     sets = WorkoutSetSerializer(many=True, read_only=True)
@@ -81,10 +158,18 @@ class WorkoutCreateSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         sets_data = validated_data.pop('sets', [])
-        workout = Workout.objects.create(**validated_data)
-        
-        for set_data in sets_data:
-            WorkoutSet.objects.create(workout=workout, **set_data)
+        number_new_sets(sets_data)
+        with transaction.atomic():
+            workout = Workout.objects.create(**validated_data)
+            
+            workout_sets = [
+                WorkoutSet(workout=workout, **set_data) for set_data in sets_data
+            ]
+            if workout_sets:
+                WorkoutSet.objects.bulk_create(workout_sets)
+                workout_sets_bulk_created.send(
+                    sender=WorkoutSet, workout=workout, sets=workout_sets
+                )
             
         return workout
         
@@ -100,4 +185,15 @@ class WorkoutStatsSerializer(serializers.Serializer):
     total_reps = serializers.IntegerField()
     total_volume = serializers.FloatField()
     average_duration = serializers.FloatField()
-    most_trained_muscle = serializers.CharField()
\ No newline at end of file
+    most_trained_muscle = serializers.CharField()
+
+class UserExerciseRecordSerializer(serializers.ModelSerializer):
+    exercise_name = serializers.CharField(source='exercise.name', read_only=True)
+    muscle_group = serializers.CharField(source='exercise.muscle_group', read_only=True)
+    
+    class Meta:
+        model = UserExerciseRecord
+        fields = ['exercise', 'exercise_name', 'muscle_group',
+                 'best_weight', 'best_weight_reps', 'best_weight_date',
+                 'best_e1rm', 'best_e1rm_date', 'best_volume', 'best_volume_date',
+                 'updated_at']
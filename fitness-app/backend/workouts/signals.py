@@ -0,0 +1,196 @@
+"""
+Keep derived workout tables in step with Workout and WorkoutSet writes.
+
+Single-row saves and deletes are picked up through the model signals below.
+Bulk writes (bulk_create) do not send model signals, so code that inserts sets
+in bulk must send workout_sets_bulk_created afterwards. Exercises moved to
+another muscle group carry their sets' totals along, whether saved one at a
+time or through api.upsert.
+"""
+import threading
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from api.upsert import rows_bulk_updated
+
+from . import records, rollups
+from .models import Exercise, Workout, WorkoutSet
+
+# Sent with sender=WorkoutSet, workout=<Workout>, sets=<list of WorkoutSet>
+workout_sets_bulk_created = Signal()
+
+# Workouts whose sets are being removed as part of a cascading workout delete.
+_cascading = threading.local()
+
+
+def _cascading_workouts():
+    if not hasattr(_cascading, 'workout_ids'):
+        _cascading.workout_ids = set()
+    return _cascading.workout_ids
+
+
+@receiver(pre_save, sender=WorkoutSet)
+def capture_previous_set(sender, instance, raw=False, **kwargs):
+    """Remember the stored version of a set so its old contribution can be removed"""
+    instance._previous_state = None
+    if raw or instance._state.adding:
+        return
+    instance._previous_state = WorkoutSet.objects.filter(pk=instance.pk).values(
+        'reps', 'weight', 'rpe', 'is_warmup', 'exercise_id', 'exercise__muscle_group',
+        'workout_id', 'workout__user_id', 'workout__date',
+    ).first()
+
+
+@receiver(post_save, sender=WorkoutSet)
+def update_rollups_on_set_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = []
+    previous = getattr(instance, '_previous_state', None)
+    if previous:
+        deltas.append((
+            previous['workout__user_id'],
+            previous['exercise__muscle_group'],
+            -1,
+            -previous['reps'],
+            -rollups.set_volume(previous['weight'], previous['reps']),
+        ))
+    deltas.append(rollups.set_delta(
+        instance, instance.workout.user_id, instance.exercise.muscle_group
+    ))
+    rollups.apply_set_deltas(deltas)
+    
+    load_deltas = []
+    if previous and not previous['is_warmup']:
+        load_deltas.append(rollups.load_delta(
+            previous['workout_id'], previous['exercise__muscle_group'],
+            previous['weight'], previous['reps'], previous['rpe'], sign=-1,
+        ))
+    if not instance.is_warmup:
+        load_deltas.append(rollups.load_delta(
+            instance.workout_id, instance.exercise.muscle_group,
+            instance.weight, instance.reps, instance.rpe,
+        ))
+    rollups.apply_load_deltas(load_deltas)
+    
+    usage_deltas = []
+    if previous:
+        usage_deltas.append((
+            previous['workout__user_id'], previous['exercise_id'], -1, previous['workout__date']
+        ))
+    usage_deltas.append((instance.workout.user_id, instance.exercise_id, 1, instance.workout.date))
+    rollups.apply_usage_deltas(usage_deltas)
+    
+    if previous:
+        records.discard_sets(previous['workout__user_id'], [(
+            previous['exercise_id'], previous['weight'], previous['reps'], previous['is_warmup']
+        )])
+    records.record_sets(instance.workout.user_id, instance.workout.date, [instance])
+
+
+@receiver(post_delete, sender=WorkoutSet)
+def update_rollups_on_set_delete(sender, instance, **kwargs):
+    if instance.workout_id in _cascading_workouts():
+        # Already subtracted in one query by the workout's pre_delete handler
+        return
+    workout = Workout.objects.filter(pk=instance.workout_id).only('user_id', 'date').first()
+    if workout is None:
+        return
+    muscle_group = Exercise.objects.filter(pk=instance.exercise_id).values_list(
+        'muscle_group', flat=True
+    ).first()
+    rollups.apply_set_deltas([
+        rollups.set_delta(instance, workout.user_id, muscle_group, sign=-1)
+    ])
+    if not instance.is_warmup:
+        rollups.apply_load_deltas([rollups.load_delta(
+            instance.workout_id, muscle_group, instance.weight, instance.reps, instance.rpe, sign=-1
+        )])
+    rollups.apply_usage_deltas([(workout.user_id, instance.exercise_id, -1, workout.date)])
+    records.discard_sets(workout.user_id, [
+        (instance.exercise_id, instance.weight, instance.reps, instance.is_warmup)
+    ])
+
+
+@receiver(workout_sets_bulk_created, sender=WorkoutSet)
+def update_rollups_on_bulk_create(sender, workout, sets, **kwargs):
+    rollups.record_sets_created(workout, sets)
+    records.record_sets(workout.user_id, workout.date, sets)
+
+
+@receiver(pre_save, sender=Workout)
+def capture_previous_workout(sender, instance, raw=False, **kwargs):
+    instance._previous_duration = None
+    instance._previous_date = None
+    if raw or instance._state.adding:
+        return
+    previous = Workout.objects.filter(pk=instance.pk).values('duration', 'date').first()
+    if previous:
+        instance._previous_duration = previous['duration']
+        instance._previous_date = previous['date']
+
+
+@receiver(post_save, sender=Workout)
+def update_rollups_on_workout_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        rollups.apply_workout_delta(instance.user_id, workouts=1, duration=instance.duration)
+        return
+    previous_duration = getattr(instance, '_previous_duration', None)
+    if previous_duration is not None:
+        rollups.apply_workout_delta(
+            instance.user_id, duration=instance.duration - previous_duration
+        )
+    previous_date = getattr(instance, '_previous_date', None)
+    if previous_date is not None and str(previous_date) != str(instance.date):
+        # Usage scores weigh sets by their date and records carry the date they were set on
+        rollups.move_workout_usage(instance, previous_date)
+        records.recompute_records(
+            instance.user_id, instance.sets.values_list('exercise_id', flat=True).distinct()
+        )
+
+
+@receiver(pre_delete, sender=Workout)
+def update_rollups_on_workout_delete(sender, instance, **kwargs):
+    rollups.remove_workout_sets(instance)
+    rollups.apply_workout_delta(instance.user_id, workouts=-1, duration=-instance.duration)
+    instance._record_exercise_ids = set(
+        instance.sets.values_list('exercise_id', flat=True).distinct()
+    )
+    _cascading_workouts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Workout)
+def clear_cascading_workout(sender, instance, **kwargs):
+    _cascading_workouts().discard(instance.pk)
+    exercise_ids = getattr(instance, '_record_exercise_ids', None)
+    if exercise_ids:
+        records.recompute_records(instance.user_id, exercise_ids)
+
+
+@receiver(pre_save, sender=Exercise)
+def capture_previous_muscle_group(sender, instance, raw=False, **kwargs):
+    instance._previous_muscle_group = None
+    if raw or instance._state.adding:
+        return
+    instance._previous_muscle_group = Exercise.objects.filter(pk=instance.pk).values_list(
+        'muscle_group', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=Exercise)
+def update_rollups_on_exercise_save(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_muscle_group', None)
+    if raw or previous is None:
+        return
+    rollups.move_muscle_groups({instance.pk: (previous, instance.muscle_group)})
+
+
+@receiver(rows_bulk_updated, sender=Exercise)
+def update_rollups_on_exercise_bulk_update(sender, instances, previous, **kwargs):
+    rollups.move_muscle_groups({
+        exercise.pk: (previous[exercise.pk]['muscle_group'], exercise.muscle_group)
+        for exercise in instances if 'muscle_group' in previous[exercise.pk]
+    })
@@ -1,12 +1,19 @@
+from django.core.management import CommandError, call_command
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 from datetime import date, timedelta
+import csv
+import io
+import os
+import tempfile
 import uuid
 import json
+from unittest import mock
 
-from .models import Exercise, Workout, WorkoutSet
+from .models import Exercise, UserExerciseRecord, UserTrainingStats, Workout, WorkoutSet
+from .records import RECORD_FIELDS, estimated_1rm, rebuild_records
 from api.models import UserProfile  # Import for authentication mocking
 
 class WorkoutAPITests(APITestCase):
@@ -106,8 +113,8 @@ class WorkoutAPITests(APITestCase):
         url = reverse('workout-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['name'], 'Test Workout')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['name'], 'Test Workout')
     
     def test_get_workout_detail(self):
         """Test retrieving a single workout with its sets"""
@@ -212,6 +219,24 @@ class WorkoutAPITests(APITestCase):
         self.assertEqual(workout_set.duration, 1800)
         self.assertEqual(workout_set.distance, 5000)
     
+    def test_set_number_allocated_by_server(self):
+        """Sets logged without a set_number continue their exercise's numbering"""
+        url = reverse('workout-set-list', args=[self.workout.id])
+        data = {'exercise': str(self.chest_exercise.id), 'reps': 6, 'weight': 120}
+        
+        # Exercise lookup, locked workout fetch carrying the next number, the
+        # insert, two rollup updates, the record read and update and six
+        # savepoint statements
+        with self.assertNumQueries(15):
+            self.client.post(url, data, format='json')
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['set_number'], 4)
+        
+        data['exercise'] = str(self.cardio_exercise.id)
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.data['set_number'], 1)
+    
     def test_update_workout_set(self):
         """Test updating a workout set"""
         url = reverse('workout-set-detail', args=[self.workout.id, self.workout_set1.id])
@@ -351,20 +376,25 @@ class WorkoutAPITests(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         
-        # Test serializer validation directly
-        from .serializers import WorkoutSetSerializer
-        context = {'workout': self.workout}
-        serializer = WorkoutSetSerializer(data={
+        # A set number the exercise already uses is rejected by the unique
+        # constraint and reported as a validation error
+        response = self.client.post(url, {
             'exercise': str(self.chest_exercise.id),
             'set_number': 1,  # This should match an existing one
             'reps': 10,
             'weight': 100
-        }, context=context)
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('set_number', response.data)
+        self.assertEqual(self.workout.sets.count(), 2)
         
-        # This should fail validation
-        is_valid = serializer.is_valid()
-        self.assertFalse(is_valid)
-        self.assertIn('set_number', serializer.errors)
+        # Moving a set onto a taken number is rejected the same way
+        response = self.client.patch(
+            reverse('workout-set-detail', args=[self.workout.id, self.workout_set2.id]),
+            {'set_number': 1}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('set_number', response.data)
         
         # Test a valid set creation
         response = self.client.post(url, {
@@ -425,22 +455,1115 @@ class WorkoutAPITests(APITestCase):
                     weight=120
                 )
         
-        # 5. Now test the serializer directly to verify it catches the duplicate
-        from .serializers import WorkoutSetSerializer
-        
-        serializer = WorkoutSetSerializer(
-            data={
+        # 5. Now post the duplicate through the API
+        response = self.client.post(
+            reverse('workout-set-list', args=[new_workout.id]),
+            {
                 'exercise': str(unique_exercise.id),
                 'set_number': set_number,
                 'reps': 10,
                 'weight': 120
             },
-            context={'workout': new_workout}
+            format='json'
+        )
+        
+        # The constraint violation comes back as a validation error
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('set_number', response.data)
+        self.assertEqual(new_workout.sets.count(), 1)
+
+
+class TrainingRollupTests(APITestCase):
+    """Tests for the incrementally maintained training rollups"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Rollup User",
+            email="rollup@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        
+        self.squat = Exercise.objects.create(name="Squat", muscle_group="legs")
+        self.bench = Exercise.objects.create(name="Bench Press", muscle_group="chest")
+        self.workout = Workout.objects.create(
+            user_id=self.user_id,
+            name="Leg Day",
+            date=date.today(),
+            start_time="10:00:00",
+            duration=50
+        )
+    
+    def workout_loads(self):
+        from .models import WorkoutMuscleGroupLoad
+        
+        return {
+            (row.workout_id, row.muscle_group): (row.total_sets, row.tonnage, row.rpe_total, row.rpe_sets)
+            for row in WorkoutMuscleGroupLoad.objects.filter(workout__user_id=self.user_id)
+            if row.total_sets
+        }
+    
+    def exercise_usage(self):
+        from .models import UserExerciseUsage
+        from .rollups import usage_day, usage_decay
+        
+        # Rows may be scored as of different days; compare them as of today
+        today = usage_day(date.today())
+        return {
+            row.exercise_id: (row.total_sets, row.score * usage_decay(row.scored_day, today))
+            for row in UserExerciseUsage.objects.filter(user_id=self.user_id)
+            if row.total_sets
+        }
+    
+    def assertRollupsMatchRebuild(self):
+        from .models import UserTrainingStats, UserMuscleGroupStats
+        from .rollups import rebuild_user_stats
+        
+        incremental = UserTrainingStats.objects.get(user_id=self.user_id)
+        incremental_muscles = {
+            row.muscle_group: (row.total_sets, row.total_reps, row.total_volume)
+            for row in UserMuscleGroupStats.objects.filter(user_id=self.user_id)
+            if row.total_sets
+        }
+        incremental_loads = self.workout_loads()
+        incremental_usage = self.exercise_usage()
+        
+        rebuild_user_stats([self.user_id])
+        rebuilt = UserTrainingStats.objects.get(user_id=self.user_id)
+        rebuilt_muscles = {
+            row.muscle_group: (row.total_sets, row.total_reps, row.total_volume)
+            for row in UserMuscleGroupStats.objects.filter(user_id=self.user_id)
+        }
+        
+        for field in ['total_workouts', 'total_duration', 'total_sets',
+                      'total_reps', 'total_volume', 'most_trained_muscle']:
+            self.assertEqual(getattr(incremental, field), getattr(rebuilt, field), field)
+        self.assertEqual(incremental_muscles, rebuilt_muscles)
+        self.assertEqual(incremental_loads, self.workout_loads())
+        rebuilt_usage = self.exercise_usage()
+        self.assertEqual(incremental_usage.keys(), rebuilt_usage.keys())
+        for exercise_id, (total_sets, score) in rebuilt_usage.items():
+            self.assertEqual(incremental_usage[exercise_id][0], total_sets)
+            self.assertAlmostEqual(incremental_usage[exercise_id][1] / score, 1, places=9)
+    
+    def test_rollups_follow_set_writes(self):
+        """Create, update and delete of sets keep the rollups exact"""
+        first = WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=1, reps=5, weight=100
+        )
+        WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=2, reps=5, weight=110
+        )
+        bench_set = WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.bench, set_number=1, reps=8, weight=60
+        )
+        self.assertRollupsMatchRebuild()
+        
+        first.reps = 6
+        first.exercise = self.bench
+        first.set_number = 2
+        first.save()
+        self.assertRollupsMatchRebuild()
+        
+        bench_set.delete()
+        self.assertRollupsMatchRebuild()
+    
+    def test_workout_loads_follow_set_writes(self):
+        """Per-workout load rows count working sets and their RPE only"""
+        warmup = WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=1, reps=5, weight=60, is_warmup=True
+        )
+        working = WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=2, reps=5, weight=100, rpe=8
+        )
+        WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=3, reps=5, weight=100
+        )
+        self.assertEqual(self.workout_loads(), {(self.workout.id, 'legs'): (2, 1000, 8, 1)})
+        self.assertRollupsMatchRebuild()
+        
+        warmup.is_warmup = False
+        warmup.rpe = 6
+        warmup.save()
+        working.exercise = self.bench
+        working.save()
+        self.assertEqual(self.workout_loads(), {
+            (self.workout.id, 'legs'): (2, 800, 6, 1),
+            (self.workout.id, 'chest'): (1, 500, 8, 1),
+        })
+        self.assertRollupsMatchRebuild()
+        
+        working.delete()
+        self.assertRollupsMatchRebuild()
+    
+    def test_rollups_follow_workout_writes(self):
+        """Workout duration changes and cascading deletes update the rollups"""
+        WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=1, reps=5, weight=100
+        )
+        other = Workout.objects.create(
+            user_id=self.user_id, name="Push", date=date.today(),
+            start_time="18:00:00", duration=40
+        )
+        WorkoutSet.objects.create(
+            workout=other, exercise=self.bench, set_number=1, reps=10, weight=50
+        )
+        
+        self.workout.duration = 70
+        self.workout.save()
+        self.assertRollupsMatchRebuild()
+        
+        self.workout.date = date.today() - timedelta(days=45)
+        self.workout.save()
+        self.assertRollupsMatchRebuild()
+        
+        other.delete()
+        self.assertRollupsMatchRebuild()
+        
+        response = self.client.get(reverse('workout-stats'))
+        self.assertEqual(response.data['total_workouts'], 1)
+        self.assertEqual(response.data['total_volume'], 500)
+        self.assertEqual(response.data['average_duration'], 70)
+        self.assertEqual(response.data['most_trained_muscle'], 'legs')
+    
+    def test_rollups_follow_exercise_muscle_group(self):
+        """Moving an exercise to another muscle group moves its sets' totals"""
+        from api.upsert import upsert
+        
+        WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=1, reps=5, weight=60, is_warmup=True
+        )
+        squat_set = WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=2, reps=5, weight=100, rpe=8
+        )
+        for set_number in (1, 2, 3):
+            WorkoutSet.objects.create(
+                workout=self.workout, exercise=self.bench, set_number=set_number, reps=8, weight=60
+            )
+        
+        self.squat.muscle_group = 'glutes'
+        self.squat.save()
+        self.assertEqual(self.workout_loads(), {
+            (self.workout.id, 'glutes'): (1, 500, 8, 1),
+            (self.workout.id, 'chest'): (3, 1440, 0, 0),
+        })
+        self.assertRollupsMatchRebuild()
+        squat_set.delete()
+        self.assertRollupsMatchRebuild()
+        
+        # Seeding updates exercises with bulk_update, which sends no model signals
+        upsert(
+            Exercise, [Exercise(id=str(self.bench.pk), name='Bench Press', muscle_group='shoulders')],
+            keys=[('id',)], fields=['muscle_group'],
+        )
+        self.assertEqual(self.workout_loads(), {(self.workout.id, 'shoulders'): (3, 1440, 0, 0)})
+        self.assertRollupsMatchRebuild()
+        
+        response = self.client.get(reverse('workout-stats'))
+        self.assertEqual(response.data['most_trained_muscle'], 'shoulders')
+    
+    def test_stats_is_a_single_query(self):
+        """The stats endpoint cost does not depend on the amount of history"""
+        for set_number in range(1, 21):
+            WorkoutSet.objects.create(
+                workout=self.workout, exercise=self.squat,
+                set_number=set_number, reps=5, weight=100
+            )
+        
+        url = reverse('workout-stats')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data['total_sets'], 20)
+        self.assertEqual(response.data['total_volume'], 10000)
+
+
+class PersonalRecordTests(APITestCase):
+    """Tests for the incrementally maintained personal records"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Record User",
+            email="records@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        
+        self.squat = Exercise.objects.create(name="Squat", muscle_group="legs")
+        self.bench = Exercise.objects.create(name="Bench Press", muscle_group="chest")
+        self.workout = Workout.objects.create(
+            user_id=self.user_id,
+            name="Leg Day",
+            date=date.today() - timedelta(days=7),
+            start_time="10:00:00",
+            duration=50
+        )
+    
+    def records(self):
+        return {
+            record.exercise_id: tuple(getattr(record, field) for field in RECORD_FIELDS)
+            for record in UserExerciseRecord.objects.filter(user_id=self.user_id)
+        }
+    
+    def assertRecordsMatchRebuild(self):
+        incremental = self.records()
+        rebuild_records([self.user_id])
+        self.assertEqual(incremental, self.records())
+    
+    def test_estimated_1rm(self):
+        """Brzycki and Epley meet at 10 reps; high-rep sets have no estimate"""
+        self.assertEqual(estimated_1rm(100, 1), 100)
+        self.assertEqual(estimated_1rm(90, 10), 120)
+        self.assertEqual(estimated_1rm(60, 12), 84)
+        self.assertIsNone(estimated_1rm(50, 20))
+    
+    def test_records_follow_set_writes(self):
+        """New sets raise records; changing or deleting a record set recomputes it"""
+        first = WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=1, reps=5, weight=100
+        )
+        heavy = WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=2, reps=3, weight=110
+        )
+        WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=3, reps=1, weight=140, is_warmup=True
+        )
+        record = UserExerciseRecord.objects.get(user_id=self.user_id, exercise=self.squat)
+        self.assertEqual((record.best_weight, record.best_weight_reps), (110, 3))
+        self.assertEqual(record.best_e1rm, estimated_1rm(110, 3))
+        self.assertEqual(record.best_volume, 500)
+        self.assertAlmostEqual(record.best_e1rm, 116.47)
+        self.assertRecordsMatchRebuild()
+        
+        heavy.weight = 90
+        heavy.save()
+        record = UserExerciseRecord.objects.get(user_id=self.user_id, exercise=self.squat)
+        self.assertEqual((record.best_weight, record.best_weight_reps), (100, 5))
+        self.assertEqual(record.best_e1rm, 112.5)
+        self.assertRecordsMatchRebuild()
+        
+        first.delete()
+        record = UserExerciseRecord.objects.get(user_id=self.user_id, exercise=self.squat)
+        self.assertEqual((record.best_weight, record.best_volume), (90, 270))
+        self.assertRecordsMatchRebuild()
+        
+        heavy.delete()
+        self.assertFalse(UserExerciseRecord.objects.filter(user_id=self.user_id).exists())
+    
+    def test_records_follow_workout_writes(self):
+        """Records keep the date they were reached and drop with deleted workouts"""
+        WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=1, reps=5, weight=100
+        )
+        later = Workout.objects.create(
+            user_id=self.user_id, name="Leg Day 2", date=date.today(), start_time="10:00:00"
+        )
+        self.client.post(
+            reverse('workout-set-bulk', args=[later.id]),
+            [{'exercise': str(self.squat.id), 'reps': 5, 'weight': 100},
+             {'exercise': str(self.bench.id), 'reps': 8, 'weight': 60}],
+            format='json'
+        )
+        record = UserExerciseRecord.objects.get(user_id=self.user_id, exercise=self.squat)
+        self.assertEqual(record.best_weight_date, self.workout.date)
+        
+        self.workout.date = date.today() - timedelta(days=1)
+        self.workout.save()
+        record = UserExerciseRecord.objects.get(user_id=self.user_id, exercise=self.squat)
+        self.assertEqual(record.best_weight_date, self.workout.date)
+        self.assertRecordsMatchRebuild()
+        
+        later.delete()
+        self.assertEqual(set(self.records()), {self.squat.id})
+        self.assertRecordsMatchRebuild()
+    
+    def test_records_endpoint(self):
+        """Records are listed strongest first and can be filtered by exercise"""
+        WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=1, reps=5, weight=100
+        )
+        WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.bench, set_number=1, reps=5, weight=80
+        )
+        url = reverse('workout-records')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['exercise_name'] for row in response.data], ['Squat', 'Bench Press'])
+        self.assertEqual(response.data[0]['best_e1rm'], 112.5)
+        
+        response = self.client.get(url, {'exercise': str(self.bench.id)})
+        self.assertEqual([row['muscle_group'] for row in response.data], ['chest'])
+        response = self.client.get(url, {'exercise': 'not-a-uuid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ProgressionTests(APITestCase):
+    """Tests for the downsampled per-exercise progression series"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Progress User",
+            email="progress@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        self.squat = Exercise.objects.create(name="Squat", muscle_group="legs")
+        self.url = reverse('exercise-progression', args=[self.squat.id])
+    
+    def log_days(self, count, spike_day=None):
+        start = date.today() - timedelta(days=count)
+        workouts = [
+            Workout(user_id=self.user_id, name=f"Day {day}", date=start + timedelta(days=day),
+                    start_time="10:00:00")
+            for day in range(count)
+        ]
+        Workout.objects.bulk_create(workouts)
+        WorkoutSet.objects.bulk_create([
+            WorkoutSet(workout=workout, exercise=self.squat, set_number=number, reps=reps,
+                       weight=(200 if day == spike_day else 100 + day * 0.1))
+            for day, workout in enumerate(workouts)
+            for number, reps in ((1, 5), (2, 15))
+        ])
+        return workouts
+    
+    def test_lttb_keeps_ends_and_peaks(self):
+        """Downsampling keeps the first and last points and a lone spike"""
+        import numpy as np
+        from .progression import lttb
+        
+        x = np.arange(1000, dtype=float)
+        y = np.zeros(1000)
+        y[437] = 50
+        kept = lttb(x, y, 20)
+        self.assertEqual(len(kept), 20)
+        self.assertEqual((kept[0], kept[-1]), (0, 999))
+        self.assertIn(437, kept)
+        self.assertEqual(len(lttb(x[:10], y[:10], 20)), 10)
+    
+    def test_progression_series(self):
+        """Series are aggregated per day and downsampled to the point budget"""
+        workouts = self.log_days(400, spike_day=250)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'points': 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['sessions'], 400)
+        
+        series = response.data['series']
+        for name in ['e1rm', 'best_e1rm', 'top_set', 'volume']:
+            self.assertEqual(len(series[name]['dates']), 50)
+            self.assertEqual(series[name]['dates'][0], workouts[0].date.isoformat())
+        top_set = dict(zip(series['top_set']['dates'], series['top_set']['values']))
+        self.assertEqual(top_set[workouts[250].date.isoformat()], 200)
+        self.assertEqual(series['e1rm']['values'][0], estimated_1rm(100, 5))
+        self.assertEqual(series['best_e1rm']['values'][-1], estimated_1rm(200, 5))
+        self.assertEqual(series['volume']['values'][0], 100 * 5 + 100 * 15)
+    
+    def test_progression_validation(self):
+        """Point budgets and date ranges are validated; no history is empty"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['sessions'], 0)
+        self.assertEqual(response.data['series']['e1rm'], {'dates': [], 'values': []})
+        for params in ({'points': 1}, {'points': 'many'}, {'start': 'yesterday'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+class ExerciseSearchTests(APITestCase):
+    """Tests for the in-memory exercise search index"""
+    
+    def setUp(self):
+        from api.catalog import catalog_cache
+        
+        catalog_cache.clear()
+        self.addCleanup(catalog_cache.clear)
+        self.user_profile = UserProfile.objects.create(
+            user_id=str(uuid.uuid4()), display_name="Search User", email="search@example.com"
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        self.url = reverse('exercise-list')
+        for name, muscle_group, equipment, description in [
+            ("Bench Press", "chest", "Barbell, Bench", "Press the bar from the chest"),
+            ("Dumbbell Bench Press", "chest", "Dumbbells, Bench", "Press two dumbbells"),
+            ("Overhead Press", "shoulders", "Barbell", "Press the bar overhead while standing"),
+            ("Romanian Deadlift", "back", "Barbell", "Hinge at the hips with soft knees"),
+            ("Pull-Up", "back", "Pull-up Bar", "Pull your chin over the bar"),
+            ("Plank", "core", "None", "Hold a straight line on the forearms"),
+        ]:
+            Exercise.objects.create(
+                name=name, muscle_group=muscle_group, equipment_needed=equipment, description=description
+            )
+    
+    def search(self, query, **params):
+        response = self.client.get(self.url, {'search': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [exercise['name'] for exercise in response.data]
+    
+    def test_synonyms_fields_and_typos(self):
+        """Queries match abbreviations, equipment, descriptions and misspellings"""
+        self.assertEqual(self.search('DB bench'), ['Dumbbell Bench Press'])
+        self.assertEqual(self.search('bench press dumbbell')[0], 'Dumbbell Bench Press')
+        self.assertEqual(self.search('ohp'), ['Overhead Press'])
+        self.assertEqual(self.search('rdl'), ['Romanian Deadlift'])
+        self.assertEqual(self.search('pullup'), ['Pull-Up'])
+        self.assertEqual(self.search('forearms'), ['Plank'])
+        self.assertEqual(self.search('bnech'), ['Bench Press', 'Dumbbell Bench Press'])
+        self.assertEqual(self.search('xyzzy'), [])
+    
+    def test_ranking_and_filters(self):
+        """Name matches outrank other fields; list filters still apply"""
+        # Exact name, then name words, then the description mention
+        self.assertEqual(
+            self.search('press'), ['Bench Press', 'Dumbbell Bench Press', 'Overhead Press']
+        )
+        self.assertEqual(self.search('bench press'), ['Bench Press', 'Dumbbell Bench Press'])
+        # Equal equipment matches fall back to name order
+        self.assertEqual(self.search('barbell'), ['Bench Press', 'Overhead Press', 'Romanian Deadlift'])
+        self.assertEqual(self.search('press', muscle_group='shoulders'), ['Overhead Press'])
+    
+    def test_index_follows_catalog_version(self):
+        """The index answers without queries and is rebuilt after catalog writes"""
+        self.search('plank')
+        with self.assertNumQueries(0):
+            self.search('plank')
+            self.search('pul')
+        
+        Exercise.objects.create(name="Side Plank", muscle_group="core")
+        self.assertEqual(self.search('plank'), ['Plank', 'Side Plank'])
+
+
+class ExerciseSelectorTests(APITestCase):
+    """Tests for the exercise selector ranked by the user's usage"""
+    
+    def setUp(self):
+        from api.catalog import catalog_cache
+        
+        catalog_cache.clear()
+        self.addCleanup(catalog_cache.clear)
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id, display_name="Selector User", email="selector@example.com"
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        self.url = reverse('exercise-selector')
+        self.exercises = {
+            name: Exercise.objects.create(name=name, muscle_group=muscle_group)
+            for name, muscle_group in [
+                ("Bench Press", "chest"), ("Deadlift", "back"), ("Overhead Press", "shoulders"),
+                ("Plank", "core"), ("Squat", "legs"),
+            ]
+        }
+    
+    def log(self, days_ago, name, sets, user_id=None):
+        workout = Workout.objects.create(
+            user_id=user_id or self.user_id, name="Session",
+            date=date.today() - timedelta(days=days_ago), start_time="10:00:00", duration=60
+        )
+        for set_number in range(1, sets + 1):
+            WorkoutSet.objects.create(
+                workout=workout, exercise=self.exercises[name],
+                set_number=set_number, reps=5, weight=100
+            )
+        return workout
+    
+    def select(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+    
+    def test_recent_use_outranks_old_use(self):
+        """Top exercises are ranked by decayed set count, the rest by name"""
+        # 12 sets three half-lives ago weigh 1.5 sets today
+        self.log(90, "Deadlift", 12)
+        self.log(1, "Squat", 3)
+        self.log(0, "Bench Press", 1)
+        self.log(0, "Plank", 5, user_id=str(uuid.uuid4()))
+        
+        data = self.select()
+        self.assertEqual(
+            [exercise['name'] for exercise in data['top']], ["Squat", "Deadlift", "Bench Press"]
+        )
+        self.assertEqual(data['top'][1]['total_sets'], 12)
+        self.assertAlmostEqual(data['top'][1]['score'], 1.5, places=2)
+        self.assertEqual([exercise['name'] for exercise in data['exercises']], ["Overhead Press", "Plank"])
+        
+        self.assertEqual([exercise['name'] for exercise in self.select(top=1)['top']], ["Squat"])
+        self.assertEqual(
+            [exercise['name'] for exercise in self.select(muscle_group='back')['top']], ["Deadlift"]
+        )
+    
+    def test_usage_follows_writes(self):
+        """Deleting and moving workouts updates the ranking"""
+        squats = self.log(0, "Squat", 3)
+        self.log(0, "Deadlift", 2)
+        self.assertEqual(self.select()['top'][0]['name'], "Squat")
+        
+        squats.date = date.today() - timedelta(days=120)
+        squats.save()
+        self.assertEqual(self.select()['top'][0]['name'], "Deadlift")
+        
+        squats.delete()
+        self.assertEqual([exercise['name'] for exercise in self.select()['top']], ["Deadlift"])
+    
+    def test_far_future_dates(self):
+        """Sets dated far from today are scored without overflow"""
+        from .models import UserExerciseUsage
+        from .rollups import rebuild_user_stats
+        
+        far = self.log((date.today() - date(2110, 1, 1)).days, "Squat", 2)
+        self.log(0, "Deadlift", 1)
+        self.log(365 * 80, "Plank", 1)
+        response = self.client.post(
+            reverse('workout-set-list', args=[far.id]),
+            {'exercise': str(self.exercises["Squat"].id), 'reps': 5, 'weight': 100},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        # Future sets count as of their own day, not above it
+        data = self.select()
+        self.assertEqual(
+            [exercise['name'] for exercise in data['top']], ["Squat", "Deadlift", "Plank"]
+        )
+        self.assertAlmostEqual(data['top'][0]['score'], 3)
+        
+        def usage():
+            return {
+                row.exercise_id: (row.total_sets, row.scored_day, round(row.score, 9))
+                for row in UserExerciseUsage.objects.filter(user_id=self.user_id)
+            }
+        incremental = usage()
+        rebuild_user_stats([self.user_id])
+        self.assertEqual(incremental, usage())
+        
+        far.delete()
+        self.assertEqual([exercise['name'] for exercise in self.select()['top']], ["Deadlift", "Plank"])
+    
+    def test_selector_reads_usage_rows_only(self):
+        """The selector costs one query once the catalog is cached, whatever the history"""
+        for days_ago in range(20):
+            self.log(days_ago, "Squat", 3)
+        self.select()
+        with self.assertNumQueries(1):
+            data = self.select()
+        self.assertEqual(data['top'][0]['total_sets'], 60)
+    
+    def test_selector_validation(self):
+        """top must be a number within range"""
+        for top in ['many', '-1', '51']:
+            response = self.client.get(self.url, {'top': top})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.select(top=0)['top'], [])
+
+class WorkoutQueryCountTests(APITestCase):
+    """Workout read endpoints must not issue queries per workout or per set"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Query User",
+            email="queries@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        self.exercises = [
+            Exercise.objects.create(name=f"Exercise {index}", muscle_group="chest")
+            for index in range(3)
+        ]
+    
+    def create_workouts(self, count):
+        for index in range(count):
+            workout = Workout.objects.create(
+                user_id=self.user_id,
+                name=f"Workout {index}",
+                date=date.today() - timedelta(days=index % 20),
+                start_time="07:00:00",
+                duration=45
+            )
+            for exercise in self.exercises:
+                for set_number in range(1, 4):
+                    WorkoutSet.objects.create(
+                        workout=workout, exercise=exercise,
+                        set_number=set_number, reps=10, weight=50
+                    )
+    
+    def count_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+    
+    def test_list_and_history_query_count_is_constant(self):
+        """Listing 1 or 30 workouts with nested sets costs the same queries"""
+        urls = [reverse('workout-list'), reverse('workout-history')]
+        
+        self.create_workouts(1)
+        small = [self.count_queries(url) for url in urls]
+        
+        self.create_workouts(29)
+        large = [self.count_queries(url) for url in urls]
+        
+        self.assertEqual(small, large)
+    
+    def test_detail_query_count_is_constant(self):
+        """Retrieving a workout does not query per set"""
+        self.create_workouts(1)
+        workout = Workout.objects.get(user_id=self.user_id)
+        url = reverse('workout-detail', args=[workout.id])
+        small = self.count_queries(url)
+        
+        extra = Exercise.objects.create(name="Extra", muscle_group="back")
+        for set_number in range(1, 11):
+            WorkoutSet.objects.create(
+                workout=workout, exercise=extra,
+                set_number=set_number, reps=5, weight=80
+            )
+        self.assertEqual(small, self.count_queries(url))
+
+
+class WorkoutSetBulkTests(APITestCase):
+    """Tests for the bulk set ingestion endpoint"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Bulk User",
+            email="bulk@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        self.squat = Exercise.objects.create(name="Squat", muscle_group="legs")
+        self.deadlift = Exercise.objects.create(name="Deadlift", muscle_group="back")
+        self.workout = Workout.objects.create(
+            user_id=self.user_id,
+            name="Sync Workout",
+            date=date.today(),
+            start_time="09:00:00",
+            duration=60
+        )
+        self.url = reverse('workout-set-bulk', args=[self.workout.id])
+    
+    def build_sets(self, count):
+        return [
+            {
+                'exercise': str(exercise.id),
+                'set_number': set_number,
+                'reps': 5,
+                'weight': 100
+            }
+            for exercise in [self.squat, self.deadlift]
+            for set_number in range(1, count + 1)
+        ]
+    
+    def test_bulk_create_sets(self):
+        """A batch of sets is created and counted in the stats"""
+        response = self.client.post(self.url, self.build_sets(15), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 30)
+        self.assertEqual(self.workout.sets.count(), 30)
+        self.assertEqual(response.data[0]['exercise_name'], 'Squat')
+        
+        stats = self.client.get(reverse('workout-stats')).data
+        self.assertEqual(stats['total_sets'], 30)
+        self.assertEqual(stats['total_volume'], 15000)
+    
+    def test_bulk_query_count_is_constant(self):
+        """Validation and writes do not issue queries per set"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        # Warm up so both measured requests update existing rollup rows
+        self.client.post(self.url, self.build_sets(1), format='json')
+        self.workout.sets.all().delete()
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, self.build_sets(2), format='json')
+        self.workout.sets.all().delete()
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(self.url, self.build_sets(20), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+    
+    def test_bulk_allocates_missing_set_numbers(self):
+        """Sets without a set_number are numbered after stored and explicit ones"""
+        WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=2, reps=5, weight=100
+        )
+        data = [
+            {'exercise': str(self.squat.id), 'reps': 5},
+            {'exercise': str(self.deadlift.id), 'reps': 5},
+            {'exercise': str(self.squat.id), 'set_number': 5, 'reps': 5},
+            {'exercise': str(self.squat.id), 'reps': 5},
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['set_number'] for item in response.data], [6, 1, 5, 7])
+    
+    def test_bulk_reports_per_item_errors(self):
+        """Invalid batches save nothing and report errors by position"""
+        WorkoutSet.objects.create(
+            workout=self.workout, exercise=self.squat, set_number=1, reps=5, weight=100
+        )
+        data = [
+            {'exercise': str(self.squat.id), 'set_number': 1, 'reps': 5},
+            {'exercise': str(self.squat.id), 'set_number': 2, 'reps': 5},
+            {'exercise': str(self.deadlift.id), 'set_number': 1, 'reps': 5},
+            {'exercise': str(self.deadlift.id), 'set_number': 1, 'reps': 5},
+            {'exercise': str(uuid.uuid4()), 'set_number': 1, 'reps': 5},
+            {'exercise': str(self.squat.id), 'set_number': 3},
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data), 6)
+        self.assertIn('exercise', response.data[4])
+        self.assertIn('reps', response.data[5])
+        self.assertEqual(self.workout.sets.count(), 1)
+        
+        response = self.client.post(self.url, data[:4], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('set_number', response.data[0])
+        self.assertEqual(response.data[1], {})
+        self.assertEqual(response.data[2], {})
+        self.assertIn('set_number', response.data[3])
+    
+    def test_bulk_requires_workout_owner(self):
+        """Sets cannot be bulk-added to another user's workout"""
+        other_workout = Workout.objects.create(
+            user_id=str(uuid.uuid4()),
+            name="Other",
+            date=date.today(),
+            start_time="09:00:00",
+        )
+        url = reverse('workout-set-bulk', args=[other_workout.id])
+        response = self.client.post(url, self.build_sets(1), format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class WorkoutPaginationTests(APITestCase):
+    """Tests for keyset pagination of the workout list"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Paging User",
+            email="paging@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        # Several workouts share a date and start time to exercise the id tie-breaker
+        for index in range(7):
+            Workout.objects.create(
+                user_id=self.user_id,
+                name=f"Workout {index}",
+                date=date.today() - timedelta(days=index // 3),
+                start_time="06:00:00" if index % 3 else "18:00:00",
+                duration=30
+            )
+    
+    def test_pages_cover_every_workout_once(self):
+        """Following next links returns every workout once, in list order"""
+        url = reverse('workout-list') + '?limit=3'
+        names = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 3)
+            names.extend(workout['name'] for workout in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        
+        expected = [
+            workout.name for workout in
+            Workout.objects.filter(user_id=self.user_id).order_by('-date', '-start_time', 'id')
+        ]
+        self.assertEqual(names, expected)
+        self.assertEqual(pages, 3)
+    
+    def test_previous_link_returns_prior_page(self):
+        """The previous link of the second page returns the first page"""
+        first = self.client.get(reverse('workout-list') + '?limit=3')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [workout['id'] for workout in back.data['results']],
+            [workout['id'] for workout in first.data['results']]
+        )
+    
+    def test_deep_page_costs_same_queries(self):
+        """A later page issues the same queries as the first one"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as first_page:
+            response = self.client.get(reverse('workout-list') + '?limit=2')
+        deep_url = self.client.get(response.data['next']).data['next']
+        with CaptureQueriesContext(connection) as deep_page:
+            self.client.get(deep_url)
+        self.assertEqual(len(first_page.captured_queries), len(deep_page.captured_queries))
+    
+    def test_invalid_cursor(self):
+        """A malformed cursor returns 404"""
+        response = self.client.get(reverse('workout-list') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class WorkoutExportTests(APITestCase):
+    """Tests for the streaming workout export"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Export User",
+            email="export@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        self.exercise = Exercise.objects.create(name="Squat", muscle_group="legs")
+        self.workout = Workout.objects.create(
+            user_id=self.user_id, name="Leg Day", date=date.today() - timedelta(days=1),
+            start_time="07:00:00", duration=50
+        )
+        for set_number in (1, 2):
+            WorkoutSet.objects.create(
+                workout=self.workout, exercise=self.exercise,
+                set_number=set_number, reps=5, weight=100 + set_number
+            )
+        self.empty_workout = Workout.objects.create(
+            user_id=self.user_id, name="Rest Notes", date=date.today(),
+            start_time="08:00:00", duration=0
         )
+        Workout.objects.create(
+            user_id=str(uuid.uuid4()), name="Someone else", date=date.today(),
+            start_time="09:00:00"
+        )
+    
+    def export(self, **params):
+        response = self.client.get(reverse('workout-export'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+    
+    def test_csv_export(self):
+        """CSV has a row per set and a row for each workout without sets"""
+        response, body = self.export(format='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment;', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual([row['set_number'] for row in rows], ['1', '2', ''])
+        self.assertEqual(rows[0]['exercise'], 'Squat')
+        self.assertEqual(rows[1]['weight'], '102.0')
+        self.assertEqual(rows[2]['workout_name'], 'Rest Notes')
+    
+    def test_ndjson_export(self):
+        """NDJSON has one workout per line with its sets nested"""
+        response, body = self.export(format='ndjson', start=(date.today() - timedelta(days=1)).isoformat())
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([record['name'] for record in records], ['Leg Day', 'Rest Notes'])
+        self.assertEqual([workout_set['set_number'] for workout_set in records[0]['sets']], [1, 2])
+        self.assertEqual(records[1]['sets'], [])
         
-        # Serializer should catch the duplicate
-        self.assertFalse(serializer.is_valid())
-        self.assertIn('set_number', serializer.errors)
+        _, body = self.export(format='ndjson', end=(date.today() - timedelta(days=1)).isoformat())
+        self.assertEqual(len(body.splitlines()), 1)
+    
+    def test_export_is_a_single_query(self):
+        """The export is one joined query, whatever the history size"""
+        with self.assertNumQueries(1):
+            self.export(format='ndjson')
+    
+    def test_invalid_range(self):
+        """Malformed dates are rejected"""
+        response = self.client.get(reverse('workout-export'), {'format': 'csv', 'start': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('YYYY-MM-DD', response.content.decode())
+
+
+STRONG_CSV = """Date,Workout Name,Duration,Exercise Name,Set Order,Weight,Reps,Distance,Seconds,Notes,Workout Notes,RPE
+2024-01-05 18:30:00,Push,1h 5m,Bench Press (Barbell),W,95,10,0,0,,,
+2024-01-05 18:30:00,Push,1h 5m,Bench Press (Barbell),1,185,5,0,0,,,8
+2024-01-05 18:30:00,Push,1h 5m,Bench Press (Barbell),1,185,5,0,0,,,8.5
+2024-01-05 18:30:00,Push,1h 5m,Zercher Carry,1,135,1,0,0,,,
+2024-01-07 07:00:00,Legs,45m,squat,1,225,5,0,0,felt strong,,
+2024-01-07 07:00:00,Legs,45m,Treadmill Run,1,0,0,2000,600,,,
+"""
+
+
+class WorkoutImportTests(APITestCase):
+    """Tests for the CSV workout history import"""
+    
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.user_profile = UserProfile.objects.create(
+            user_id=self.user_id,
+            display_name="Import User",
+            email="import@example.com",
+        )
+        self.client.force_authenticate(user=self.user_profile)
+        self.bench = Exercise.objects.create(name="Bench Press", muscle_group="chest")
+        self.squat = Exercise.objects.create(name="Squat", muscle_group="legs")
+        self.run = Exercise.objects.create(name="Treadmill Running", muscle_group="cardio", is_cardio=True)
+    
+    def upload(self, content, **data):
+        upload = io.BytesIO(content.encode())
+        upload.name = 'export.csv'
+        return self.client.post(reverse('workout-import'), {'file': upload, **data}, format='multipart')
+    
+    def write(self, lines):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.addCleanup(os.remove, handle.name)
+        with handle:
+            handle.write('\n'.join(lines) + '\n')
+        return handle.name
+    
+    def test_import_strong_export(self):
+        """Rows are grouped into workouts and exercise names resolved or skipped"""
+        exercise_count = Exercise.objects.count()
+        response = self.upload(STRONG_CSV, weight_unit='lb')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['workouts'], 2)
+        self.assertEqual(response.data['sets'], 5)
+        self.assertEqual(response.data['unknown_exercises'], ['Zercher Carry'])
+        self.assertEqual(Exercise.objects.count(), exercise_count)
+        
+        push = Workout.objects.get(user_id=self.user_id, name='Push')
+        self.assertEqual(push.duration, 65)
+        self.assertEqual(str(push.start_time), '18:30:00')
+        bench_sets = list(push.sets.filter(exercise=self.bench).order_by('set_number'))
+        self.assertEqual([workout_set.set_number for workout_set in bench_sets], [1, 2, 3])
+        self.assertTrue(bench_sets[0].is_warmup)
+        self.assertAlmostEqual(bench_sets[1].weight, 83.91, places=2)
+        self.assertEqual(bench_sets[2].rpe, 8)
+        
+        legs = Workout.objects.get(user_id=self.user_id, name='Legs')
+        self.assertEqual(legs.sets.get(exercise=self.squat).notes, 'felt strong')
+        run = legs.sets.get(exercise=self.run)
+        self.assertEqual((run.duration, run.distance, run.weight), (600, 2000, None))
+        self.assertEqual(
+            UserTrainingStats.objects.get(user_id=self.user_id).total_sets, 5
+        )
+    
+    def test_import_resumes(self):
+        """Re-importing skips stored workouts and adds the missing ones"""
+        first_workout = STRONG_CSV.splitlines()[:5]
+        call_command(
+            'import_workouts', self.write(first_workout), '--user', self.user_id,
+            '--batch-size', '1', stdout=io.StringIO(),
+        )
+        self.assertEqual(Workout.objects.filter(user_id=self.user_id).count(), 1)
+        
+        response = self.upload(STRONG_CSV)
+        self.assertEqual(response.data['workouts'], 1)
+        self.assertEqual(response.data['skipped_workouts'], 1)
+        response = self.upload(STRONG_CSV)
+        self.assertEqual((response.data['workouts'], response.data['skipped_workouts']), (0, 2))
+        self.assertEqual(WorkoutSet.objects.filter(workout__user_id=self.user_id).count(), 5)
+    
+    def test_interrupted_import_keeps_rollups(self):
+        """Batches committed before a decode error are counted in the rollups"""
+        # Enough rows that the file is decoded in several chunks
+        path = self.write(STRONG_CSV.splitlines() + [
+            f'2024-02-01 {minute // 60:02}:{minute % 60:02}:00,Extra,30m,Squat,1,100,5,0,0,,,'
+            for minute in range(500)
+        ])
+        with open(path, 'ab') as handle:
+            handle.write(b'2024-03-01 07:00:00,Legs,45m,Squat,1,225,5,0,0,\xff\xfe,,\n')
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_workouts', path, '--user', self.user_id, '--batch-size', '1',
+                stdout=io.StringIO(),
+            )
+        stored = WorkoutSet.objects.filter(workout__user_id=self.user_id).count()
+        self.assertGreater(stored, 0)
+        self.assertEqual(UserTrainingStats.objects.get(user_id=self.user_id).total_sets, stored)
+    
+    def test_other_users_exercises_are_not_matched(self):
+        """Custom exercises of other users, or of no user, are not used"""
+        Exercise.objects.create(name="Zercher Carry", muscle_group="legs", is_custom=True)
+        Exercise.objects.create(
+            name="Zercher Carry", muscle_group="legs", is_custom=True, created_by=uuid.uuid4()
+        )
+        response = self.upload(STRONG_CSV)
+        self.assertEqual(response.data['unknown_exercises'], ['Zercher Carry'])
+        
+        mine = Exercise.objects.create(
+            name="Zercher Carry", muscle_group="legs", is_custom=True, created_by=self.user_id
+        )
+        Workout.objects.filter(user_id=self.user_id).delete()
+        response = self.upload(STRONG_CSV)
+        self.assertEqual(response.data['unknown_exercises'], [])
+        self.assertTrue(WorkoutSet.objects.filter(workout__user_id=self.user_id, exercise=mine).exists())
+    
+    def test_import_own_export(self):
+        """A CSV export imports back into the same workouts and sets"""
+        self.upload(STRONG_CSV)
+        exported = b''.join(
+            self.client.get(reverse('workout-export'), {'format': 'csv'}).streaming_content
+        ).decode()
+        Workout.objects.filter(user_id=self.user_id).delete()
+        
+        response = self.upload(exported)
+        self.assertEqual((response.data['workouts'], response.data['sets']), (2, 5))
+        self.assertEqual(response.data['unknown_exercises'], [])
+    
+    def test_invalid_rows_are_reported(self):
+        """Bad rows are counted with their line numbers; bad files are rejected"""
+        response = self.upload(STRONG_CSV + "not a date,Push,,Squat,1,100,5,,,,,\n")
+        self.assertEqual(response.data['invalid_rows'], 1)
+        self.assertEqual(response.data['errors'][0]['line'], 8)
+        
+        response = self.upload("Name,Reps\nSquat,5\n")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class SeedExercisesTests(APITestCase):
+    """Tests for the idempotent seed_exercises command"""
+    
+    def seed(self, *args):
+        out = io.StringIO()
+        call_command('seed_exercises', *args, stdout=out)
+        return out.getvalue()
+    
+    def test_reseed_updates_in_place(self):
+        """Re-seeding changes nothing, restores edited rows and keeps referenced ones"""
+        self.assertIn('53 created, 0 updated, 0 unchanged', self.seed())
+        bench = Exercise.objects.get(name='Bench Press')
+        bench.description = 'Edited'
+        bench.save()
+        retired = Exercise.objects.create(name='Retired Lift', muscle_group='legs', difficulty_level=1)
+        workout = Workout.objects.create(
+            user_id=str(uuid.uuid4()), name='Push', date=date.today(), start_time='12:00:00'
+        )
+        WorkoutSet.objects.create(workout=workout, exercise=bench, set_number=1, reps=5, weight=100)
+        
+        self.assertIn('0 created, 1 updated, 52 unchanged', self.seed('--dry-run'))
+        self.assertEqual(Exercise.objects.get(pk=bench.pk).description, 'Edited')
+        
+        # One read, then inside a savepoint one UPDATE, the catalog version
+        # bump and read-back, and the change log INSERT
+        with self.assertNumQueries(7):
+            output = self.seed()
+        self.assertIn('0 created, 1 updated, 52 unchanged', output)
+        self.assertNotEqual(Exercise.objects.get(pk=bench.pk).description, 'Edited')
+        self.assertTrue(Exercise.objects.filter(pk=retired.pk).exists())
+        self.assertEqual(WorkoutSet.objects.filter(exercise=bench).count(), 1)
+        self.assertIn('0 created, 0 updated, 53 unchanged', self.seed())
+    
+    def test_renamed_exercise_is_matched_by_pk(self):
+        """Renaming an exercise in the fixture updates its row rather than inserting it again"""
+        self.seed()
+        fixture = os.path.join(os.path.dirname(__file__), 'fixtures', 'exercises.json')
+        with open(fixture) as f:
+            exercises = json.load(f)
+        bench = next(item for item in exercises if item['fields']['name'] == 'Bench Press')
+        bench['fields']['name'] = 'Flat Bench Press'
         
-        # Test passes if both checks above pass, which means both DB and serializer
-        # validate against duplicates properly
+        with mock.patch('workouts.management.commands.seed_exercises.json.load', return_value=exercises):
+            output = self.seed()
+        self.assertIn('0 created, 1 updated, 52 unchanged', output)
+        self.assertEqual(Exercise.objects.get(pk=bench['pk']).name, 'Flat Bench Press')
+        self.assertFalse(Exercise.objects.filter(name='Bench Press').exists())
@@ -1,25 +1,129 @@
 from django.shortcuts import render
 from rest_framework import viewsets, generics, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Sum, Count, Avg, F
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+import io
+import logging
+import uuid
 
-from .models import Exercise, Workout, WorkoutSet
+from api.catalog import CachedCatalogMixin, catalog_cache
+from api.export import EXPORT_CHUNK_SIZE, EXPORT_RENDERERS, export_response, parse_export_range
+from api.structured_logging import log_event
+from .importer import KG_PER_LB, WorkoutImporter, WorkoutImportError
+from .models import (
+    Exercise, UserExerciseRecord, UserExerciseUsage, Workout, WorkoutSet, UserTrainingStats
+)
+from .progression import DEFAULT_POINTS, MAX_POINTS, MIN_POINTS, progression
+from .rollups import usage_day, usage_decay_expression
+from .search import exercise_index
 from .serializers import (
     ExerciseSerializer, WorkoutSerializer, 
     WorkoutSetSerializer, WorkoutCreateSerializer,
-    WorkoutStatsSerializer
+    WorkoutStatsSerializer, WorkoutSetBulkSerializer, BULK_SET_LIMIT,
+    UserExerciseRecordSerializer, duplicate_set_number
 )
 
-class ExerciseViewSet(viewsets.ReadOnlyModelViewSet):
+logger = logging.getLogger(__name__)
+
+# Most used exercises listed first by the exercise selector
+DEFAULT_SELECTOR_TOP = 10
+MAX_SELECTOR_TOP = 50
+
+# Exported fields of a workout and of each of its sets: (name, lookup from Workout)
+WORKOUT_EXPORT_FIELDS = [
+    ('id', 'id'), ('name', 'name'), ('date', 'date'), ('start_time', 'start_time'),
+    ('end_time', 'end_time'), ('duration', 'duration'), ('calories_burned', 'calories_burned'),
+    ('notes', 'notes'),
+]
+SET_EXPORT_FIELDS = [
+    ('exercise', 'sets__exercise__name'), ('muscle_group', 'sets__exercise__muscle_group'),
+    ('set_number', 'sets__set_number'), ('reps', 'sets__reps'), ('weight', 'sets__weight'),
+    ('duration', 'sets__duration'), ('distance', 'sets__distance'), ('rpe', 'sets__rpe'),
+    ('is_warmup', 'sets__is_warmup'), ('notes', 'sets__notes'),
+]
+# CSV has one row per set (or per workout without sets), so names must not clash
+WORKOUT_EXPORT_CSV_COLUMNS = [
+    'workout_id', 'workout_name', 'date', 'start_time', 'end_time', 'workout_duration',
+    'calories_burned', 'workout_notes', 'exercise', 'muscle_group', 'set_number', 'reps',
+    'weight', 'set_duration', 'distance', 'rpe', 'is_warmup', 'set_notes',
+]
+
+def workout_export_records(rows):
+    """Nest the consecutive set rows of each workout into one record"""
+    workout_names = [name for name, _ in WORKOUT_EXPORT_FIELDS]
+    set_names = [name for name, _ in SET_EXPORT_FIELDS]
+    split = len(workout_names)
+    for _, workout_rows in groupby(rows, key=itemgetter(0)):
+        record = None
+        for row in workout_rows:
+            if record is None:
+                record = dict(zip(workout_names, row[:split]), sets=[])
+            # Workouts without sets come back as a single row of NULL set fields
+            if row[split] is not None:
+                record['sets'].append(dict(zip(set_names, row[split:])))
+        yield record
+
+def get_training_stats(user_id):
+    """
+    Workout statistics for a user, read from the incrementally maintained
+    rollup row (see workouts.rollups) with a single primary-key lookup
+    """
+    stats = UserTrainingStats.objects.filter(user_id=user_id).first()
+    if stats is None or stats.total_workouts == 0:
+        return {
+            'total_workouts': 0,
+            'total_sets': 0,
+            'total_reps': 0,
+            'total_volume': 0,
+            'average_duration': 0,
+            'most_trained_muscle': 'N/A'
+        }
+    
+    return WorkoutStatsSerializer({
+        'total_workouts': stats.total_workouts,
+        'total_sets': stats.total_sets,
+        'total_reps': stats.total_reps,
+        'total_volume': stats.total_volume,
+        'average_duration': stats.average_duration,
+        'most_trained_muscle': stats.most_trained_muscle or 'N/A'
+    }).data
+
+class ExerciseViewSet(CachedCatalogMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint to view exercises
     """
     queryset = Exercise.objects.all()
     serializer_class = ExerciseSerializer
+    # Reference catalog, always returned whole
+    pagination_class = None
+    catalog = 'exercises'
+    
+    def catalog_key(self):
+        """Lists are cached per muscle group and type filter"""
+        params = self.request.query_params
+        is_cardio = params.get('is_cardio')
+        return (
+            params.get('muscle_group') or '',
+            None if is_cardio is None else is_cardio.lower() == 'true',
+        )
+    
+    def list(self, request, *args, **kwargs):
+        """The catalog, or with ?search= the matching exercises best first from the search index"""
+        search = request.query_params.get('search')
+        if search:
+            muscle_group, is_cardio = self.catalog_key()
+            return Response(exercise_index().search(search, muscle_group or None, is_cardio))
+        return super().list(request, *args, **kwargs)
     
     def get_queryset(self):
         """Filter exercises by query parameters"""
@@ -36,12 +140,82 @@ class ExerciseViewSet(viewsets.ReadOnlyModelViewSet):
             is_cardio_bool = is_cardio.lower() == 'true'
             queryset = queryset.filter(is_cardio=is_cardio_bool)
         
-        # Search by name or description
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(name__icontains=search)
-        
         return queryset
+    
+    @action(detail=True, methods=['get'])
+    def progression(self, request, pk=None):
+        """
+        The user's estimated 1RM, top set and volume on this exercise per
+        training day, downsampled to at most `points` points per series and
+        optionally limited to `start`..`end`
+        """
+        exercise = self.get_object()
+        try:
+            points = int(request.query_params.get('points', DEFAULT_POINTS))
+        except ValueError:
+            return Response({"error": "points must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        if not MIN_POINTS <= points <= MAX_POINTS:
+            return Response(
+                {"error": f"points must be between {MIN_POINTS} and {MAX_POINTS}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            start_date, end_date = parse_export_range(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(progression(request.user.user_id, exercise, points, start_date, end_date))
+    
+    @action(detail=False, methods=['get'])
+    def selector(self, request):
+        """
+        The catalog for the exercise selector: the user's `top` most used
+        exercises, by recency-weighted set count, then the rest by name.
+        Reads the cached catalog and the user's usage rows only.
+        """
+        try:
+            top = int(request.query_params.get('top', DEFAULT_SELECTOR_TOP))
+        except ValueError:
+            return Response({"error": "top must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 <= top <= MAX_SELECTOR_TOP:
+            return Response(
+                {"error": f"top must be between 0 and {MAX_SELECTOR_TOP}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        key = self.catalog_key()
+        exercises = catalog_cache.get(self.catalog, key, self.build_catalog).data
+        muscle_group, is_cardio = key
+        usage = UserExerciseUsage.objects.filter(user_id=request.user.user_id, total_sets__gt=0)
+        if muscle_group:
+            usage = usage.filter(exercise__muscle_group=muscle_group)
+        if is_cardio is not None:
+            usage = usage.filter(exercise__is_cardio=is_cardio)
+        # Rows are scored as of their latest set; carry each to today (sets
+        # dated after today count as of their own day) and rank in one query
+        today = usage_day(timezone.localdate())
+        usage = usage.annotate(
+            recent_score=F('score') * usage_decay_expression(F('scored_day'), Value(today))
+        ).order_by('-recent_score', 'exercise_id').values_list(
+            'exercise_id', 'total_sets', 'recent_score'
+        )[:top]
+        ranked = {
+            str(exercise_id): (position, total_sets, score)
+            for position, (exercise_id, total_sets, score) in enumerate(usage if top else [])
+        }
+        top_exercises = [None] * len(ranked)
+        rest = []
+        for exercise in exercises:
+            entry = ranked.get(str(exercise['id']))
+            if entry is None:
+                rest.append(exercise)
+                continue
+            position, total_sets, score = entry
+            top_exercises[position] = {**exercise, 'total_sets': total_sets, 'score': round(score, 2)}
+        return Response({
+            'top': [exercise for exercise in top_exercises if exercise is not None],
+            'exercises': rest,
+        })
 
 class WorkoutViewSet(viewsets.ModelViewSet):
     """
@@ -54,8 +228,8 @@ class WorkoutViewSet(viewsets.ModelViewSet):
         """Get workouts for the current user"""
         # Get the user_id from the authenticated user
         user_id = self.request.user.user_id
-        print(f"Filtering workouts for user_id: {user_id}")
-        return Workout.objects.filter(user_id=user_id)
+        log_event(logger, 'workouts.list', user_id=user_id, action=self.action)
+        return Workout.objects.for_user(user_id).with_sets()
     
     def get_serializer_class(self):
         """Use different serializers for list/retrieve vs create/update"""
@@ -66,63 +240,90 @@ class WorkoutViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Set user_id when creating a workout"""
         user_id = self.request.user.user_id
-        print(f"Creating workout for user_id: {user_id}")
+        log_event(logger, 'workouts.create', user_id=user_id)
         serializer.save(user_id=user_id)
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get workout statistics for the user"""
-        user_id = self.request.user.user_id
-        
-        # Get all workouts for this user
-        workouts = Workout.objects.filter(user_id=user_id)
-        workout_count = workouts.count()
-        
-        if workout_count == 0:
-            return Response({
-                'total_workouts': 0,
-                'total_sets': 0,
-                'total_reps': 0,
-                'total_volume': 0,
-                'average_duration': 0,
-                'most_trained_muscle': 'N/A'
-            })
-        
-        # Get all sets
-        workout_sets = WorkoutSet.objects.filter(workout__user_id=user_id)
-        
-        # Calculate stats
-        total_sets = workout_sets.count()
-        total_reps = workout_sets.aggregate(Sum('reps'))['reps__sum'] or 0
-        
-        # Calculate volume (weight × reps)
-        total_volume = 0
-        for workout_set in workout_sets:
-            if workout_set.weight:
-                total_volume += workout_set.weight * workout_set.reps
-        
-        # Average workout duration
-        avg_duration = workouts.aggregate(Avg('duration'))['duration__avg'] or 0
-        
-        # Most trained muscle group
-        muscle_counts = workout_sets.values('exercise__muscle_group').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        
-        most_trained_muscle = 'N/A'
-        if muscle_counts:
-            most_trained_muscle = muscle_counts[0]['exercise__muscle_group']
-        
-        stats = {
-            'total_workouts': workout_count,
-            'total_sets': total_sets,
-            'total_reps': total_reps,
-            'total_volume': total_volume,
-            'average_duration': avg_duration,
-            'most_trained_muscle': most_trained_muscle
-        }
+        return Response(get_training_stats(request.user.user_id))
+    
+    @action(detail=False, methods=['get'])
+    def records(self, request):
+        """
+        Personal records per exercise (best weight, estimated 1RM and set
+        volume), strongest estimated 1RM first, optionally for one `exercise`
+        """
+        records = UserExerciseRecord.objects.filter(
+            user_id=request.user.user_id
+        ).select_related('exercise').order_by(F('best_e1rm').desc(nulls_last=True), 'exercise__name')
+        exercise_id = request.query_params.get('exercise')
+        if exercise_id:
+            try:
+                records = records.filter(exercise_id=uuid.UUID(exercise_id))
+            except ValueError:
+                return Response({"error": "Invalid exercise ID"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(UserExerciseRecordSerializer(records, many=True).data)
+    
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """
+        Stream all of the user's workouts and sets as CSV (one row per set) or
+        NDJSON (one workout per line), optionally between `start` and `end`
+        """
+        user_id = request.user.user_id
+        try:
+            start_date, end_date = parse_export_range(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        workouts = Workout.objects.for_user(user_id)
+        if start_date:
+            workouts = workouts.filter(date__gte=start_date)
+        if end_date:
+            workouts = workouts.filter(date__lte=end_date)
+        rows = workouts.order_by(
+            'date', 'start_time', 'id', 'sets__exercise__name', 'sets__set_number'
+        ).values_list(
+            *(lookup for _, lookup in WORKOUT_EXPORT_FIELDS + SET_EXPORT_FIELDS)
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        
+        log_event(logger, 'workouts.export', user_id=user_id, format=request.accepted_renderer.format)
+        return export_response(
+            request, 'workouts', WORKOUT_EXPORT_CSV_COLUMNS, rows,
+            records=workout_export_records(rows),
+        )
+    
+    @action(detail=False, methods=['post'], url_path='import', url_name='import',
+            parser_classes=[MultiPartParser])
+    def import_history(self, request):
+        """
+        Import workouts from an uploaded CSV `file` exported by another app
+        (see workouts.importer). Re-uploading the same file after a failure
+        resumes the import; workouts already stored are skipped.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "Upload a CSV file as 'file'"}, status=status.HTTP_400_BAD_REQUEST)
+        weight_unit = request.data.get('weight_unit', 'kg')
+        if weight_unit not in ('kg', 'lb'):
+            return Response({"error": "weight_unit must be kg or lb"}, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response(stats)
+        user_id = request.user.user_id
+        importer = WorkoutImporter(
+            user_id,
+            weight_scale=KG_PER_LB if weight_unit == 'lb' else 1.0,
+        )
+        try:
+            stats = importer.run(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''))
+        except (WorkoutImportError, UnicodeDecodeError) as e:
+            return Response({"error": f"Import failed: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        log_event(
+            logger, 'workouts.import', user_id=user_id, rows=stats.rows,
+            workouts=stats.workouts, sets=stats.sets,
+        )
+        return Response(stats.as_dict())
     
     @action(detail=False, methods=['get'])
     def history(self, request):
@@ -130,21 +331,50 @@ class WorkoutViewSet(viewsets.ModelViewSet):
         user_id = request.user.user_id
         days = int(request.query_params.get('days', 30))
         
-        print(f"Fetching workout history for user_id: {user_id}, days: {days}")
-        
         # Calculate date range
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
         
-        workouts = Workout.objects.filter(
-            user_id=user_id,
+        workouts = Workout.objects.for_user(user_id).filter(
             date__gte=start_date,
             date__lte=end_date
-        ).order_by('date')
+        ).order_by('date').with_sets()
         
-        print(f"Found {workouts.count()} workouts for user_id: {user_id}")
+        data = WorkoutSerializer(workouts, many=True).data
+        log_event(logger, 'workouts.history', user_id=user_id, days=days, workouts=len(data))
         
-        return Response(WorkoutSerializer(workouts, many=True).data)
+        return Response(data)
+
+def save_new_set(serializer, workout_id, user_id):
+    """
+    Save a validated new set into the user's workout. A set submitted without
+    a set_number gets the next number of its exercise, allocated while the
+    workout row is locked (see WorkoutQuerySet.for_set_logging), so phone and
+    web logging at the same moment get consecutive numbers instead of a
+    unique constraint error. An explicit set_number its exercise already uses
+    is rejected by that constraint and reported as a validation error.
+    """
+    exercise = serializer.validated_data['exercise']
+    try:
+        with transaction.atomic():
+            workout = get_object_or_404(Workout.objects.for_set_logging(exercise.id), id=workout_id)
+            
+            # Ensure the workout belongs to the user
+            if workout.user_id != user_id:
+                raise PermissionDenied("You don't have permission to modify this workout")
+            
+            set_number = serializer.validated_data.get('set_number', workout.next_set_number)
+            serializer.save(workout=workout, set_number=set_number)
+    except IntegrityError:
+        raise duplicate_set_number(set_number)
+
+def save_set_changes(serializer):
+    """Save an edited set, reporting a set number its exercise already uses as a validation error"""
+    try:
+        with transaction.atomic():
+            serializer.save()
+    except IntegrityError:
+        raise duplicate_set_number(serializer.validated_data.get('set_number'))
 
 class WorkoutSetViewSet(viewsets.ModelViewSet):
     """
@@ -152,56 +382,77 @@ class WorkoutSetViewSet(viewsets.ModelViewSet):
     """
     serializer_class = WorkoutSetSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Bounded by the size of a single workout
+    pagination_class = None
     
     def get_queryset(self):
         """Get sets for the specified workout"""
         workout_id = self.kwargs.get('workout_pk')
-        return WorkoutSet.objects.filter(workout_id=workout_id)
+        return WorkoutSet.objects.filter(workout_id=workout_id).select_related('exercise')
     
     def perform_create(self, serializer):
         """Set workout when creating a set"""
-        workout_id = self.kwargs.get('workout_pk')
-        workout = Workout.objects.get(id=workout_id)
-        
-        # Ensure the workout belongs to the user
-        if workout.user_id != self.request.user.user_id:
-            raise permissions.PermissionDenied("You don't have permission to modify this workout")
+        save_new_set(serializer, self.kwargs.get('workout_pk'), self.request.user.user_id)
+    
+    def perform_update(self, serializer):
+        save_set_changes(serializer)
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, workout_pk=None):
+        """
+        Create a batch of sets for the workout in one request.
+        
+        The batch is validated as a whole and written in a single transaction;
+        if any set is invalid nothing is saved and the response holds one
+        error object per submitted set (empty for valid ones).
+        Sets without a set_number are numbered after the last set of their
+        exercise, in the order submitted.
+        """
+        if not isinstance(request.data, list):
+            return Response(
+                {"error": "Expected a list of sets"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(request.data) > BULK_SET_LIMIT:
+            return Response(
+                {"error": f"A batch may contain at most {BULK_SET_LIMIT} sets"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Validation allocates missing set numbers, so it runs under the
+        # workout's row lock like single set logging (see save_new_set)
+        with transaction.atomic():
+            workout = get_object_or_404(
+                Workout.objects.select_for_update(), id=workout_pk, user_id=request.user.user_id
+            )
+            context = self.get_serializer_context()
+            context['workout'] = workout
+            serializer = WorkoutSetBulkSerializer(data=request.data, many=True, context=context)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             
-        serializer.save(workout=workout)
+            workout_sets = serializer.save(workout=workout)
+        return Response(
+            WorkoutSetSerializer(workout_sets, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
 
 # Add these new views if you use the simplified URL approach
 
-from django.shortcuts import get_object_or_404
-
 class WorkoutSetListCreateView(generics.ListCreateAPIView):
     serializer_class = WorkoutSetSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Bounded by the size of a single workout
+    pagination_class = None
     
     def get_queryset(self):
         """Get sets for the specified workout"""
         workout_id = self.kwargs.get('workout_id')
-        return WorkoutSet.objects.filter(workout_id=workout_id)
-    
-    def get_serializer_context(self):
-        """Add workout to serializer context for validation"""
-        context = super().get_serializer_context()
-        workout_id = self.kwargs.get('workout_id')
-        from django.shortcuts import get_object_or_404
-        workout = get_object_or_404(Workout, id=workout_id)
-        context['workout'] = workout
-        return context
+        return WorkoutSet.objects.filter(workout_id=workout_id).select_related('exercise')
     
     def perform_create(self, serializer):
         """Set workout when creating a set"""
-        workout_id = self.kwargs.get('workout_id')
-        from django.shortcuts import get_object_or_404
-        workout = get_object_or_404(Workout, id=workout_id)
-        
-        # Ensure the workout belongs to the user
-        if workout.user_id != self.request.user.user_id:
-            raise permissions.PermissionDenied("You don't have permission to modify this workout")
-            
-        serializer.save(workout=workout)
+        save_new_set(serializer, self.kwargs.get('workout_id'), self.request.user.user_id)
 
 class WorkoutSetDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = WorkoutSetSerializer
@@ -209,63 +460,16 @@ class WorkoutSetDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         workout_id = self.kwargs.get('workout_id')
-        return WorkoutSet.objects.filter(workout_id=workout_id)
+        return WorkoutSet.objects.filter(workout_id=workout_id).select_related('exercise')
+    
+    def perform_update(self, serializer):
+        save_set_changes(serializer)
 
 class WorkoutStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        user_id = self.request.user.user_id
-        
-        # Get all workouts for this user
-        workouts = Workout.objects.filter(user_id=user_id)
-        workout_count = workouts.count()
-        
-        if workout_count == 0:
-            return Response({
-                'total_workouts': 0,
-                'total_sets': 0,
-                'total_reps': 0,
-                'total_volume': 0,
-                'average_duration': 0,
-                'most_trained_muscle': 'N/A'
-            })
-        
-        # Get all sets
-        workout_sets = WorkoutSet.objects.filter(workout__user_id=user_id)
-        
-        # Calculate stats
-        total_sets = workout_sets.count()
-        total_reps = workout_sets.aggregate(Sum('reps'))['reps__sum'] or 0
-        
-        # Calculate volume (weight × reps)
-        total_volume = 0
-        for workout_set in workout_sets:
-            if workout_set.weight:
-                total_volume += workout_set.weight * workout_set.reps
-        
-        # Average workout duration
-        avg_duration = workouts.aggregate(Avg('duration'))['duration__avg'] or 0
-        
-        # Most trained muscle group
-        muscle_counts = workout_sets.values('exercise__muscle_group').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        
-        most_trained_muscle = 'N/A'
-        if muscle_counts:
-            most_trained_muscle = muscle_counts[0]['exercise__muscle_group']
-        
-        stats = {
-            'total_workouts': workout_count,
-            'total_sets': total_sets,
-            'total_reps': total_reps,
-            'total_volume': total_volume,
-            'average_duration': avg_duration,
-            'most_trained_muscle': most_trained_muscle
-        }
-        
-        return Response(stats)
+        return Response(get_training_stats(request.user.user_id))
 
 class WorkoutHistoryView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -278,10 +482,9 @@ class WorkoutHistoryView(APIView):
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
         
-        workouts = Workout.objects.filter(
-            user_id=user_id,
+        workouts = Workout.objects.for_user(user_id).filter(
             date__gte=start_date,
             date__lte=end_date
-        ).order_by('date')
+        ).order_by('date').with_sets()
         
         return Response(WorkoutSerializer(workouts, many=True).data)